@@ -1,14 +1,86 @@
 # commandes/admin.py
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils.html import format_html, mark_safe
-from .models import Commande
+from django.db import transaction
+from django.db.models import Prefetch
+from compte import stats
+from menu.models import Plat
+from .models import Commande, HistoriqueStatut, LigneCommande
+from .services import annuler_commandes, changer_statut, changer_statut_commande, recalculer_montants
+
+
+class CommandeForm(forms.ModelForm):
+    """Ne propose que les statuts atteignables depuis le statut actuel."""
+
+    class Meta:
+        model = Commande
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'status' in self.fields:
+            possibles = {self.instance.status, *Commande.TRANSITIONS.get(self.instance.status, ())}
+            self.fields['status'].choices = [
+                (valeur, libelle) for valeur, libelle in Commande.StatusChoices.choices if valeur in possibles
+            ]
+
+
+class LigneCommandeInline(admin.TabularInline):
+    """
+    Lignes saisies à la création uniquement : une fois la commande passée, le
+    stock a été réservé pour ces lignes, et seules les transitions de
+    commandes.services le rendent.
+    """
+    model = LigneCommande
+    extra = 0
+    fields = ('plat', 'quantite', 'prix_unitaire')
+    autocomplete_fields = ('plat',)
+
+    def has_add_permission(self, request, obj=None):
+        return obj is None and super().has_add_permission(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return obj is None and super().has_delete_permission(request, obj)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('plat__categorie')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Le widget affiche str(plat), qui lit la catégorie
+        if db_field.name == 'plat':
+            kwargs['queryset'] = Plat.objects.select_related('categorie')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class HistoriqueStatutInline(admin.TabularInline):
+    model = HistoriqueStatut
+    extra = 0
+    fields = ('created_at', 'ancien_statut', 'nouveau_statut', 'auteur')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        """L'historique est écrit par les transitions de statut uniquement."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('auteur')
+
 
 @admin.register(Commande)
 class CommandeAdmin(admin.ModelAdmin):
+    form = CommandeForm
     list_display = [
         'id_display',
         'client_link',
-        'plat_nom',
+        'plats_resume',
         'nbPlat',
         'montant_display',
         'status_badge',  # Affichage stylé
@@ -27,9 +99,11 @@ class CommandeAdmin(admin.ModelAdmin):
         'client__email',
         'client__first_name',
         'client__last_name',
-        'plats__nom'
+        'lignes__plat__nom'
     ]
     readonly_fields = [
+        'nbPlat',
+        'montant',
         'created_at',
         'total_amount',
         'can_be_cancelled',
@@ -37,10 +111,11 @@ class CommandeAdmin(admin.ModelAdmin):
         'is_recent'
     ]
     date_hierarchy = 'created_at'
+    inlines = [LigneCommandeInline, HistoriqueStatutInline]
 
     fieldsets = (
         ('Informations de la commande', {
-            'fields': ('client', 'plats', 'nbPlat', 'montant', 'status')
+            'fields': ('client', 'nbPlat', 'montant', 'status')
         }),
         ('Notes', {
             'fields': ('notes',),
@@ -67,10 +142,9 @@ class CommandeAdmin(admin.ModelAdmin):
     client_link.short_description = 'Client'
     client_link.admin_order_field = 'client__username'
 
-    def plat_nom(self, obj):
-        return obj.plats.nom
-    plat_nom.short_description = 'Plat'
-    plat_nom.admin_order_field = 'plats__nom'
+    def plats_resume(self, obj):
+        return ', '.join(f"{ligne.quantite} x {ligne.plat.nom}" for ligne in obj.lignes.all())
+    plats_resume.short_description = 'Plats'
 
     def montant_display(self, obj):
         montant = obj.montant or 0
@@ -119,48 +193,82 @@ class CommandeAdmin(admin.ModelAdmin):
     ]
 
     def mark_preparing(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='preparing')
+        updated = changer_statut(queryset, 'preparing', auteur=request.user)
         self.message_user(request, f'{updated} commande(s) marquée(s) en préparation.')
     mark_preparing.short_description = '👨‍🍳 Marquer en préparation'
 
     def mark_ready(self, request, queryset):
-        updated = queryset.filter(status='preparing').update(status='ready')
+        updated = changer_statut(queryset, 'ready', auteur=request.user)
         self.message_user(request, f'{updated} commande(s) marquée(s) comme prête(s).')
     mark_ready.short_description = '✅ Marquer comme prêt'
 
     def mark_delivering(self, request, queryset):
-        updated = queryset.filter(status='ready').update(status='delivering')
+        updated = changer_statut(queryset, 'delivering', auteur=request.user)
         self.message_user(request, f'{updated} commande(s) en cours de livraison.')
     mark_delivering.short_description = '🚚 Marquer en livraison'
 
     def mark_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = changer_statut(queryset, 'completed', auteur=request.user)
         self.message_user(request, f'{updated} commande(s) marquée(s) comme livrée(s).')
     mark_completed.short_description = '🎉 Marquer comme livrée'
 
     def mark_cancelled(self, request, queryset):
-        count = 0
-        for commande in queryset.filter(status__in=['pending', 'preparing']):
-            plat = commande.plats
-            plat.stock += commande.nbPlat
-            plat.disponible = True
-            plat.save()
-            commande.status = 'failed'
-            commande.save()
-            count += 1
+        count = annuler_commandes(queryset, statuts_annulables=['pending', 'preparing'], auteur=request.user)
         self.message_user(request, f'{count} commande(s) annulée(s) et stock restauré.')
     mark_cancelled.short_description = '❌ Annuler la commande'
 
     def recalculate_montant(self, request, queryset):
-        for commande in queryset:
-            commande.montant = commande.plats.prix * commande.nbPlat
-            commande.save()
-        self.message_user(request, f'{queryset.count()} montant(s) recalculé(s).')
+        count = recalculer_montants(queryset)
+        self.message_user(request, f'{count} montant(s) recalculé(s).')
     recalculate_montant.short_description = '💰 Recalculer le montant'
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related('client', 'plats', 'plats__categorie')
+        return qs.select_related('client').prefetch_related(
+            Prefetch('lignes', queryset=LigneCommande.objects.select_related('plat', 'plat__categorie'))
+        )
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', CommandeForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Enregistre les champs modifiés sans écraser le statut : un changement
+        de statut passe par la transition conditionnelle de commandes.services.
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+
+        with transaction.atomic():
+            champs = [champ for champ in form.changed_data if champ != 'status']
+            if champs:
+                obj.save(update_fields=[*champs, 'updated_at'])
+
+            if 'status' in form.changed_data:
+                nouveau_statut = obj.status
+                obj.status = form.initial['status']
+                if not changer_statut_commande(obj, nouveau_statut, auteur=request.user):
+                    self.message_user(
+                        request,
+                        f"La commande #{obj.pk} a changé de statut entre-temps : modification ignorée.",
+                        messages.WARNING,
+                    )
+
+    def save_related(self, request, form, formsets, change):
+        """Recalcule toujours le nombre de plats et le montant à partir des lignes."""
+        super().save_related(request, form, formsets, change)
+        commande = form.instance
+        lignes = list(LigneCommande.objects.filter(commande=commande))
+        commande.nbPlat = sum(ligne.quantite for ligne in lignes) or 1
+        ancien_montant = commande.montant
+        commande.montant = sum(ligne.montant for ligne in lignes)
+        commande.save(update_fields=['nbPlat', 'montant'])
+        if not change:
+            stats.commandes_creees([commande])
+        elif commande.montant != ancien_montant:
+            stats.montants_modifies({commande.client_id: commande.montant - ancien_montant})
 
 
 # -------- Personnalisation de l'admin --------
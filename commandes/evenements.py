@@ -0,0 +1,120 @@
+"""
+Diffusion des événements de commande (nouvelle commande, changement de statut).
+
+Les services publient des messages (dictionnaires sérialisables en JSON) sur
+un canal ; les vues asynchrones s'y abonnent pour les relayer en
+Server-Sent Events. Le broker est choisi par `settings.COMMANDES_BROKER` :
+`LocalBroker` suffit pour un seul processus ASGI et pour les tests ; un
+déploiement multi-processus fournit sa propre implémentation de `Broker`
+(Redis pub/sub, PostgreSQL LISTEN/NOTIFY...).
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+CANAL_CUISINE = 'cuisine'
+BROKER_PAR_DEFAUT = 'commandes.evenements.LocalBroker'
+
+
+class Broker:
+    """Interface d'un broker de publication / abonnement."""
+
+    def publier(self, canal: str, message: dict):
+        """Envoie `message` à tous les abonnés de `canal`. Appelable depuis n'importe quel thread."""
+        raise NotImplementedError
+
+    def abonner(self, canal: str) -> 'Abonnement':
+        """Retourne un abonnement lié à la boucle asyncio courante."""
+        raise NotImplementedError
+
+    def desabonner(self, abonnement: 'Abonnement'):
+        raise NotImplementedError
+
+
+class Abonnement:
+    """
+    File de messages d'un abonné. Les messages sont déposés depuis n'importe
+    quel thread et lus dans la boucle asyncio qui a créé l'abonnement.
+    Si l'abonné ne suit pas, les plus anciens messages sont abandonnés.
+    """
+
+    def __init__(self, broker: Broker, canal: str, taille_max: int = 100):
+        self.broker = broker
+        self.canal = canal
+        self._boucle = asyncio.get_running_loop()
+        self._file = asyncio.Queue(maxsize=taille_max)
+
+    def deposer(self, message: dict):
+        try:
+            self._boucle.call_soon_threadsafe(self._ajouter, message)
+        except RuntimeError:
+            # Boucle fermée : l'abonné a disparu sans se désabonner
+            self.broker.desabonner(self)
+
+    def _ajouter(self, message):
+        if self._file.full():
+            self._file.get_nowait()
+        self._file.put_nowait(message)
+
+    async def recevoir(self, timeout: float = None) -> dict:
+        """Attend le prochain message ; lève `asyncio.TimeoutError` après `timeout` secondes."""
+        return await asyncio.wait_for(self._file.get(), timeout)
+
+    def fermer(self):
+        self.broker.desabonner(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.recevoir()
+
+
+class LocalBroker(Broker):
+    """Broker en mémoire, limité au processus courant."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._abonnes = defaultdict(set)
+
+    def publier(self, canal, message):
+        with self._verrou:
+            abonnes = list(self._abonnes.get(canal, ()))
+        for abonnement in abonnes:
+            abonnement.deposer(message)
+
+    def abonner(self, canal):
+        abonnement = Abonnement(self, canal)
+        with self._verrou:
+            self._abonnes[canal].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            abonnes = self._abonnes.get(abonnement.canal)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self._abonnes[abonnement.canal]
+
+
+_brokers = {}
+_verrou_brokers = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """Instance unique (par processus) du broker configuré."""
+    chemin = getattr(settings, 'COMMANDES_BROKER', BROKER_PAR_DEFAUT)
+    with _verrou_brokers:
+        if chemin not in _brokers:
+            _brokers[chemin] = import_string(chemin)()
+        return _brokers[chemin]
+
+
+def publier_apres_commit(canal: str, message: dict):
+    """Publie le message une fois la transaction courante validée (jamais si elle est annulée)."""
+    transaction.on_commit(lambda: get_broker().publier(canal, message))
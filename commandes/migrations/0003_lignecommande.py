@@ -0,0 +1,88 @@
+# Generated by Django 6.0 on 2026-10-18 04:01
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def creer_lignes(apps, schema_editor):
+    Commande = apps.get_model('commandes', 'Commande')
+    LigneCommande = apps.get_model('commandes', 'LigneCommande')
+
+    lignes = []
+    commandes = Commande.objects.values_list('id', 'plats_id', 'plats__prix', 'nbPlat', 'montant')
+    for commande_id, plat_id, prix, nb_plat, montant in commandes.iterator(chunk_size=2000):
+        nb_plat = nb_plat or 1
+        lignes.append(LigneCommande(
+            commande_id=commande_id,
+            plat_id=plat_id,
+            quantite=nb_plat,
+            prix_unitaire=montant // nb_plat if montant else prix,
+        ))
+        if len(lignes) >= 2000:
+            LigneCommande.objects.bulk_create(lignes)
+            lignes = []
+    LigneCommande.objects.bulk_create(lignes)
+
+
+def supprimer_lignes(apps, schema_editor):
+    apps.get_model('commandes', 'LigneCommande').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0002_fix_table_prod'),
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LigneCommande',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantite', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Quantité')),
+                ('prix_unitaire', models.PositiveIntegerField(help_text='Prix du plat au moment de la commande', verbose_name='Prix unitaire (FCFA)')),
+                ('commande', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='commandes.commande')),
+                ('plat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes_commande', to='menu.plat')),
+            ],
+            options={
+                'verbose_name': 'Ligne de commande',
+                'verbose_name_plural': 'Lignes de commande',
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('commande', 'plat'), name='ligne_commande_plat_unique')],
+            },
+        ),
+        # Une ligne par commande existante (l'ancien modèle n'avait qu'un plat)
+        migrations.RunPython(creer_lignes, supprimer_lignes),
+        migrations.RemoveField(
+            model_name='commande',
+            name='plats',
+        ),
+        migrations.AlterField(
+            model_name='commande',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Commandée le'),
+        ),
+        migrations.AlterField(
+            model_name='commande',
+            name='montant',
+            field=models.PositiveIntegerField(default=0, help_text='Montant total en FCFA', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Montant de la commande (FCFA)'),
+        ),
+        migrations.AlterField(
+            model_name='commande',
+            name='nbPlat',
+            field=models.PositiveIntegerField(default=1, help_text='Quantité totale commandée (toutes lignes confondues)', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Nombre de plats'),
+        ),
+        migrations.AlterField(
+            model_name='commande',
+            name='notes',
+            field=models.TextField(blank=True, help_text='Instructions spéciales pour cette commande', null=True, verbose_name='Notes/Instructions'),
+        ),
+        migrations.AlterField(
+            model_name='commande',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Dernière modification'),
+        ),
+    ]
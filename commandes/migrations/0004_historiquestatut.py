@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 04:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commandes', '0003_lignecommande'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueStatut',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancien_statut', models.CharField(choices=[('pending', 'En attente'), ('preparing', 'En préparation'), ('ready', 'Prêt'), ('delivering', 'En livraison'), ('completed', 'Livrée'), ('failed', 'Annulée')], max_length=20, verbose_name='Ancien statut')),
+                ('nouveau_statut', models.CharField(choices=[('pending', 'En attente'), ('preparing', 'En préparation'), ('ready', 'Prêt'), ('delivering', 'En livraison'), ('completed', 'Livrée'), ('failed', 'Annulée')], max_length=20, verbose_name='Nouveau statut')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Le')),
+                ('auteur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('commande', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historique', to='commandes.commande')),
+            ],
+            options={
+                'verbose_name': 'Changement de statut',
+                'verbose_name_plural': 'Historique des statuts',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['commande', 'created_at'], name='commandes_h_command_14e539_idx')],
+            },
+        ),
+    ]
@@ -18,18 +18,23 @@ class Commande(models.Model):
         COMPLETED = 'completed', _('Livrée')
         FAILED = 'failed', _('Annulée')
 
+    # Transitions autorisées : statut actuel -> statuts suivants possibles.
+    # Appliquées par commandes.services (UPDATE conditionnel sur le statut lu).
+    TRANSITIONS = {
+        StatusChoices.PENDING: {StatusChoices.PREPARING, StatusChoices.FAILED},
+        StatusChoices.PREPARING: {StatusChoices.READY, StatusChoices.FAILED},
+        StatusChoices.READY: {StatusChoices.DELIVERING, StatusChoices.COMPLETED},
+        StatusChoices.DELIVERING: {StatusChoices.COMPLETED, StatusChoices.FAILED},
+        StatusChoices.COMPLETED: set(),
+        StatusChoices.FAILED: set(),
+    }
+
     client = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='commandes'
     )
 
-    plats = models.ForeignKey(
-        Plat,
-        on_delete=models.CASCADE,
-        related_name='commandes'
-    )
-
     montant = models.PositiveIntegerField(
         'Montant de la commande (FCFA)',
         default=0,
@@ -40,7 +45,7 @@ class Commande(models.Model):
         'Nombre de plats',
         default=1,
         validators=[MinValueValidator(1)],
-        help_text="Quantité commandée"
+        help_text="Quantité totale commandée (toutes lignes confondues)"
     )
     status = models.CharField(
         'Statut de la commande',
@@ -77,6 +82,12 @@ class Commande(models.Model):
     def __str__(self):
         return f"Commande #{self.pk} - {self.client.username} - {self.get_status_display()}"
 
+    @property
+    def statuts_suivants(self):
+        """Statuts vers lesquels la commande peut passer, dans l'ordre des choix."""
+        suivants = self.TRANSITIONS.get(self.status, set())
+        return [statut for statut in self.StatusChoices if statut in suivants]
+
     @property
     def can_be_cancelled(self):
         """Vérifie si la commande peut être annulée"""
@@ -90,20 +101,16 @@ class Commande(models.Model):
         """Vérifie si la commande peut être recommandée"""
         return (
                 self.status in [self.StatusChoices.COMPLETED, self.StatusChoices.FAILED]
-                and self.plats.is_available
-                and self.plats.stock >= self.nbPlat
+                and all(
+                    ligne.plat.disponible and ligne.plat.stock >= ligne.quantite
+                    for ligne in self.lignes.all()
+                )
         )
 
     @property
     def total_amount(self):
-        """Calcule le montant total (peut être utilisé pour validation)"""
-        return self.plats.prix * self.nbPlat
-
-    def save(self, *args, **kwargs):
-        """Calcule automatiquement le montant si non défini"""
-        if not self.montant or self.montant == 0:
-            self.montant = self.plats.prix * self.nbPlat
-        super().save(*args, **kwargs)
+        """Calcule le montant total à partir des lignes (peut être utilisé pour validation)"""
+        return sum(ligne.montant for ligne in self.lignes.all())
 
     @property
     def status_color(self):
@@ -123,4 +130,77 @@ class Commande(models.Model):
         """Vérifie si la commande a moins de 24h"""
         from django.utils import timezone
         from datetime import timedelta
-        return self.created_at > timezone.now() - timedelta(hours=24)
\ No newline at end of file
+        return self.created_at > timezone.now() - timedelta(hours=24)
+
+
+class LigneCommande(models.Model):
+    """Ligne d'une commande : un plat, sa quantité et son prix au moment de la commande."""
+
+    commande = models.ForeignKey(
+        Commande,
+        on_delete=models.CASCADE,
+        related_name='lignes'
+    )
+    plat = models.ForeignKey(
+        Plat,
+        on_delete=models.CASCADE,
+        related_name='lignes_commande'
+    )
+    quantite = models.PositiveIntegerField(
+        'Quantité',
+        default=1,
+        validators=[MinValueValidator(1)]
+    )
+    prix_unitaire = models.PositiveIntegerField(
+        'Prix unitaire (FCFA)',
+        help_text="Prix du plat au moment de la commande"
+    )
+
+    class Meta:
+        verbose_name = "Ligne de commande"
+        verbose_name_plural = "Lignes de commande"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['commande', 'plat'], name='ligne_commande_plat_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantite} x {self.plat.nom}"
+
+    @property
+    def montant(self):
+        return self.prix_unitaire * self.quantite
+
+
+class HistoriqueStatut(models.Model):
+    """
+    Journal des changements de statut d'une commande. Les lignes ne sont
+    jamais modifiées : chaque transition en ajoute une (par `bulk_create`
+    pour les transitions groupées).
+    """
+    commande = models.ForeignKey(
+        Commande,
+        on_delete=models.CASCADE,
+        related_name='historique'
+    )
+    ancien_statut = models.CharField('Ancien statut', choices=Commande.StatusChoices.choices, max_length=20)
+    nouveau_statut = models.CharField('Nouveau statut', choices=Commande.StatusChoices.choices, max_length=20)
+    auteur = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField('Le', default=now, editable=False)
+
+    class Meta:
+        verbose_name = "Changement de statut"
+        verbose_name_plural = "Historique des statuts"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['commande', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.commande_id} : {self.ancien_statut} -> {self.nouveau_statut}"
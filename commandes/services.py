@@ -0,0 +1,276 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from compte import stats
+from menu import stock
+from menu.models import Plat
+from . import evenements, suivi, taches
+from .models import Commande, HistoriqueStatut, LigneCommande
+
+# Statuts dont les plats ne sont pas encore partis : annulées, leurs quantités reviennent en stock
+STATUTS_STOCK_RESTAURE = (Commande.StatusChoices.PENDING, Commande.StatusChoices.PREPARING)
+
+
+def passer_commande(client, quantites: dict) -> Commande:
+    """
+    Crée une commande multi-plats ({plat_id: quantité}) en une transaction :
+    une requête pour valider les plats, un UPDATE pour tout le stock,
+    un INSERT pour l'en-tête et un `bulk_create` pour les lignes.
+    Lève `stock.StockInsuffisant` si un plat ne peut pas être servi :
+    rien n'est alors écrit en base.
+    """
+    quantites = {int(plat_id): int(quantite) for plat_id, quantite in quantites.items() if int(quantite) > 0}
+    if not quantites:
+        raise ValueError("Une commande doit contenir au moins un plat.")
+
+    plats = Plat.objects.only('id', 'nom', 'prix', 'stock', 'disponible').in_bulk(quantites)
+    for plat_id, quantite in quantites.items():
+        plat = plats.get(plat_id)
+        if plat is None or not plat.disponible or plat.stock < quantite:
+            raise stock.StockInsuffisant(plat_id, quantite)
+
+    with transaction.atomic():
+        stock.reserver_lot(quantites)
+
+        commande = Commande.objects.create(
+            client=client,
+            nbPlat=sum(quantites.values()),
+            montant=sum(plats[plat_id].prix * quantite for plat_id, quantite in quantites.items()),
+            status=Commande.StatusChoices.PENDING,
+        )
+        LigneCommande.objects.bulk_create([
+            LigneCommande(
+                commande=commande,
+                plat_id=plat_id,
+                quantite=quantite,
+                prix_unitaire=plats[plat_id].prix,
+            )
+            for plat_id, quantite in quantites.items()
+        ])
+        stats.commandes_creees([commande])
+        taches.envoyer_confirmation.differer(commande.pk)
+        suivi.signaler_apres_commit([client.pk], commande.updated_at)
+        evenements.publier_apres_commit(evenements.CANAL_CUISINE, {
+            **_etat(commande),
+            'type': 'commande',
+            'client': client.username,
+            'created_at': commande.created_at.isoformat(),
+            'lignes': [
+                {'nom': plats[plat_id].nom, 'quantite': quantite}
+                for plat_id, quantite in quantites.items()
+            ],
+        })
+
+    return commande
+
+
+def _etat(commande_ou_pk, statut=None) -> dict:
+    """Identifiant, statut et statuts suivants d'une commande, pour les événements."""
+    if statut is None:
+        commande_ou_pk, statut = commande_ou_pk.pk, commande_ou_pk.status
+    statut = Commande.StatusChoices(statut)
+    return {
+        'id': commande_ou_pk,
+        'status': statut.value,
+        'status_display': str(statut.label),
+        'statuts_suivants': [
+            {'valeur': suivant.value, 'libelle': str(suivant.label)}
+            for suivant in Commande.StatusChoices if suivant in Commande.TRANSITIONS[statut]
+        ],
+    }
+
+
+class TransitionInterdite(ValueError):
+    """Le changement de statut demandé n'est pas dans `Commande.TRANSITIONS`."""
+
+    def __init__(self, ancien_statut, nouveau_statut):
+        self.ancien_statut = ancien_statut
+        self.nouveau_statut = nouveau_statut
+        super().__init__(f"Transition interdite : {ancien_statut} -> {nouveau_statut}")
+
+
+class TransitionConcurrente(Exception):
+    """Une commande verrouillée a changé de statut avant l'UPDATE (base sans `FOR UPDATE`)."""
+
+
+def statuts_sources(nouveau_statut, depuis=None) -> list:
+    """Statuts depuis lesquels `nouveau_statut` est autorisé, éventuellement restreints à `depuis`."""
+    return [
+        statut for statut, suivants in Commande.TRANSITIONS.items()
+        if nouveau_statut in suivants and (depuis is None or statut in depuis)
+    ]
+
+
+def _verrouiller(queryset):
+    """
+    Verrouille (`SELECT ... FOR UPDATE`) les commandes du queryset et retourne
+    [(pk, client_id, statut)]. Le queryset est repris en sous-requête pour que
+    le verrou porte sur une requête simple, quels que soient ses filtres.
+    """
+    return list(
+        Commande.objects.filter(pk__in=queryset.values('pk'))
+        .select_for_update()
+        .order_by()
+        .values_list('pk', 'client_id', 'status')
+    )
+
+
+def _apres_transition(commandes, nouveau_statut, date, auteur=None):
+    """
+    Effets d'une transition déjà appliquée à `commandes` [(pk, client_id, ancien statut)] :
+    une ligne d'historique par commande (un seul INSERT), les statistiques
+    des clients, les événements pour la cuisine et les clients et, pour une annulation
+    avant le départ des plats (`STATUTS_STOCK_RESTAURE`), la restauration du stock.
+    """
+    HistoriqueStatut.objects.bulk_create([
+        HistoriqueStatut(
+            commande_id=pk,
+            ancien_statut=ancien_statut,
+            nouveau_statut=nouveau_statut,
+            auteur=auteur,
+            created_at=date,
+        )
+        for pk, _, ancien_statut in commandes
+    ])
+    stats.statuts_modifies(
+        (client_id, ancien_statut, nouveau_statut) for _, client_id, ancien_statut in commandes
+    )
+    suivi.signaler_apres_commit({client_id for _, client_id, _ in commandes}, date)
+    evenements.publier_apres_commit(evenements.CANAL_CUISINE, {
+        'type': 'statuts',
+        'commandes': [{**_etat(pk, nouveau_statut), 'ancien': ancien_statut} for pk, _, ancien_statut in commandes],
+    })
+    restaurees = [pk for pk, _, ancien_statut in commandes if ancien_statut in STATUTS_STOCK_RESTAURE]
+    if nouveau_statut == Commande.StatusChoices.FAILED and restaurees:
+        stock.restaurer_lot(dict(
+            LigneCommande.objects.filter(commande_id__in=restaurees)
+            .order_by()
+            .values('plat_id')
+            .annotate(quantite=Sum('quantite'))
+            .values_list('plat_id', 'quantite')
+        ))
+
+
+def changer_statut(queryset, nouveau_statut, depuis=None, auteur=None) -> int:
+    """
+    Passe en bloc au nouveau statut les commandes du queryset dont le statut
+    le permet (voir `Commande.TRANSITIONS`, éventuellement restreint à `depuis`).
+    Les lignes sont verrouillées puis modifiées par un seul UPDATE conditionnel
+    (`WHERE (status = <lu> AND id IN ...) OR ...`) ; nombre de requêtes constant.
+    Retourne le nombre de commandes modifiées.
+    """
+    sources = statuts_sources(nouveau_statut, depuis)
+    if not sources:
+        return 0
+
+    with transaction.atomic():
+        commandes = _verrouiller(queryset.filter(status__in=sources))
+        if not commandes:
+            return 0
+
+        par_statut = defaultdict(list)
+        for pk, _, ancien_statut in commandes:
+            par_statut[ancien_statut].append(pk)
+        maintenant = timezone.now()
+        updated = Commande.objects.filter(
+            reduce(or_, (Q(status=ancien_statut, pk__in=pks) for ancien_statut, pks in par_statut.items()))
+        ).update(status=nouveau_statut, updated_at=maintenant)
+        if updated != len(commandes):
+            raise TransitionConcurrente()
+
+        _apres_transition(commandes, nouveau_statut, maintenant, auteur)
+
+    return len(commandes)
+
+
+def changer_statut_commande(commande: Commande, nouveau_statut, auteur=None) -> bool:
+    """
+    Fait passer une commande au nouveau statut par un UPDATE conditionnel sur
+    le statut lu (`WHERE status = <commande.status>`). Retourne False si une
+    autre requête a modifié la commande entre-temps ; lève `TransitionInterdite`
+    si la transition n'est pas autorisée.
+    """
+    ancien_statut = commande.status
+    if nouveau_statut not in Commande.TRANSITIONS.get(ancien_statut, ()):
+        raise TransitionInterdite(ancien_statut, nouveau_statut)
+
+    with transaction.atomic():
+        maintenant = timezone.now()
+        updated = Commande.objects.filter(pk=commande.pk, status=ancien_statut).update(
+            status=nouveau_statut,
+            updated_at=maintenant,
+        )
+        if not updated:
+            return False
+        _apres_transition([(commande.pk, commande.client_id, ancien_statut)], nouveau_statut, maintenant, auteur)
+
+    commande.status = nouveau_statut
+    return True
+
+
+def annuler_commandes(queryset, statuts_annulables=(Commande.StatusChoices.PENDING,), auteur=None) -> int:
+    """
+    Annule en bloc les commandes du queryset encore dans un statut annulable
+    et restaure leur stock (un seul UPDATE pour tous les plats).
+    Retourne le nombre de commandes annulées.
+    """
+    return changer_statut(queryset, Commande.StatusChoices.FAILED, depuis=statuts_annulables, auteur=auteur)
+
+
+def annuler_commande(commande: Commande, statuts_annulables=(Commande.StatusChoices.PENDING,), auteur=None) -> bool:
+    """
+    Annule une commande et restaure le stock de toutes ses lignes.
+    Le changement de statut est conditionnel (`WHERE status = <statut lu>`) :
+    si une autre requête a déjà fait évoluer la commande, rien n'est modifié
+    et la fonction retourne False.
+    """
+    if commande.status not in statuts_sources(Commande.StatusChoices.FAILED, statuts_annulables):
+        return False
+    return changer_statut_commande(commande, Commande.StatusChoices.FAILED, auteur)
+
+
+def recalculer_montants(queryset) -> int:
+    """
+    Recalcule le montant des commandes à partir du prix actuel des plats de
+    leurs lignes, en un seul `UPDATE ... SET montant = (SELECT SUM(...))`.
+    Retourne le nombre de commandes traitées.
+    """
+    montant_des_lignes = Coalesce(
+        Subquery(
+            LigneCommande.objects.filter(commande=OuterRef('pk'))
+            .order_by()
+            .values('commande')
+            .annotate(total=Sum(F('quantite') * F('plat__prix')))
+            .values('total')
+        ),
+        0,
+    )
+
+    with transaction.atomic():
+        commandes = list(
+            Commande.objects.filter(pk__in=queryset.values('pk'))
+            .select_for_update()
+            .order_by()
+            .annotate(nouveau_montant=montant_des_lignes)
+            .values_list('pk', 'client_id', 'montant', 'nouveau_montant')
+        )
+        if not commandes:
+            return 0
+
+        Commande.objects.filter(pk__in=[pk for pk, _, _, _ in commandes]).update(
+            montant=montant_des_lignes,
+            updated_at=timezone.now(),
+        )
+
+        differences = {}
+        for _, client_id, ancien_montant, nouveau_montant in commandes:
+            differences[client_id] = differences.get(client_id, 0) + nouveau_montant - ancien_montant
+        stats.montants_modifies(differences)
+
+    return len(commandes)
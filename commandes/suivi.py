@@ -0,0 +1,77 @@
+"""
+Suivi des commandes par le client (long polling).
+
+La version des commandes d'un client est l'horodatage, en microsecondes, du
+dernier changement de statut de l'une d'elles (`updated_at`). Elle est
+gardée en cache et mise à jour après chaque transition ; un message sur le
+canal du client réveille les requêtes en attente. Tant que rien ne change,
+une requête de suivi ne fait donc aucune requête SQL.
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from . import evenements
+from .models import Commande
+
+DUREE = 60 * 60 * 24
+EPOQUE = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def canal_client(client_id) -> str:
+    return f'commandes:client:{client_id}'
+
+
+def _cle_version(client_id) -> str:
+    return f'commandes:version:{client_id}'
+
+
+def version_depuis_date(date: datetime.datetime) -> int:
+    return (date - EPOQUE) // datetime.timedelta(microseconds=1)
+
+
+def date_depuis_version(version: int) -> datetime.datetime:
+    return EPOQUE + datetime.timedelta(microseconds=version)
+
+
+def signaler_apres_commit(client_ids, date: datetime.datetime):
+    """À appeler dans la transaction qui modifie les commandes de ces clients."""
+    version = version_depuis_date(date)
+    client_ids = set(client_ids)
+
+    def signaler():
+        cache.set_many({_cle_version(client_id): version for client_id in client_ids}, DUREE)
+        broker = evenements.get_broker()
+        for client_id in client_ids:
+            broker.publier(canal_client(client_id), {'type': 'version', 'version': version})
+
+    transaction.on_commit(signaler)
+
+
+async def aversion_client(client_id) -> int:
+    version = await cache.aget(_cle_version(client_id))
+    if version is None:
+        derniere = (
+            await Commande.objects.filter(client_id=client_id).aaggregate(derniere=Max('updated_at'))
+        )['derniere']
+        version = version_depuis_date(derniere) if derniere else 0
+        await cache.aset(_cle_version(client_id), version, DUREE)
+    return version
+
+
+async def commandes_modifiees(client_id, version: int) -> list:
+    """Commandes du client modifiées après `version`, des plus anciennes aux plus récentes."""
+    return [
+        {
+            'id': commande.pk,
+            'status': commande.status,
+            'status_display': commande.get_status_display(),
+            'version': version_depuis_date(commande.updated_at),
+        }
+        async for commande in Commande.objects.filter(
+            client_id=client_id,
+            updated_at__gt=date_depuis_version(version),
+        ).only('id', 'status', 'updated_at').order_by('updated_at')
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from taches.file import tache
+from .models import Commande
+
+
+@tache(max_tentatives=5)
+def envoyer_confirmation(commande_id: int):
+    """E-mail de confirmation d'une commande, envoyé par le travailleur après le commit."""
+    commande = Commande.objects.select_related('client').filter(pk=commande_id).first()
+    if commande is None or not commande.client.email:
+        # Commande supprimée avant le passage du travailleur : rien à confirmer, pas de relance
+        return
+    send_mail(
+        f"Votre commande #{commande.pk}",
+        f"Bonjour {commande.client.get_full_name() or commande.client.username},\n\n"
+        f"Nous avons bien reçu votre commande #{commande.pk} "
+        f"({commande.nbPlat} plat(s), {commande.montant} FCFA). Elle est en préparation.",
+        settings.DEFAULT_FROM_EMAIL,
+        [commande.client.email],
+    )
@@ -1,3 +1,519 @@
-from django.test import TestCase
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from compte.models import StatistiquesClient
+from menu.models import CategorieMenu, Plat
+from menu.stock import StockInsuffisant
+from . import suivi
+from .admin import CommandeForm
+from .evenements import CANAL_CUISINE, Broker, LocalBroker, get_broker
+from .models import Commande, HistoriqueStatut
+from .services import (
+    STATUTS_STOCK_RESTAURE,
+    TransitionInterdite,
+    annuler_commande,
+    annuler_commandes,
+    changer_statut,
+    changer_statut_commande,
+    passer_commande,
+)
+
+
+class PasserCommandeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(
+            categorie=categorie,
+            nom='Poulet DG',
+            description='Poulet, plantains, légumes',
+            prix=3500,
+            stock=2,
+        )
+        cls.dessert = Plat.objects.create(
+            categorie=categorie,
+            nom='Beignets',
+            description='Beignets haricots',
+            prix=1000,
+            stock=10,
+        )
+
+    def test_decremente_le_stock(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+
+        self.plat.refresh_from_db()
+        self.assertEqual(self.plat.stock, 1)
+        self.assertTrue(self.plat.disponible)
+        self.assertEqual(commande.montant, 3500)
+
+    def test_dernier_plat_le_rend_indisponible(self):
+        passer_commande(self.client_user, {self.plat.pk: 2})
+
+        self.plat.refresh_from_db()
+        self.assertEqual(self.plat.stock, 0)
+        self.assertFalse(self.plat.disponible)
+
+    def test_stock_insuffisant_n_ecrit_rien(self):
+        with self.assertRaises(StockInsuffisant) as erreur:
+            passer_commande(self.client_user, {self.dessert.pk: 3, self.plat.pk: 3})
+
+        self.assertEqual(erreur.exception.plat_id, self.plat.pk)
+        self.plat.refresh_from_db()
+        self.dessert.refresh_from_db()
+        self.assertEqual(self.plat.stock, 2)
+        self.assertEqual(self.dessert.stock, 10)
+        self.assertFalse(Commande.objects.exists())
+
+    def test_commande_multi_plats(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 2, self.dessert.pk: 3})
+
+        self.assertEqual(commande.nbPlat, 5)
+        self.assertEqual(commande.montant, 2 * 3500 + 3 * 1000)
+        self.assertEqual(
+            dict(commande.lignes.values_list('plat_id', 'quantite')),
+            {self.plat.pk: 2, self.dessert.pk: 3},
+        )
+
+    def test_un_seul_update_de_stock_pour_tous_les_plats(self):
+        with CaptureQueriesContext(connection) as requetes:
+            passer_commande(self.client_user, {self.plat.pk: 1, self.dessert.pk: 1})
+
+        sql = [requete['sql'] for requete in requetes.captured_queries]
+        self.assertEqual(len([q for q in sql if q.startswith('UPDATE "menu_plat"')]), 1)
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "commandes_lignecommande"')]), 1)
+
+    def test_annulation_restaure_une_seule_fois(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1, self.dessert.pk: 4})
+
+        self.assertTrue(annuler_commande(commande))
+        self.assertFalse(annuler_commande(commande))
+
+        self.plat.refresh_from_db()
+        self.dessert.refresh_from_db()
+        self.assertEqual(self.plat.stock, 2)
+        self.assertEqual(self.dessert.stock, 10)
+
+    def test_annulation_rend_disponible_un_plat_epuise_seulement(self):
+        epuise = passer_commande(self.client_user, {self.plat.pk: 2})
+        retire = passer_commande(self.client_user, {self.dessert.pk: 1})
+        Plat.objects.filter(pk=self.dessert.pk).update(disponible=False)
+
+        self.assertTrue(annuler_commande(epuise))
+        self.assertTrue(annuler_commande(retire))
+
+        self.plat.refresh_from_db()
+        self.dessert.refresh_from_db()
+        self.assertEqual((self.plat.stock, self.plat.disponible), (2, True))
+        # Retiré de la carte par l'équipe : il le reste
+        self.assertEqual((self.dessert.stock, self.dessert.disponible), (10, False))
+
+    def test_livraison_echouee_ne_restaure_pas(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+        for statut in ('preparing', 'ready', 'delivering'):
+            changer_statut_commande(commande, statut)
+
+        # Les plats sont partis : ils ne reviennent pas en stock
+        self.assertTrue(changer_statut_commande(commande, Commande.StatusChoices.FAILED))
+
+        self.plat.refresh_from_db()
+        self.assertEqual(self.plat.stock, 1)
+
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+        changer_statut_commande(commande, Commande.StatusChoices.PREPARING)
+        self.assertTrue(annuler_commande(commande, statuts_annulables=STATUTS_STOCK_RESTAURE))
+        self.plat.refresh_from_db()
+        self.assertEqual(self.plat.stock, 1)
+
+
+class PanierTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plats = [
+            Plat.objects.create(categorie=categorie, nom=f'Plat {i}', description='...', prix=1000 * i, stock=5)
+            for i in range(1, 4)
+        ]
+
+    def test_validation_du_panier(self):
+        self.client.force_login(self.client_user)
+        for plat in self.plats:
+            self.client.get(reverse('ajouter_au_panier', args=[plat.pk]))
+        self.client.get(reverse('ajouter_au_panier', args=[self.plats[0].pk]))
+
+        response = self.client.post(reverse('valider_panier'))
+
+        self.assertRedirects(response, reverse('Mes_commande'))
+        commande = Commande.objects.get()
+        self.assertEqual(commande.nbPlat, 4)
+        self.assertEqual(commande.montant, 2 * 1000 + 2000 + 3000)
+        self.assertEqual(self.client.session['panier'], {})
+
+    def test_historique_lit_les_lignes_en_une_requete(self):
+        for _ in range(3):
+            passer_commande(self.client_user, {plat.pk: 1 for plat in self.plats})
+        self.client.force_login(self.client_user)
+
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(reverse('Mes_commande'))
+
+        self.assertEqual(response.status_code, 200)
+        lectures_lignes = [
+            q for q in requetes.captured_queries if 'FROM "commandes_lignecommande"' in q['sql']
+        ]
+        self.assertEqual(len(lectures_lignes), 1)
+
+    def test_detail_ajax_liste_les_lignes(self):
+        commande = passer_commande(self.client_user, {self.plats[0].pk: 2, self.plats[1].pk: 1})
+        self.client.force_login(self.client_user)
+
+        response = self.client.get(reverse('commande_detail_ajax', args=[commande.pk]))
+
+        self.assertEqual(
+            [(ligne['nom'], ligne['quantite']) for ligne in response.json()['lignes']],
+            [('Plat 1', 2), ('Plat 2', 1)],
+        )
+
+
+class TransitionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Koki', description='...', prix=1500, stock=20)
+
+    def test_transition_interdite(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+
+        with self.assertRaises(TransitionInterdite):
+            changer_statut_commande(commande, Commande.StatusChoices.COMPLETED)
+        self.assertEqual(changer_statut(Commande.objects.all(), Commande.StatusChoices.COMPLETED), 0)
+
+    def test_compare_and_set(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 2})
+        cuisine = Commande.objects.get(pk=commande.pk)
+        client = Commande.objects.get(pk=commande.pk)
+
+        self.assertTrue(changer_statut_commande(cuisine, Commande.StatusChoices.PREPARING))
+        # Le client a lu « en attente » : son annulation ne doit rien écraser
+        self.assertFalse(annuler_commande(client))
+
+        commande.refresh_from_db()
+        self.plat.refresh_from_db()
+        self.assertEqual(commande.status, Commande.StatusChoices.PREPARING)
+        self.assertEqual(self.plat.stock, 18)
+
+    def test_transition_groupee_et_historique(self):
+        commandes = [passer_commande(self.client_user, {self.plat.pk: 1}) for _ in range(4)]
+        changer_statut(Commande.objects.filter(pk__in=[commandes[0].pk, commandes[1].pk]), 'preparing')
+        changer_statut(Commande.objects.filter(pk=commandes[1].pk), 'ready')
+
+        with CaptureQueriesContext(connection) as requetes:
+            annulees = annuler_commandes(Commande.objects.all(), statuts_annulables=['pending', 'preparing', 'ready'])
+
+        sql = [requete['sql'] for requete in requetes.captured_queries]
+        self.assertEqual(annulees, 3)
+        self.assertEqual(len([q for q in sql if q.startswith('UPDATE "commandes_commande"')]), 1)
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "commandes_historiquestatut"')]), 1)
+        self.assertEqual(Commande.objects.get(pk=commandes[1].pk).status, 'ready')
+        self.assertEqual(
+            list(HistoriqueStatut.objects.filter(commande=commandes[0]).values_list('ancien_statut', 'nouveau_statut')),
+            [('pending', 'preparing'), ('preparing', 'failed')],
+        )
+
+    def test_annulation_par_le_client_journalisee(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+        self.client.force_login(self.client_user)
+
+        self.client.post(reverse('cancel_commande', args=[commande.pk]))
+
+        historique = HistoriqueStatut.objects.get(commande=commande)
+        self.assertEqual((historique.nouveau_statut, historique.auteur), ('failed', self.client_user))
+
+    def test_admin_ne_propose_que_les_transitions_autorisees(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+
+        formulaire = CommandeForm(instance=commande)
+
+        self.assertEqual(
+            [valeur for valeur, _ in formulaire.fields['status'].choices],
+            ['pending', 'preparing', 'failed'],
+        )
+
+
+class BrokerEnregistreur(Broker):
+    """Broker de test : garde les messages publiés."""
+    messages = []
+
+    def publier(self, canal, message):
+        self.messages.append((canal, message))
+
+
+@override_settings(COMMANDES_BROKER='commandes.tests.BrokerEnregistreur')
+class EvenementsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Achu', description='...', prix=3000, stock=10)
+
+    def setUp(self):
+        BrokerEnregistreur.messages = []
+
+    def test_publies_apres_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            commande = passer_commande(self.client_user, {self.plat.pk: 2})
+            self.assertEqual(BrokerEnregistreur.messages, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            changer_statut_commande(commande, Commande.StatusChoices.PREPARING)
+
+        creation, transition = [message for canal, message in BrokerEnregistreur.messages if canal == CANAL_CUISINE]
+        self.assertEqual(
+            [canal for canal, _ in BrokerEnregistreur.messages if canal != CANAL_CUISINE],
+            [suivi.canal_client(self.client_user.pk)] * 2,
+        )
+        self.assertEqual(creation['type'], 'commande')
+        self.assertEqual(creation['lignes'], [{'nom': 'Achu', 'quantite': 2}])
+        self.assertEqual(transition['commandes'][0]['ancien'], 'pending')
+        self.assertEqual(
+            [suivant['valeur'] for suivant in transition['commandes'][0]['statuts_suivants']],
+            ['ready', 'failed'],
+        )
+
+    def test_rien_si_la_transaction_est_annulee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(StockInsuffisant):
+                passer_commande(self.client_user, {self.plat.pk: 50})
+
+        self.assertEqual(BrokerEnregistreur.messages, [])
+
+
+class TableauCuisineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cuisinier = User.objects.create_user('cuisine', password='secret', is_staff=True)
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Sanga', description='...', prix=2000, stock=10)
+
+    async def test_local_broker(self):
+        broker = LocalBroker()
+        abonnement = broker.abonner('canal')
+
+        await asyncio.to_thread(broker.publier, 'canal', {'type': 'test'})
+
+        self.assertEqual(await abonnement.recevoir(timeout=1), {'type': 'test'})
+        abonnement.fermer()
+        broker.publier('canal', {'type': 'perdu'})
+        self.assertTrue(abonnement._file.empty())
+
+    def test_tableau_reserve_au_personnel(self):
+        passer_commande(self.client_user, {self.plat.pk: 1})
+
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get(reverse('tableau_cuisine')).status_code, 302)
+
+        self.client.force_login(self.cuisinier)
+        response = self.client.get(reverse('tableau_cuisine'))
+        self.assertContains(response, 'Sanga')
+
+    async def test_flux_sse(self):
+        await self.async_client.aforce_login(self.cuisinier)
+
+        response = await self.async_client.get(reverse('flux_cuisine'))
+        flux = aiter(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(flux), b'retry: 3000\n\n')
+        get_broker().publier(CANAL_CUISINE, {'type': 'statuts', 'commandes': []})
+        self.assertEqual(
+            await asyncio.wait_for(anext(flux), 1),
+            b'event: statuts\ndata: {"type": "statuts", "commandes": []}\n\n',
+        )
+        await flux.aclose()
+
+    def test_changement_de_statut(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+        self.client.force_login(self.cuisinier)
+        url = reverse('changer_statut_cuisine', args=[commande.pk])
+
+        self.assertEqual(self.client.post(url, {'statut': 'completed'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'statut': 'preparing'}).status_code, 200)
+        self.assertEqual(HistoriqueStatut.objects.get(commande=commande).auteur, self.cuisinier)
+
+
+class ActionsAdminTest(TestCase):
+    """Les actions groupées de l'admin font un nombre de requêtes indépendant du nombre de commandes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='secret')
+        cls.clients = [User.objects.create_user(f'client{i}', password='secret') for i in range(3)]
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plats = [
+            Plat.objects.create(categorie=categorie, nom=f'Plat {i}', description='...', prix=1000, stock=500)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # Met l'utilisateur en cache : les deux mesures partent du même état
+        self.client.get(reverse('admin:index'))
+
+    def commander(self, nombre):
+        return [
+            passer_commande(self.clients[i % 3], {self.plats[i % 3].pk: 2, self.plats[(i + 1) % 3].pk: 1})
+            for i in range(nombre)
+        ]
+
+    def executer(self, action, commandes):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.post(reverse('admin:commandes_commande_changelist'), {
+                'action': action,
+                '_selected_action': [commande.pk for commande in commandes],
+            })
+        self.assertEqual(response.status_code, 302)
+        return len(requetes.captured_queries)
+
+    def assertNombreDeRequetesConstant(self, action, preparer=None):
+        petites, grandes = self.commander(2), self.commander(20)
+        if preparer:
+            preparer(petites + grandes)
+        self.assertEqual(self.executer(action, petites), self.executer(action, grandes))
+
+    def test_annulation(self):
+        self.assertNombreDeRequetesConstant('mark_cancelled')
+
+        self.assertFalse(Commande.objects.exclude(status='failed').exists())
+        for plat in Plat.objects.all():
+            self.assertEqual(plat.stock, 500)
+
+    def test_changement_de_statut(self):
+        self.assertNombreDeRequetesConstant('mark_preparing')
+
+        self.assertFalse(Commande.objects.exclude(status='preparing').exists())
+
+    def test_recalcul_des_montants(self):
+        def changer_les_prix(commandes):
+            Plat.objects.update(prix=1500)
+
+        self.assertNombreDeRequetesConstant('recalculate_montant', changer_les_prix)
+
+        self.assertEqual(set(Commande.objects.values_list('montant', flat=True)), {3 * 1500})
+        self.assertEqual(
+            sum(StatistiquesClient.objects.values_list('total_spent', flat=True)),
+            22 * 3 * 1500,
+        )
+
+
+class AdminCommandeTest(TestCase):
+    """Le formulaire d'une commande existante ne touche ni aux lignes ni au stock."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='secret')
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Ndolé', description='...', prix=2000, stock=10)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_lignes_en_lecture_seule_et_montant_recalcule(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 2})
+        Commande.objects.filter(pk=commande.pk).update(montant=1)
+        ligne = commande.lignes.get()
+
+        response = self.client.post(reverse('admin:commandes_commande_change', args=[commande.pk]), {
+            'client': self.client_user.pk,
+            'status': commande.status,
+            'notes': '',
+            'lignes-TOTAL_FORMS': 2,
+            'lignes-INITIAL_FORMS': 1,
+            'lignes-0-id': ligne.pk,
+            'lignes-0-commande': commande.pk,
+            'lignes-0-plat': self.plat.pk,
+            'lignes-0-quantite': 9,
+            'lignes-0-prix_unitaire': 1,
+            'lignes-0-DELETE': 'on',
+            'lignes-1-plat': self.plat.pk,
+            'lignes-1-quantite': 5,
+            'lignes-1-prix_unitaire': 2000,
+            'historique-TOTAL_FORMS': 0,
+            'historique-INITIAL_FORMS': 0,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(commande.lignes.values_list('quantite', 'prix_unitaire')),
+            [(2, 2000)],
+        )
+        self.plat.refresh_from_db()
+        self.assertEqual(self.plat.stock, 8)
+        commande.refresh_from_db()
+        self.assertEqual((commande.nbPlat, commande.montant), (2, 4000))
+
+
+class StockConcurrencyTest(TransactionTestCase):
+    """
+    Test de charge : des centaines de commandes simultanées sur un même plat.
+    Le nombre de commandes acceptées doit être exactement égal au stock initial.
+    """
+    STOCK_INITIAL = 100
+    NB_COMMANDES = 300
+    NB_THREADS = 16
+
+    def setUp(self):
+        self.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        self.plat = Plat.objects.create(
+            categorie=categorie,
+            nom='Ndolé',
+            description='Ndolé crevettes',
+            prix=4000,
+            stock=self.STOCK_INITIAL,
+        )
+
+    def test_aucune_survente(self):
+        acceptees = []
+        refusees = []
+        verrou = threading.Lock()
+
+        def commander(_):
+            try:
+                passer_commande(self.client_user, {self.plat.pk: 1})
+                resultat = acceptees
+            except StockInsuffisant:
+                resultat = refusees
+            finally:
+                connection.close()
+            with verrou:
+                resultat.append(1)
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.NB_THREADS) as executor:
+            list(executor.map(commander, range(self.NB_COMMANDES)))
+        duree = time.perf_counter() - debut
+
+        sys.stderr.write(
+            f"\n[stock] {self.NB_COMMANDES} commandes / {self.NB_THREADS} threads "
+            f"en {duree:.2f}s ({self.NB_COMMANDES / duree:.0f} commandes/s), "
+            f"{len(acceptees)} acceptées, {len(refusees)} refusées\n"
+        )
+
+        self.plat.refresh_from_db()
+        self.assertEqual(len(acceptees), self.STOCK_INITIAL)
+        self.assertEqual(len(refusees), self.NB_COMMANDES - self.STOCK_INITIAL)
+        self.assertEqual(self.plat.stock, 0)
+        self.assertFalse(self.plat.disponible)
+        self.assertEqual(Commande.objects.filter(lignes__plat=self.plat).count(), self.STOCK_INITIAL)
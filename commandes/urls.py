@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.tableau_cuisine, name='tableau_cuisine'),
+    path('flux/', views.flux_cuisine, name='flux_cuisine'),
+    path('commande/<int:commande_id>/statut/', views.changer_statut_cuisine, name='changer_statut_cuisine'),
+]
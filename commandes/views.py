@@ -1,3 +1,85 @@
-from django.shortcuts import render
+import asyncio
+import json
 
-# Create your views here.
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.http import require_POST
+
+from .evenements import CANAL_CUISINE, get_broker
+from .models import Commande, LigneCommande
+from .services import TransitionInterdite, changer_statut_commande
+
+# Statuts affichés sur le tableau de la cuisine, dans l'ordre des colonnes
+STATUTS_CUISINE = [
+    Commande.StatusChoices.PENDING,
+    Commande.StatusChoices.PREPARING,
+    Commande.StatusChoices.READY,
+    Commande.StatusChoices.DELIVERING,
+]
+# Un commentaire SSE régulier garde la connexion ouverte derrière les proxys
+INTERVALLE_PING = 15
+
+
+@staff_member_required
+def tableau_cuisine(request):
+    """
+    Tableau de la cuisine : les commandes en cours, chargées une seule fois,
+    puis tenues à jour par le flux `flux_cuisine` (Server-Sent Events).
+    """
+    commandes = (
+        Commande.objects.filter(status__in=STATUTS_CUISINE)
+        .select_related('client')
+        .prefetch_related(Prefetch('lignes', queryset=LigneCommande.objects.select_related('plat')))
+        .order_by('created_at')
+    )
+    colonnes = {statut: [] for statut in STATUTS_CUISINE}
+    for commande in commandes:
+        colonnes[commande.status].append(commande)
+
+    return render(request, 'commandes/cuisine.html', {
+        'colonnes': [(statut, statut.label, colonnes[statut]) for statut in STATUTS_CUISINE],
+    })
+
+
+@staff_member_required
+async def flux_cuisine(request):
+    """
+    Flux Server-Sent Events des nouvelles commandes et des changements de
+    statut. Une connexion longue par écran ; à servir par `restaurant/asgi.py`
+    (sous WSGI, chaque écran immobiliserait un worker).
+    """
+    abonnement = get_broker().abonner(CANAL_CUISINE)
+
+    async def evenements():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    message = await abonnement.recevoir(timeout=INTERVALLE_PING)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            abonnement.fermer()
+
+    response = StreamingHttpResponse(evenements(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+@require_POST
+def changer_statut_cuisine(request, commande_id: int):
+    """Fait avancer une commande depuis le tableau ; le tableau se met à jour par le flux."""
+    commande = get_object_or_404(Commande, pk=commande_id)
+    try:
+        change = changer_statut_commande(commande, request.POST.get('statut'), auteur=request.user)
+    except TransitionInterdite:
+        return JsonResponse({'error': 'Transition non autorisée'}, status=400)
+    if not change:
+        return JsonResponse({'error': 'La commande a changé de statut entre-temps'}, status=409)
+    return JsonResponse({'success': True, 'status': commande.status})
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import StatistiquesClient
 
-# Register your models here.
+
+@admin.register(StatistiquesClient)
+class StatistiquesClientAdmin(admin.ModelAdmin):
+    list_display = ('client', 'total', 'pending', 'completed', 'failed', 'total_spent', 'updated_at')
+    list_select_related = ('client',)
+    search_fields = ('client__username', 'client__email')
+    readonly_fields = ('client', 'total', 'pending', 'completed', 'failed', 'total_spent', 'updated_at')
+
+    def has_add_permission(self, request):
+        """Les statistiques sont calculées automatiquement."""
+        return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CompteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'compte'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,86 @@
+"""
+Authentification avec l'utilisateur gardé en cache.
+
+`AuthenticationMiddleware` recharge l'utilisateur de la session à chaque
+requête. Ce backend garde une copie de la ligne `auth_user` en cache
+(``compte:utilisateur:<pk>``) : une page vue par un client connecté ne lit
+plus la table. La copie est supprimée après le commit de tout
+enregistrement de l'utilisateur (connexion, mot de passe, droits...), voir
+compte/signals.py ; le hachage de session reste vérifié par Django avec le
+mot de passe de la copie. Les permissions ne sont pas dans la copie : elles
+sont lues à la demande, comme avec `ModelBackend`.
+
+Les deux backends vérifient les mots de passe des connexions asynchrones
+(`aauthenticate`) dans le pool de hachage de restaurant/asynchrone.py.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import verify_password
+from django.core.cache import cache
+from django.db import transaction
+
+from restaurant.asynchrone import ahacher_mot_de_passe, hors_boucle
+
+DUREE = 60 * 60
+
+
+def cle_utilisateur(user_id) -> str:
+    return f'compte:utilisateur:{user_id}'
+
+
+def oublier_utilisateur(user_id):
+    """À appeler dans la transaction qui modifie l'utilisateur."""
+    transaction.on_commit(lambda: cache.delete(cle_utilisateur(user_id)))
+
+
+class ModelBackendHorsBoucle(ModelBackend):
+    """
+    `ModelBackend` dont `aauthenticate` lit l'utilisateur par l'ORM asynchrone et
+    vérifie le mot de passe dans le pool de hachage, au lieu de tout confier au
+    thread unique de `sync_to_async`. Appelé par `django.contrib.auth.aauthenticate`
+    (signal `user_login_failed`, autres backends).
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Même durée qu'un mauvais mot de passe : ne révèle pas les comptes existants
+            await ahacher_mot_de_passe(password)
+            return None
+
+        correct, a_mettre_a_jour = await hors_boucle(verify_password, password, user.password)
+        if not correct:
+            return None
+        if a_mettre_a_jour:
+            # Algorithme ou nombre d'itérations changé depuis la création du compte
+            user.password = await ahacher_mot_de_passe(password)
+            await user.asave(update_fields=['password'])
+        return user if self.user_can_authenticate(user) else None
+
+
+class ModelBackendEnCache(ModelBackendHorsBoucle):
+    """`ModelBackend` dont `get_user` lit d'abord le cache (seuls les comptes actifs y sont mis)."""
+
+    def get_user(self, user_id):
+        cle = cle_utilisateur(user_id)
+        user = cache.get(cle)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(cle, user, DUREE)
+        return user
+
+    async def aget_user(self, user_id):
+        cle = cle_utilisateur(user_id)
+        user = await cache.aget(cle)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(cle, user, DUREE)
+        return user
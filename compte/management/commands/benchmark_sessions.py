@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+PAGES = ['home', 'menu', 'laisser_avis', 'Mes_commande', 'mes_reservations']
+HOTE = '127.0.0.1'
+# Réglages par défaut de Django : sessions en base, utilisateur relu à chaque requête,
+# messages en cookie avec repli sur la session
+AVANT = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}
+# Réglages du projet avec un cache partagé (CACHE_BACKEND) ; dans un seul processus, le cache mémoire suffit
+APRES = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['compte.backends.ModelBackendEnCache'],
+}
+TABLES = ('django_session', 'auth_user')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compte les requêtes SQL par page, anonyme et connecté, avec les réglages de session par défaut "
+        "de Django (avant) et ceux du projet avec un cache partagé (après), en distinguant celles qui lisent les sessions et "
+        "l'utilisateur. Les pages sont appelées dans le processus ; un client est créé puis supprimé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requetes', type=int, default=20, help="Requêtes par page et par mesure.")
+        parser.add_argument('--page', action='append', dest='pages', help="Nom d'URL à mesurer (répétable).")
+
+    def handle(self, *args, **options):
+        chemins = [reverse(page) for page in options['pages'] or PAGES]
+        user = User.objects.create_user('benchmark-sessions', password=None)
+        try:
+            for profil in ('anonyme', 'connecté'):
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{profil}'))
+                for chemin in chemins:
+                    avant = self.mesurer(AVANT, chemin, user if profil == 'connecté' else None, options['requetes'])
+                    apres = self.mesurer(APRES, chemin, user if profil == 'connecté' else None, options['requetes'])
+                    self.stdout.write(f'  {chemin:<28} avant {self.resume(avant)}   après {self.resume(apres)}')
+        finally:
+            user.delete()
+
+    def resume(self, mesure):
+        requetes, session, duree = mesure
+        return f'{requetes:5.1f} requêtes ({session:4.1f} session/utilisateur) {duree:6.2f} ms'
+
+    def mesurer(self, reglages, chemin, user, requetes):
+        """(requêtes SQL par requête, dont sessions et utilisateur, médiane en ms), après une requête de chauffe."""
+        with override_settings(**reglages):
+            client = Client(HTTP_HOST=HOTE)
+            if user is not None:
+                client.force_login(user)
+            client.get(chemin)
+            nombres, session, durees = [], [], []
+            for _ in range(requetes):
+                with CaptureQueriesContext(connection) as capture:
+                    debut = time.perf_counter()
+                    client.get(chemin)
+                    durees.append((time.perf_counter() - debut) * 1000)
+                nombres.append(len(capture))
+                session.append(sum(
+                    any(table in requete['sql'] for table in TABLES) for requete in capture.captured_queries
+                ))
+        return statistics.mean(nombres), statistics.mean(session), statistics.median(durees)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from compte import stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques de commandes des clients à partir des commandes existantes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('clients', nargs='*', type=int, help="Identifiants des clients (tous par défaut).")
+
+    def handle(self, *args, **options):
+        nombre = stats.recalculer(options['clients'] or None)
+        self.stdout.write(self.style.SUCCESS(f"{nombre} client(s) recalculé(s)."))
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 04:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiquesClient',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistiques', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0, verbose_name='Commandes')),
+                ('pending', models.IntegerField(default=0, verbose_name='En attente')),
+                ('completed', models.IntegerField(default=0, verbose_name='Livrées')),
+                ('failed', models.IntegerField(default=0, verbose_name='Annulées')),
+                ('total_spent', models.BigIntegerField(default=0, verbose_name='Montant cumulé (FCFA)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+            ],
+            options={
+                'verbose_name': 'Statistiques client',
+                'verbose_name_plural': 'Statistiques clients',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 04:08
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def remplir_statistiques(apps, schema_editor):
+    """Calcule les statistiques des clients ayant déjà des commandes."""
+    Commande = apps.get_model('commandes', 'Commande')
+    StatistiquesClient = apps.get_model('compte', 'StatistiquesClient')
+
+    agregats = Commande.objects.order_by().values('client').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        completed=Count('id', filter=Q(status='completed')),
+        failed=Count('id', filter=Q(status='failed')),
+        total_spent=Coalesce(Sum('montant'), 0),
+    )
+    StatistiquesClient.objects.bulk_create(
+        [StatistiquesClient(client_id=agregat.pop('client'), **agregat) for agregat in agregats],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compte', '0001_initial'),
+        ('commandes', '0003_lignecommande'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_statistiques, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,30 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class StatistiquesClient(models.Model):
+    """
+    Statistiques de commandes d'un client, tenues à jour à chaque création
+    de commande et à chaque changement de statut (voir compte/stats.py).
+    L'historique des commandes les lit en une seule ligne au lieu d'agréger
+    toutes les commandes du client à chaque affichage.
+    """
+    client = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='statistiques'
+    )
+    total = models.IntegerField('Commandes', default=0)
+    pending = models.IntegerField('En attente', default=0)
+    completed = models.IntegerField('Livrées', default=0)
+    failed = models.IntegerField('Annulées', default=0)
+    total_spent = models.BigIntegerField('Montant cumulé (FCFA)', default=0)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière modification")
+
+    class Meta:
+        verbose_name = "Statistiques client"
+        verbose_name_plural = "Statistiques clients"
+
+    def __str__(self):
+        return f"Statistiques de {self.client_id}"
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from commandes.models import Commande
+from . import stats
+from .backends import cle_utilisateur, oublier_utilisateur
+
+
+@receiver(post_delete, sender=Commande)
+def commande_supprimee(sender, instance, **kwargs):
+    stats.commandes_supprimees([instance])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def utilisateur_modifie(sender, instance, created=False, **kwargs):
+    if created:
+        # Identifiant déjà attribué puis annulé (rollback, base de test) : aucune copie d'un autre compte
+        cache.delete(cle_utilisateur(instance.pk))
+    else:
+        oublier_utilisateur(instance.pk)
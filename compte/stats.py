@@ -0,0 +1,129 @@
+"""
+Mise à jour incrémentale de `StatistiquesClient`.
+
+Chaque fonction applique des deltas avec des expressions `F()` : un INSERT
+« ignore » qui crée les lignes manquantes, puis un seul UPDATE pour tous
+les clients concernés. À appeler dans la transaction qui modifie les
+commandes, pour que les compteurs restent cohérents avec elles.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from commandes.models import Commande
+from .models import StatistiquesClient
+
+# Statuts de commande suivis par un compteur dédié
+CHAMPS_STATUT = {
+    'pending': 'pending',
+    'completed': 'completed',
+    'failed': 'failed',
+}
+
+
+def appliquer_deltas(deltas: dict, creer: bool = True):
+    """
+    Applique {client_id: {champ: delta}} en un seul UPDATE.
+    `creer=False` ne touche qu'aux lignes existantes (suppression d'un client).
+    """
+    deltas = {
+        client_id: {champ: delta for champ, delta in champs.items() if delta}
+        for client_id, champs in deltas.items()
+    }
+    deltas = {client_id: champs for client_id, champs in deltas.items() if champs}
+    if not deltas:
+        return
+
+    if creer:
+        StatistiquesClient.objects.bulk_create(
+            [StatistiquesClient(client_id=client_id) for client_id in deltas],
+            ignore_conflicts=True,
+        )
+
+    champs = {champ for valeurs in deltas.values() for champ in valeurs}
+    StatistiquesClient.objects.filter(client_id__in=deltas).update(**{
+        champ: F(champ) + Case(
+            *[
+                When(client_id=client_id, then=Value(valeurs[champ]))
+                for client_id, valeurs in deltas.items() if champ in valeurs
+            ],
+            default=Value(0),
+        )
+        for champ in champs
+    })
+
+
+def commandes_creees(commandes):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for commande in commandes:
+        deltas[commande.client_id]['total'] += 1
+        deltas[commande.client_id]['total_spent'] += commande.montant
+        if commande.status in CHAMPS_STATUT:
+            deltas[commande.client_id][CHAMPS_STATUT[commande.status]] += 1
+    appliquer_deltas(deltas)
+
+
+def commandes_supprimees(commandes):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for commande in commandes:
+        deltas[commande.client_id]['total'] -= 1
+        deltas[commande.client_id]['total_spent'] -= commande.montant
+        if commande.status in CHAMPS_STATUT:
+            deltas[commande.client_id][CHAMPS_STATUT[commande.status]] -= 1
+    appliquer_deltas(deltas, creer=False)
+
+
+def statuts_modifies(transitions):
+    """`transitions` : itérable de (client_id, ancien_statut, nouveau_statut)."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for client_id, ancien, nouveau in transitions:
+        if ancien == nouveau:
+            continue
+        if ancien in CHAMPS_STATUT:
+            deltas[client_id][CHAMPS_STATUT[ancien]] -= 1
+        if nouveau in CHAMPS_STATUT:
+            deltas[client_id][CHAMPS_STATUT[nouveau]] += 1
+    appliquer_deltas(deltas)
+
+
+def montants_modifies(differences: dict):
+    """`differences` : {client_id: variation du montant cumulé}."""
+    appliquer_deltas({client_id: {'total_spent': delta} for client_id, delta in differences.items()})
+
+
+def recalculer(client_ids=None):
+    """
+    Recalcule les statistiques à partir des commandes (réparation ou reprise
+    de données). Une requête d'agrégation groupée par client, puis un upsert.
+    """
+    commandes = Commande.objects.all()
+    statistiques = StatistiquesClient.objects.all()
+    if client_ids is not None:
+        commandes = commandes.filter(client_id__in=client_ids)
+        statistiques = statistiques.filter(client_id__in=client_ids)
+
+    agregats = commandes.order_by().values('client').annotate(
+        total=Count('id'),
+        total_spent=Coalesce(Sum('montant'), 0),
+        **{
+            champ: Count('id', filter=Q(status=statut))
+            for statut, champ in CHAMPS_STATUT.items()
+        },
+    )
+    lignes = [
+        StatistiquesClient(client_id=agregat.pop('client'), **agregat)
+        for agregat in agregats
+    ]
+    champs = ['total', 'total_spent', *CHAMPS_STATUT.values()]
+    StatistiquesClient.objects.bulk_create(
+        lignes,
+        update_conflicts=True,
+        unique_fields=['client'],
+        update_fields=champs,
+    )
+    # Clients dont toutes les commandes ont disparu
+    statistiques.exclude(client_id__in=[ligne.client_id for ligne in lignes]).update(
+        **{champ: 0 for champ in champs}
+    )
+    return len(lignes)
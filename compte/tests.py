@@ -1,3 +1,135 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from commandes.models import Commande
+from commandes.services import annuler_commande, changer_statut, passer_commande
+from menu.models import CategorieMenu, Plat
+from restaurant.testing import REGLAGES_CACHE_PARTAGE
+from .models import StatistiquesClient
+
+
+class StatistiquesClientTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Eru', description='...', prix=2500, stock=50)
+
+    def stats(self):
+        return StatistiquesClient.objects.get(client=self.client_user)
+
+    def test_creation_de_commande(self):
+        passer_commande(self.client_user, {self.plat.pk: 2})
+        passer_commande(self.client_user, {self.plat.pk: 1})
+
+        stats = self.stats()
+        self.assertEqual((stats.total, stats.pending, stats.total_spent), (2, 2, 7500))
+
+    def test_annulation_et_livraison(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+        autre = passer_commande(self.client_user, {self.plat.pk: 1})
+
+        annuler_commande(commande)
+        for statut in ('preparing', 'ready', 'completed'):
+            changer_statut(Commande.objects.filter(pk=autre.pk), statut)
+
+        stats = self.stats()
+        self.assertEqual((stats.pending, stats.completed, stats.failed), (0, 1, 1))
+
+    def test_suppression_de_commande(self):
+        commande = passer_commande(self.client_user, {self.plat.pk: 1})
+
+        commande.delete()
+
+        stats = self.stats()
+        self.assertEqual((stats.total, stats.pending, stats.total_spent), (0, 0, 0))
+
+    def test_action_admin(self):
+        for _ in range(5):
+            passer_commande(self.client_user, {self.plat.pk: 1})
+        admin = User.objects.create_superuser('admin', password='secret')
+        self.client.force_login(admin)
+
+        self.client.post(reverse('admin:commandes_commande_changelist'), {
+            'action': 'mark_preparing',
+            '_selected_action': list(Commande.objects.values_list('pk', flat=True)),
+        })
+
+        stats = self.stats()
+        self.assertEqual((stats.total, stats.pending), (5, 0))
+        self.assertEqual(Commande.objects.filter(status='preparing').count(), 5)
+
+    def test_recalcul(self):
+        passer_commande(self.client_user, {self.plat.pk: 3})
+        StatistiquesClient.objects.update(total=0, pending=0, total_spent=0)
+
+        call_command('recalculer_statistiques', stdout=StringIO())
+
+        stats = self.stats()
+        self.assertEqual((stats.total, stats.pending, stats.total_spent), (1, 1, 7500))
+
+    def test_historique_lit_les_statistiques(self):
+        passer_commande(self.client_user, {self.plat.pk: 2})
+        self.client.force_login(self.client_user)
+
+        response = self.client.get(reverse('Mes_commande'))
+
+        self.assertEqual(response.context['stats'].total_spent, 5000)
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class SessionEnCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_user = User.objects.create_user('client', password='secret')
+        self.client.force_login(self.client_user)
+
+    def requetes_session(self, url):
+        with CaptureQueriesContext(connection) as capture:
+            response = self.client.get(url)
+        return response, [
+            requete['sql'] for requete in capture.captured_queries
+            if 'django_session' in requete['sql'] or 'auth_user' in requete['sql']
+        ]
+
+    def test_ni_session_ni_utilisateur_lus_en_base(self):
+        self.client.get(reverse('Mes_commande'))
+
+        response, requetes = self.requetes_session(reverse('Mes_commande'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.client_user)
+        self.assertEqual(requetes, [])
+
+    def test_changement_de_mot_de_passe_deconnecte(self):
+        self.client.get(reverse('Mes_commande'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_user.set_password('nouveau')
+            self.client_user.save()
+        response = self.client.get(reverse('Mes_commande'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_messages_en_cookie(self):
+        self.client.get(reverse('commande', args=[0]))
+
+        response, requetes = self.requetes_session(reverse('menu'))
+
+        self.assertIn('messages', self.client.cookies)
+        self.assertEqual(requetes, [])
+
+    def test_benchmark(self):
+        sortie = StringIO()
+
+        call_command('benchmark_sessions', '--requetes', '1', '--page', 'home', stdout=sortie)
+
+        self.assertIn('avant', sortie.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-sessions').exists())
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 15:20
+
+import restaurant.medias
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('experiance', '0002_temoignage_image_derives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='temoignage',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=restaurant.medias.stockage_images, upload_to='temoignages/', verbose_name='Photo (optionnel)'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from restaurant.medias import stockage_images
+
 
 class Temoignage(models.Model):
     auteur = models.CharField(max_length=100, verbose_name="Nom du client")
@@ -11,7 +13,11 @@ class Temoignage(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         verbose_name="Note (étoiles)"
     )
-    image = models.ImageField(upload_to='temoignages/', blank=True, null=True, verbose_name="Photo (optionnel)")
+    image = models.ImageField(
+        upload_to='temoignages/', storage=stockage_images, blank=True, null=True, verbose_name="Photo (optionnel)"
+    )
+    # Versions réduites de la photo, générées en arrière-plan (restaurant/images.py)
+    image_derives = models.JSONField(default=dict, blank=True, editable=False)
     date_creation = models.DateTimeField(auto_now_add=True)
 
     # Important : Pour modérer les avis avant affichage
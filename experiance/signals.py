@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from . import taches
+from .models import Temoignage
+
+
+@receiver(pre_save, sender=Temoignage)
+def memoriser_envoi(sender, instance, **kwargs):
+    # Photo envoyée avec ce formulaire (pas encore écrite dans le stockage)
+    instance._image_envoyee = bool(instance.image) and not instance.image._committed
+
+
+@receiver(post_save, sender=Temoignage)
+def deriver_image(sender, instance, **kwargs):
+    if getattr(instance, '_image_envoyee', False):
+        taches.deriver_photo_avis.differer(instance.pk, instance.image.name)
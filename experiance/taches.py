@@ -0,0 +1,9 @@
+from restaurant import images
+from taches.file import tache
+from .models import Temoignage
+
+
+@tache
+def deriver_photo_avis(temoignage_id: int, nom: str):
+    """Images dérivées de la photo `nom` d'un avis."""
+    images.deriver(Temoignage, temoignage_id, nom)
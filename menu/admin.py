@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from .models import Plat, CategorieMenu  # ✅ On n'importe que les modèles de menu
 
@@ -34,6 +35,9 @@ class PlatMenuAdmin(admin.ModelAdmin):
         'disponible'
     )
 
+    # Plat.__str__ affiche la catégorie : une jointure plutôt qu'une requête par ligne
+    list_select_related = ('categorie',)
+
     fieldsets = (
         (None, {
             'fields': ('categorie', 'nom', 'description', 'prix','stock')
@@ -50,6 +54,10 @@ class PlatMenuAdmin(admin.ModelAdmin):
 
     prix_fcfa.short_description = 'Prix'
 
+    def get_queryset(self, request):
+        # Aussi utilisé par l'autocomplétion des lignes de commande
+        return super().get_queryset(request).select_related('categorie')
+
 
 # --- Modèle CategorieMenu ---
 
@@ -60,8 +68,12 @@ class CategorieMenuAdmin(admin.ModelAdmin):
     ordering = ('ordre',)
     search_fields = ('nom',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nb_plats=Count('plats'))
+
     def count_plats(self, obj):
         """Affiche le nombre de plats dans cette catégorie."""
-        return obj.plats.count()
+        return obj.nb_plats
 
     count_plats.short_description = 'Nb. Plats'
+    count_plats.admin_order_field = 'nb_plats'
@@ -0,0 +1,229 @@
+"""
+Cache des blocs de la carte (`/menu/carte/`).
+
+Chaque catégorie est rendue une fois puis mise en cache sous une clé
+versionnée ; modifier un plat ou son stock incrémente seulement la version
+de sa catégorie. La liste ordonnée des catégories (l'index) a sa propre
+version, incrémentée quand une catégorie est créée, modifiée ou supprimée.
+Un affichage entièrement en cache ne fait donc aucune requête SQL.
+
+Toute invalidation met aussi à jour `CLE_VERSION_MENU`, un horodatage
+global (en nanosecondes) qui sert d'ETag et de Last-Modified à l'API JSON.
+Sans cache partagé, versions et blocs expirent au bout de quelques secondes
+(restaurant/cache.py).
+"""
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from restaurant.cache import duree
+
+from .models import CategorieMenu, Plat
+
+CLE_VERSION_INDEX = 'menu:carte:version:index'
+CLE_VERSION_MENU = 'menu:version'
+DUREE = 60 * 60 * 24
+
+
+def _cle_version_categorie(categorie_id):
+    return f'menu:carte:version:categorie:{categorie_id}'
+
+
+def _nouvelle_version():
+    # Une version basée sur l'horloge ne peut pas retomber sur une ancienne
+    # valeur si le compteur a été évincé du cache
+    return time.time_ns()
+
+
+def _versions(cles):
+    versions = cache.get_many(cles)
+    manquantes = {cle: _nouvelle_version() for cle in cles if cle not in versions}
+    if manquantes:
+        cache.set_many(manquantes, duree(DUREE))
+        versions.update(manquantes)
+    return versions
+
+
+def _incrementer(cles):
+    for cle in cles:
+        try:
+            cache.incr(cle)
+        except ValueError:
+            cache.set(cle, _nouvelle_version(), duree(DUREE))
+    cache.set(CLE_VERSION_MENU, _nouvelle_version(), duree(DUREE))
+
+
+def version_menu() -> int:
+    """Horodatage (ns) de la dernière modification connue du menu ; aucune requête SQL."""
+    return _versions([CLE_VERSION_MENU])[CLE_VERSION_MENU]
+
+
+async def aversion_menu() -> int:
+    return (await _aversions([CLE_VERSION_MENU]))[CLE_VERSION_MENU]
+
+
+def derniere_modification_menu() -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(version_menu() / 1e9, tz=datetime.timezone.utc)
+
+
+def invalider_index():
+    _incrementer([CLE_VERSION_INDEX])
+
+
+def invalider_categories(categorie_ids):
+    _incrementer([_cle_version_categorie(categorie_id) for categorie_id in set(categorie_ids)])
+
+
+def invalider_plats(plat_ids):
+    """Invalide les blocs des catégories contenant ces plats (après un changement de stock)."""
+    invalider_categories(
+        Plat.objects.filter(pk__in=plat_ids).values_list('categorie_id', flat=True).distinct()
+    )
+
+
+def _cle_index(versions):
+    return f'menu:carte:index:{versions[CLE_VERSION_INDEX]}'
+
+
+def _requete_index():
+    return CategorieMenu.objects.order_by('ordre').values_list('id', 'nom', 'description')
+
+
+def _index():
+    """Liste ordonnée [(id, nom, description)] de toutes les catégories."""
+    cle = _cle_index(_versions([CLE_VERSION_INDEX]))
+    index = cache.get(cle)
+    if index is None:
+        index = list(_requete_index())
+        cache.set(cle, index, duree(DUREE))
+    return index
+
+
+def _cles_blocs(index, versions):
+    return {
+        categorie_id: f'menu:carte:categorie:{categorie_id}:{versions[_cle_version_categorie(categorie_id)]}'
+        for categorie_id, *_ in index
+    }
+
+
+def _requete_blocs(manquants):
+    return CategorieMenu.objects.filter(pk__in=manquants).prefetch_related(
+        Prefetch('plats', queryset=Plat.objects.filter(disponible=True))
+    )
+
+
+def _rendre_bloc(categorie):
+    plats = list(categorie.plats.all())
+    return render_to_string('menu/_categorie.html', {'plats': plats}) if plats else ''
+
+
+def _categories(index, cles_blocs, blocs):
+    return [
+        {
+            'id': categorie_id,
+            'nom': nom,
+            'description': description,
+            'html': mark_safe(blocs[cles_blocs[categorie_id]]),
+        }
+        for categorie_id, nom, description in index
+        if blocs.get(cles_blocs[categorie_id])
+    ]
+
+
+def categories_de_la_carte():
+    """
+    Retourne les catégories à afficher : [{'id', 'nom', 'description', 'html'}].
+    Seuls les blocs absents du cache sont recalculés, en une requête pour
+    les catégories et une pour leurs plats disponibles.
+    Les catégories sans plat disponible sont omises.
+    """
+    index = _index()
+    cles_blocs = _cles_blocs(index, _versions([_cle_version_categorie(categorie_id) for categorie_id, *_ in index]))
+    blocs = cache.get_many(cles_blocs.values())
+
+    manquants = [categorie_id for categorie_id, cle in cles_blocs.items() if cle not in blocs]
+    if manquants:
+        nouveaux = {cles_blocs[categorie.pk]: _rendre_bloc(categorie) for categorie in _requete_blocs(manquants)}
+        cache.set_many(nouveaux, duree(DUREE))
+        blocs.update(nouveaux)
+
+    return _categories(index, cles_blocs, blocs)
+
+
+async def _aversions(cles):
+    versions = await cache.aget_many(cles)
+    manquantes = {cle: _nouvelle_version() for cle in cles if cle not in versions}
+    if manquantes:
+        await cache.aset_many(manquantes, duree(DUREE))
+        versions.update(manquantes)
+    return versions
+
+
+async def _aindex():
+    cle = _cle_index(await _aversions([CLE_VERSION_INDEX]))
+    index = await cache.aget(cle)
+    if index is None:
+        index = [ligne async for ligne in _requete_index()]
+        await cache.aset(cle, index, duree(DUREE))
+    return index
+
+
+async def acategories_de_la_carte():
+    """Version asynchrone de `categories_de_la_carte` (cache et ORM asynchrones)."""
+    index = await _aindex()
+    cles_blocs = _cles_blocs(
+        index, await _aversions([_cle_version_categorie(categorie_id) for categorie_id, *_ in index])
+    )
+    blocs = await cache.aget_many(cles_blocs.values())
+
+    manquants = [categorie_id for categorie_id, cle in cles_blocs.items() if cle not in blocs]
+    if manquants:
+        nouveaux = {
+            cles_blocs[categorie.pk]: _rendre_bloc(categorie)
+            async for categorie in _requete_blocs(manquants)
+        }
+        await cache.aset_many(nouveaux, duree(DUREE))
+        blocs.update(nouveaux)
+
+    return _categories(index, cles_blocs, blocs)
+
+
+def donnees_carte():
+    """
+    Menu complet sous forme de dictionnaire sérialisable (API JSON),
+    mis en cache pour la version courante du menu.
+    """
+    cle = f'menu:api:carte:{version_menu()}'
+    donnees = cache.get(cle)
+    if donnees is None:
+        categories = CategorieMenu.objects.order_by('ordre').prefetch_related('plats')
+        donnees = {
+            'categories': [
+                {
+                    'id': categorie.pk,
+                    'nom': categorie.nom,
+                    'description': categorie.description,
+                    'ordre': categorie.ordre,
+                    'plats': [
+                        {
+                            'id': plat.pk,
+                            'nom': plat.nom,
+                            'description': plat.description,
+                            'prix': plat.prix,
+                            'stock': plat.stock,
+                            'disponible': plat.disponible,
+                            'is_special': plat.is_special,
+                            'image': plat.image.url if plat.image else None,
+                        }
+                        for plat in categorie.plats.all()
+                    ],
+                }
+                for categorie in categories
+            ],
+        }
+        cache.set(cle, donnees, duree(DUREE))
+    return donnees
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from commandes.models import Commande, LigneCommande
+from menu.models import CategorieMenu, Plat
+from menu.recherche import filtrer_commandes, normaliser
+from restaurant.pagination import paginer_par_curseur
+
+NOMS = ['Ndolé', 'Poulet DG', 'Eru', 'Koki', 'Mbongo tchobi', 'Kondré', 'Sanga', 'Okok', 'Achu', 'Taro']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare l'ancienne recherche de l'historique (icontains sur l'id et le nom du plat) "
+        "à la recherche indexée, sur un jeu de commandes généré puis annulé (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--commandes', type=int, default=1_000_000)
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--lot', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            client = self.generer(options)
+            for libelle, recherche in (('numéro', str(Commande.objects.filter(client=client).first().pk)),
+                                       ('texte', 'ndole')):
+                self.comparer(client, libelle, recherche, options['repetitions'])
+            # Rien n'est conservé
+            transaction.set_rollback(True)
+
+    def generer(self, options):
+        debut = time.perf_counter()
+        categorie = CategorieMenu.objects.create(nom='benchmark-recherche')
+        plats = Plat.objects.bulk_create([
+            Plat(categorie=categorie, nom=f'{nom} {i}', nom_recherche=normaliser(f'{nom} {i}'),
+                 description='', prix=1000)
+            for i in range(20) for nom in NOMS
+        ])
+        clients = User.objects.bulk_create([
+            User(username=f'benchmark-recherche-{i}') for i in range(options['clients'])
+        ])
+
+        aleatoire = random.Random(0)
+        restantes = options['commandes']
+        while restantes:
+            taille = min(options['lot'], restantes)
+            commandes = Commande.objects.bulk_create([
+                Commande(client=clients[i % len(clients)], nbPlat=1, montant=1000)
+                for i in range(taille)
+            ])
+            LigneCommande.objects.bulk_create([
+                LigneCommande(commande=commande, plat=aleatoire.choice(plats), quantite=1, prix_unitaire=1000)
+                for commande in commandes
+            ])
+            restantes -= taille
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(
+            f"{options['commandes']} commandes générées en {time.perf_counter() - debut:.1f}s "
+            f"({connection.vendor})"
+        )
+        return clients[0]
+
+    def comparer(self, client, libelle, recherche, repetitions):
+        base = Commande.objects.filter(client=client)
+        variantes = {
+            'ancienne': base.filter(
+                Q(lignes__plat__nom__icontains=recherche) | Q(pk__icontains=recherche)
+            ).distinct(),
+            'indexée': filtrer_commandes(base, recherche),
+        }
+        for nom, queryset in variantes.items():
+            durees = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                page = paginer_par_curseur(queryset)
+                durees.append((time.perf_counter() - debut) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\nRecherche {libelle} « {recherche} », {nom} : {len(page)} résultat(s), "
+                f"médiane {statistics.median(durees):.2f} ms, max {max(durees):.2f} ms"
+            ))
+            self.stdout.write(queryset.order_by('-created_at', '-pk')[:11].explain())
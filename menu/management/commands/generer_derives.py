@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from experiance.models import Temoignage
+from menu import cache
+from menu.models import Plat
+from restaurant import images
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les images dérivées (WebP, JPEG réduits, miniature floue) des photos de plats et d'avis "
+        "qui n'en ont pas encore, ou de toutes avec --toutes. Travail fait dans ce processus, sans passer par la file des tâches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--toutes', action='store_true', help="Régénère aussi les dérivées existantes.")
+
+    def handle(self, *args, **options):
+        for modele, apres in ((Plat, cache.invalider_plats), (Temoignage, None)):
+            faites = erreurs = 0
+            for pk, nom, derives in modele.objects.exclude(image='').exclude(image=None).values_list(
+                'pk', 'image', 'image_derives'
+            ):
+                if not options['toutes'] and (derives or {}).get('source') == nom:
+                    continue
+                try:
+                    images.deriver(modele, pk, nom, apres)
+                    faites += 1
+                except (OSError, ValueError) as erreur:
+                    erreurs += 1
+                    self.stderr.write(f"{nom} : {erreur}")
+            self.stdout.write(f"{modele._meta.verbose_name_plural} : {faites} photo(s) traitée(s), {erreurs} erreur(s).")
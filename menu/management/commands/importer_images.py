@@ -0,0 +1,39 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from experiance.models import Temoignage
+from menu import cache
+from menu.models import Plat
+from restaurant import images
+from restaurant.medias import est_par_contenu
+
+
+class Command(BaseCommand):
+    help = (
+        "Recopie dans le stockage adressé par contenu (restaurant/medias.py) les photos de plats et "
+        "d'avis qui ont encore leur ancien nom (fichiers de static/image/ ou envois antérieurs), "
+        "puis génère leurs images dérivées. Les doublons (default.jpg, default_BUD3w04.jpg...) "
+        "deviennent un seul fichier."
+    )
+
+    def handle(self, *args, **options):
+        for modele, apres in ((Plat, cache.invalider_plats), (Temoignage, None)):
+            stockage = modele._meta.get_field('image').storage
+            noms = {}
+            for pk, ancien in modele.objects.exclude(image='').exclude(image=None).values_list('pk', 'image'):
+                if est_par_contenu(ancien):
+                    continue
+                if ancien not in noms:
+                    try:
+                        with images.ouvrir_source(ancien) as fichier:
+                            noms[ancien] = stockage.save(ancien, File(fichier, ancien))
+                    except OSError as erreur:
+                        self.stderr.write(f"{ancien} : {erreur}")
+                        noms[ancien] = None
+                if noms[ancien]:
+                    modele.objects.filter(pk=pk, image=ancien).update(image=noms[ancien], image_derives={})
+                    images.deriver(modele, pk, noms[ancien], apres)
+            importes = {nom for nom in noms.values() if nom}
+            self.stdout.write(
+                f"{modele._meta.verbose_name_plural} : {len(noms)} ancien(s) nom(s), {len(importes)} fichier(s) importé(s)."
+            )
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-18 04:10
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normaliser(texte):
+    decompose = unicodedata.normalize('NFKD', texte)
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).casefold().strip()
+
+
+def remplir_nom_recherche(apps, schema_editor):
+    Plat = apps.get_model('menu', 'Plat')
+    plats = list(Plat.objects.only('id', 'nom'))
+    for plat in plats:
+        plat.nom_recherche = normaliser(plat.nom)
+    Plat.objects.bulk_update(plats, ['nom_recherche'], batch_size=500)
+
+
+def creer_index_trigramme(apps, schema_editor):
+    # Index GIN pg_trgm : sert les LIKE '%...%' de menu/recherche.py.
+    # Sans objet sous SQLite (tests), où la table des plats est parcourue.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS menu_plat_nom_recherche_trgm '
+        'ON menu_plat USING gin (nom_recherche gin_trgm_ops)'
+    )
+
+
+def supprimer_index_trigramme(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS menu_plat_nom_recherche_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plat',
+            name='nom_recherche',
+            field=models.CharField(default='', editable=False, help_text='Nom en minuscules et sans accents, utilisé par la recherche.', max_length=150),
+        ),
+        migrations.RunPython(remplir_nom_recherche, migrations.RunPython.noop),
+        migrations.RunPython(creer_index_trigramme, supprimer_index_trigramme),
+    ]
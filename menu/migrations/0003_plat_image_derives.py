@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_recherche_plats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plat',
+            name='image_derives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
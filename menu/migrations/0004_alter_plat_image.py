@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 15:20
+
+import restaurant.medias
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_plat_image_derives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plat',
+            name='image',
+            field=models.ImageField(default='image/default.jpg', storage=restaurant.medias.stockage_images, upload_to='image/'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 
+from restaurant.medias import stockage_images
+
 DELEVRY_STATUS_CHOICES = (
 ('pending','Pending'),
 ('failed','Failed'),
@@ -27,15 +29,32 @@ class Plat(models.Model):
     nom = models.CharField(max_length=150)
     description = models.TextField(help_text="Ingrédients et détails du plat.")
     prix = models.PositiveIntegerField(help_text="Prix en FCFA")
-    image = models.ImageField(upload_to='image/',default='image/default.jpg')
+    image = models.ImageField(upload_to='image/',default='image/default.jpg', storage=stockage_images)
+    # Versions réduites de la photo, générées en arrière-plan (restaurant/images.py)
+    image_derives = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.IntegerField('stock',default=0)
     disponible = models.BooleanField(default=True)
     is_special = models.BooleanField(default=False, help_text="Est-ce le plat du jour ?")
+    nom_recherche = models.CharField(
+        max_length=150,
+        editable=False,
+        default='',
+        help_text="Nom en minuscules et sans accents, utilisé par la recherche."
+    )
 
     class Meta:
         ordering = ['nom']
         verbose_name_plural = "Plats"
 
     def __str__(self):
-        return f"[{self.categorie.nom}] {self.nom} ({self.prix} FCFA)]"
+        return f"[{self.categorie.nom}] {self.nom} ({self.prix} FCFA)"
+
+    def save(self, *args, **kwargs):
+        from .recherche import normaliser  # import local : recherche dépend de commandes.models
+
+        self.nom_recherche = normaliser(self.nom)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nom' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nom_recherche'}
+        super().save(*args, **kwargs)
 
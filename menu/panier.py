@@ -0,0 +1,46 @@
+class Panier:
+    """
+    Panier du client, stocké en session sous la forme {plat_id: quantité}.
+    Rien n'est écrit en base avant la validation (voir `commandes.services.passer_commande`).
+    """
+    SESSION_KEY = 'panier'
+
+    def __init__(self, request):
+        self.session = request.session
+        # Les clés JSON de la session sont des chaînes
+        self.lignes = {
+            int(plat_id): quantite
+            for plat_id, quantite in self.session.get(self.SESSION_KEY, {}).items()
+        }
+
+    def __len__(self):
+        return sum(self.lignes.values())
+
+    def __bool__(self):
+        return bool(self.lignes)
+
+    def ajouter(self, plat_id: int, quantite: int = 1):
+        self.lignes[plat_id] = self.lignes.get(plat_id, 0) + quantite
+        self._sauvegarder()
+
+    def modifier(self, plat_id: int, quantite: int):
+        if quantite > 0:
+            self.lignes[plat_id] = quantite
+        else:
+            self.lignes.pop(plat_id, None)
+        self._sauvegarder()
+
+    def retirer(self, plat_id: int):
+        self.lignes.pop(plat_id, None)
+        self._sauvegarder()
+
+    def vider(self):
+        self.lignes = {}
+        self._sauvegarder()
+
+    def quantites(self) -> dict:
+        return dict(self.lignes)
+
+    def _sauvegarder(self):
+        self.session[self.SESSION_KEY] = {str(plat_id): quantite for plat_id, quantite in self.lignes.items()}
+        self.session.modified = True
@@ -0,0 +1,46 @@
+"""
+Recherche dans l'historique des commandes.
+
+- Un numéro (« 42 » ou « #42 ») est cherché par égalité sur la clé primaire.
+- Un texte est normalisé (minuscules, sans accents) puis cherché dans
+  `Plat.nom_recherche`. Sous PostgreSQL, un index GIN `pg_trgm` sur cette
+  colonne sert les `LIKE '%...%'` (voir la migration menu 0002) ;
+  sous SQLite, la même requête fait un simple parcours de la table des plats,
+  qui reste petite.
+
+Les commandes sont ensuite filtrées par un `EXISTS` corrélé sur leurs lignes
+(index unique `commande, plat`) : ni jointure ni `DISTINCT` sur l'historique,
+qui reste parcouru dans l'ordre de l'index `client, -created_at`.
+"""
+import re
+import unicodedata
+
+from django.db.models import Exists, OuterRef
+
+from commandes.models import LigneCommande
+from .models import Plat
+
+NUMERO = re.compile(r'^#?\s*(\d+)$')
+
+
+def normaliser(texte: str) -> str:
+    """« Poulet DG à l'Étouffée » -> « poulet dg a l'etouffee »."""
+    decompose = unicodedata.normalize('NFKD', texte)
+    return ''.join(c for c in decompose if not unicodedata.combining(c)).casefold().strip()
+
+
+def filtrer_commandes(commandes, recherche: str):
+    """Restreint le queryset `commandes` au numéro ou au nom de plat recherché."""
+    numero = NUMERO.match(recherche.strip())
+    if numero:
+        return commandes.filter(pk=int(numero.group(1)))
+
+    terme = normaliser(recherche)
+    if not terme:
+        return commandes
+    return commandes.filter(Exists(
+        LigneCommande.objects.filter(
+            commande=OuterRef('pk'),
+            plat__in=Plat.objects.filter(nom_recherche__contains=terme).values('pk'),
+        )
+    ))
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, taches
+from .models import CategorieMenu, Plat
+
+
+@receiver(pre_save, sender=Plat)
+def memoriser_categorie(sender, instance, **kwargs):
+    """Retient l'ancienne catégorie d'un plat pour invalider aussi son bloc s'il change de catégorie."""
+    instance._categorie_initiale = (
+        Plat.objects.filter(pk=instance.pk).values_list('categorie_id', flat=True).first()
+        if instance.pk else None
+    )
+    # Photo envoyée avec ce formulaire (pas encore écrite dans le stockage)
+    instance._image_envoyee = bool(instance.image) and not instance.image._committed
+
+
+@receiver(post_save, sender=Plat)
+@receiver(post_delete, sender=Plat)
+def invalider_plat(sender, instance, **kwargs):
+    # Après le commit : invalidé plus tôt, le bloc serait recalculé et remis en cache avec les anciennes lignes
+    categories = [
+        categorie_id for categorie_id in {instance.categorie_id, getattr(instance, '_categorie_initiale', None)}
+        if categorie_id
+    ]
+    transaction.on_commit(lambda: cache.invalider_categories(categories))
+
+
+@receiver(post_save, sender=Plat)
+def deriver_image(sender, instance, **kwargs):
+    if getattr(instance, '_image_envoyee', False):
+        taches.deriver_photo_plat.differer(instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=CategorieMenu)
+@receiver(post_delete, sender=CategorieMenu)
+def invalider_categorie(sender, instance, **kwargs):
+    categorie_id = instance.pk
+
+    def invalider():
+        cache.invalider_index()
+        cache.invalider_categories([categorie_id])
+
+    transaction.on_commit(invalider)
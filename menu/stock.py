@@ -0,0 +1,99 @@
+"""
+Gestion atomique du stock des plats.
+
+Toutes les écritures sur ``Plat.stock`` passent par ce module : chaque
+opération est un ``UPDATE`` conditionnel unique exécuté par la base
+(``SET stock = stock - n WHERE stock >= n``), ce qui évite de vendre plus
+de plats qu'il n'en reste quand plusieurs commandes arrivent en même temps.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+
+from . import cache
+from .models import Plat
+
+
+class StockInsuffisant(Exception):
+    """Levée quand le stock d'un plat ne permet pas de servir la commande."""
+
+    def __init__(self, plat_id, quantite):
+        self.plat_id = plat_id
+        self.quantite = quantite
+        super().__init__(f"Stock insuffisant pour le plat #{plat_id} (quantité demandée : {quantite}).")
+
+
+def reserver_lot(quantites: dict):
+    """
+    Retire les quantités demandées ({plat_id: quantité}) en un seul UPDATE.
+    Chaque plat passe à `disponible=False` dans la même requête s'il tombe à zéro.
+    Si un seul plat manque, rien n'est décrémenté et `StockInsuffisant` est levée.
+    """
+    if not quantites:
+        return
+
+    stock_suffisant = Q()
+    for plat_id, quantite in quantites.items():
+        stock_suffisant |= Q(pk=plat_id, stock__gte=quantite)
+
+    with transaction.atomic():
+        updated = Plat.objects.filter(stock_suffisant, disponible=True).update(
+            stock=F('stock') - Case(
+                *[When(pk=plat_id, then=Value(quantite)) for plat_id, quantite in quantites.items()],
+                default=Value(0),
+            ),
+            # Le CASE lit l'ancienne valeur de la colonne, avant décrément
+            disponible=Case(
+                *[When(pk=plat_id, stock__gt=quantite, then=Value(True)) for plat_id, quantite in quantites.items()],
+                default=Value(False),
+            ),
+        )
+
+        if updated != len(quantites):
+            # Annule le décrément partiel ; la requête suivante ne sert qu'au message d'erreur
+            transaction.set_rollback(True)
+
+    if updated != len(quantites):
+        en_stock = dict(Plat.objects.filter(pk__in=quantites, disponible=True).values_list('pk', 'stock'))
+        manquant = next(
+            (plat_id for plat_id, quantite in quantites.items() if en_stock.get(plat_id, 0) < quantite),
+            next(iter(quantites)),
+        )
+        raise StockInsuffisant(manquant, quantites[manquant])
+
+    _invalider_apres_commit(quantites)
+
+
+def reserver(plat_id: int, quantite: int = 1):
+    """Retire `quantite` portions du stock d'un seul plat (voir `reserver_lot`)."""
+    reserver_lot({plat_id: quantite})
+
+
+def restaurer_lot(quantites: dict):
+    """
+    Remet les quantités ({plat_id: quantité}) en stock en un seul UPDATE. Seuls
+    les plats épuisés redeviennent disponibles : un plat retiré de la carte
+    par l'équipe le reste.
+    """
+    if not quantites:
+        return
+
+    Plat.objects.filter(pk__in=quantites).update(
+        # Avant `stock` : MySQL évalue les affectations dans l'ordre
+        disponible=Case(When(stock=0, then=Value(True)), default=F('disponible')),
+        stock=F('stock') + Case(
+            *[When(pk=plat_id, then=Value(quantite)) for plat_id, quantite in quantites.items()],
+            default=Value(0),
+        ),
+    )
+    _invalider_apres_commit(quantites)
+
+
+def restaurer(plat_id: int, quantite: int = 1):
+    """Remet `quantite` portions en stock (annulation) et rend le plat disponible s'il était épuisé."""
+    restaurer_lot({plat_id: quantite})
+
+
+def _invalider_apres_commit(quantites):
+    """Le stock est affiché sur la carte : on invalide les blocs des catégories concernées."""
+    plat_ids = list(quantites)
+    transaction.on_commit(lambda: cache.invalider_plats(plat_ids))
@@ -0,0 +1,10 @@
+from restaurant import images
+from taches.file import tache
+from . import cache
+from .models import Plat
+
+
+@tache
+def deriver_photo_plat(plat_id: int, nom: str):
+    """Images dérivées de la photo `nom` d'un plat ; le bloc de la carte est invalidé ensuite."""
+    images.deriver(Plat, plat_id, nom, apres=cache.invalider_plats)
@@ -0,0 +1,39 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from restaurant.images import chemin_derive
+
+register = template.Library()
+
+
+def _srcset(nom, largeurs, extension):
+    return ', '.join(f'{default_storage.url(chemin_derive(nom, largeur, extension))} {largeur}w' for largeur in largeurs)
+
+
+@register.simple_tag
+def image_responsive(objet, alt='', classe='', sizes='100vw'):
+    """
+    Photo d'un plat ou d'un avis : ``<picture>`` avec les ``srcset`` WebP et
+    JPEG des images dérivées et la miniature floue en fond pendant le
+    chargement. Tant que les dérivées ne sont pas prêtes, la photo d'origine.
+    """
+    nom = objet.image.name
+    derives = objet.image_derives or {}
+    if derives.get('source') != nom:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">', objet.image.url, alt, classe
+        )
+
+    largeurs = derives['largeurs']
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy" decoding="async"'
+        ' style="background: url({}) center / cover no-repeat">'
+        '</picture>',
+        _srcset(nom, largeurs, 'webp'), sizes,
+        default_storage.url(chemin_derive(nom, largeurs[-1], 'jpg')), _srcset(nom, largeurs, 'jpg'), sizes,
+        derives['largeur'], derives['hauteur'], alt, classe,
+        derives['lqip'],
+    )
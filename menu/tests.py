@@ -1,14 +1,369 @@
-from django.test import TestCase
+import asyncio
+import io
+import shutil
+import tempfile
+from datetime import timedelta
 
-from .models import Plat
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from commandes.models import Commande
+from commandes import suivi
+from commandes.evenements import get_broker
+from commandes.services import changer_statut_commande, passer_commande
+from PIL import Image
+from restaurant import images
+from restaurant.testing import REGLAGES_CACHE_PARTAGE
+from taches import travailleur
+
+from . import stock
+from .models import CategorieMenu, Plat
 # Create your tests here.
 class PlatTest(TestCase):
     @classmethod
     def setUpTestData(cls):
-        Plat.objects.create(
-            categorie="dessert",
-            nom='abrico a la fraise',
+        cls.plat = Plat.objects.create(
+            categorie=CategorieMenu.objects.create(nom='Desserts'),
+            nom='Abricot à la Fraise',
             description='rafraichisant et sucree',
             prix=1200,
+        )
+
+    def test_nom_recherche_normalise(self):
+        self.assertEqual(self.plat.nom_recherche, 'abricot a la fraise')
+        self.assertEqual(str(self.plat), '[Desserts] Abricot à la Fraise (1200 FCFA)')
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class CarteCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrees = CategorieMenu.objects.create(nom='Entrées', ordre=1)
+        cls.desserts = CategorieMenu.objects.create(nom='Desserts', ordre=2)
+        cls.salade = Plat.objects.create(
+            categorie=cls.entrees, nom='Salade', description='...', prix=1500, stock=1
+        )
+        cls.beignets = Plat.objects.create(
+            categorie=cls.desserts, nom='Beignets', description='...', prix=1000, stock=5
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_carte_en_cache_sans_requete(self):
+        self.client.get(reverse('menu'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu'))
+
+        self.assertContains(response, 'Salade')
+        self.assertContains(response, 'Beignets')
+
+    def test_changement_de_stock_invalide_seulement_sa_categorie(self):
+        self.client.get(reverse('menu'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.reserver(self.salade.pk)
+
+        # Seul le bloc des entrées est recalculé : une requête catégories + une requête plats
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('menu'))
+
+        # La salade est épuisée : la catégorie Entrées disparaît de la carte
+        self.assertNotContains(response, 'Salade')
+        self.assertContains(response, 'Beignets')
+
+    def test_modification_d_un_plat_invalide_sa_categorie(self):
+        self.client.get(reverse('menu'))
+
+        with self.captureOnCommitCallbacks() as rappels:
+            self.beignets.nom = 'Beignets haricots'
+            self.beignets.save()
+            # Pas encore commité : une autre requête relirait l'ancien nom, le bloc en cache reste valable
+            with self.assertNumQueries(0):
+                self.client.get(reverse('menu'))
+
+        for rappel in rappels:
+            rappel()
+        self.assertContains(self.client.get(reverse('menu')), 'Beignets haricots')
+
+    def test_modification_d_une_categorie_invalide_l_index(self):
+        self.client.get(reverse('menu'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.desserts.nom = 'Douceurs'
+            self.desserts.save()
+
+        self.assertContains(self.client.get(reverse('menu')), 'Douceurs')
+
+    @override_settings(CACHE_PARTAGE=False, CACHE_DUREE_LOCALE=0)
+    def test_sans_cache_partage_les_blocs_expirent(self):
+        # Un autre worker ne verrait pas l'invalidation : les blocs ne durent que CACHE_DUREE_LOCALE secondes
+        self.client.get(reverse('menu'))
+
+        # Index, catégories et plats relus
+        with self.assertNumQueries(3):
+            self.client.get(reverse('menu'))
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class CarteApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Ndolé', description='...', prix=4000, stock=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_contenu(self):
+        response = self.client.get(reverse('carte_api'))
+
+        plat = response.json()['categories'][0]['plats'][0]
+        self.assertEqual((plat['nom'], plat['prix'], plat['stock']), ('Ndolé', 4000, 3))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_304_sans_requete(self):
+        etag = self.client.get(reverse('carte_api'))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('carte_api'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_change_apres_modification(self):
+        etag = self.client.get(reverse('carte_api'))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.reserver(self.plat.pk)
+
+        response = self.client.get(reverse('carte_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['categories'][0]['plats'][0]['stock'], 2)
+
+
+class HistoriquePaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        plat = Plat.objects.create(categorie=categorie, nom='Koki', description='...', prix=1000, stock=100)
+        commandes = [passer_commande(cls.client_user, {plat.pk: 1}) for _ in range(25)]
+        # Dates identiques deux à deux : l'id départage
+        maintenant = timezone.now()
+        for i, commande in enumerate(commandes):
+            Commande.objects.filter(pk=commande.pk).update(created_at=maintenant - timedelta(minutes=i // 2))
+        cls.attendu = list(Commande.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def page(self, **params):
+        response = self.client.get(reverse('Mes_commande'), params)
+        return response.context['commandes']
+
+    def test_parcours_avant_et_arriere(self):
+        pages = [self.page()]
+        while pages[-1].has_next():
+            pages.append(self.page(curseur=pages[-1].curseur_suivant))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([commande.pk for page in pages for commande in page], self.attendu)
+        self.assertFalse(pages[0].has_previous())
+
+        precedente = self.page(curseur=pages[2].curseur_precedent)
+        self.assertEqual([commande.pk for commande in precedente], self.attendu[10:20])
+        premiere = self.page(curseur=precedente.curseur_precedent)
+        self.assertEqual([commande.pk for commande in premiere], self.attendu[:10])
+        self.assertFalse(premiere.has_previous())
+
+    def test_sans_count_et_total_approximatif(self):
+        curseur = self.page().curseur_suivant
+
+        with CaptureQueriesContext(connection) as requetes:
+            page = self.page(curseur=curseur)
+
+        self.assertFalse([q for q in requetes.captured_queries if 'COUNT(' in q['sql']])
+        self.assertFalse([q for q in requetes.captured_queries if 'OFFSET' in q['sql']])
+        self.assertEqual(page.total_approximatif, 25)
+
+    def test_curseur_invalide_renvoie_la_premiere_page(self):
+        page = self.page(curseur='pas-un-curseur')
+
+        self.assertEqual([commande.pk for commande in page], self.attendu[:10])
+
+
+class RechercheHistoriqueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.ndole = Plat.objects.create(categorie=categorie, nom='Ndolé Crevettes', description='...', prix=4000, stock=50)
+        cls.eru = Plat.objects.create(categorie=categorie, nom='Eru', description='...', prix=2500, stock=50)
+        cls.commandes = [
+            passer_commande(cls.client_user, {cls.ndole.pk: 1, cls.eru.pk: 1} if i % 2 else {cls.eru.pk: 1})
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.client_user)
+
+    def rechercher(self, texte):
+        response = self.client.get(reverse('Mes_commande'), {'search': texte})
+        return {commande.pk for commande in response.context['commandes']}
+
+    def test_numero_exact(self):
+        commande = self.commandes[0]
+
+        self.assertEqual(self.rechercher(str(commande.pk)), {commande.pk})
+        self.assertEqual(self.rechercher(f'#{commande.pk}'), {commande.pk})
+
+    def test_nom_sans_accent_ni_casse(self):
+        attendu = {commande.pk for commande in self.commandes[1::2]}
+
+        self.assertEqual(self.rechercher('NDOLE'), attendu)
+        self.assertEqual(self.rechercher('crevettes'), attendu)
+
+    def test_nom_recherche_suit_le_renommage(self):
+        self.eru.nom = 'Éru Spécial'
+        self.eru.save(update_fields=['nom'])
+
+        self.eru.refresh_from_db()
+        self.assertEqual(self.eru.nom_recherche, 'eru special')
+
+
+class SuiviCommandesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user('client', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Okok', description='...', prix=2000, stock=10)
+        cls.commandes = [passer_commande(cls.client_user, {cls.plat.pk: 1}) for _ in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.client_user)
+
+    def suivre(self, **params):
+        return self.client.get(reverse('suivi_commandes'), params).json()
+
+    def test_version_initiale(self):
+        donnees = self.suivre()
+
+        self.assertEqual(donnees['version'], suivi.version_depuis_date(self.commandes[-1].updated_at))
+        self.assertEqual(donnees['commandes'], [])
+
+    def test_attente_sans_requete_sur_les_commandes(self):
+        version = self.suivre()['version']
+
+        with CaptureQueriesContext(connection) as requetes:
+            donnees = self.suivre(version=version, attente=0.05)
+
+        self.assertEqual(donnees, {'version': version, 'commandes': []})
+        self.assertFalse([q for q in requetes.captured_queries if 'commandes_commande' in q['sql']])
+
+    def test_retourne_seulement_les_commandes_modifiees(self):
+        version = self.suivre()['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            changer_statut_commande(self.commandes[1], 'preparing')
+
+        donnees = self.suivre(version=version)
+
+        self.assertEqual([(c['id'], c['status']) for c in donnees['commandes']], [(self.commandes[1].pk, 'preparing')])
+        self.assertGreater(donnees['version'], version)
+        self.assertEqual(self.suivre(version=donnees['version'], attente=0.05)['commandes'], [])
+
+    async def test_reveil_par_le_broker(self):
+        await self.async_client.aforce_login(self.client_user)
+        version = suivi.version_depuis_date(self.commandes[-1].updated_at)
+        requete = asyncio.ensure_future(
+            self.async_client.get(reverse('suivi_commandes'), {'version': version, 'attente': 5})
+        )
+        await asyncio.sleep(0.2)
+
+        await sync_to_async(Commande.objects.filter(pk=self.commandes[0].pk).update)(
+            status='preparing', updated_at=timezone.now()
+        )
+        get_broker().publier(suivi.canal_client(self.client_user.pk), {'type': 'version'})
+        response = await asyncio.wait_for(requete, 2)
+
+        self.assertEqual([c['id'] for c in response.json()['commandes']], [self.commandes[0].pk])
+
+
+@override_settings(IMAGES_LARGEURS=(200, 400, 800))
+class ImagesDeriveesTest(TestCase):
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglage = override_settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+        cache.clear()
+        self.categorie = CategorieMenu.objects.create(nom='Plats', ordre=1)
+
+    def photo(self, largeur=1200, hauteur=800):
+        tampon = io.BytesIO()
+        Image.new('RGB', (largeur, hauteur), 'orange').save(tampon, 'JPEG')
+        return SimpleUploadedFile('ndole.jpg', tampon.getvalue(), content_type='image/jpeg')
+
+    def test_derivees_generees_apres_envoi(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            plat = Plat.objects.create(
+                categorie=self.categorie, nom='Ndolé', description='...', prix=3500, stock=3, image=self.photo()
+            )
+        # Dérivées générées par la file des tâches, pas pendant la requête
+        plat.refresh_from_db()
+        self.assertEqual(plat.image_derives, {})
+        self.assertEqual(travailleur.executer_dues(), 1)
+
+        plat.refresh_from_db()
+        derives = plat.image_derives
+        self.assertEqual((derives['source'], derives['largeurs']), (plat.image.name, [200, 400, 800]))
+        self.assertEqual((derives['largeur'], derives['hauteur']), (1200, 800))
+        self.assertTrue(derives['lqip'].startswith('data:image/webp;base64,'))
+        self.assertLess(len(derives['lqip']), 1000)
+        for extension in ('webp', 'jpg'):
+            with default_storage.open(images.chemin_derive(plat.image.name, 400, extension)) as fichier:
+                self.assertEqual(Image.open(fichier).size, (400, 267))
+
+        response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '-400.webp 400w')
+
+    def test_petite_photo_et_photo_non_envoyee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            plat = Plat.objects.create(
+                categorie=self.categorie, nom='Eru', description='...', prix=3000, stock=3, image=self.photo(300, 300)
+            )
+        travailleur.executer_dues()
+        plat.refresh_from_db()
+        # Jamais agrandie
+        self.assertEqual(plat.image_derives['largeurs'], [200, 300])
+
+        Plat.objects.filter(pk=plat.pk).update(image_derives={})
+        plat.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Autre champ modifié : la photo n'est pas retraitée
+            plat.prix = 3200
+            plat.save()
+        self.assertEqual(travailleur.executer_dues(), 0)
+
+    def test_photo_d_origine_sans_derivees(self):
+        plat = Plat(image='image/default.jpg', nom='Riz')
+
+        html = Template('{% load images %}{% image_responsive plat plat.nom "rond" %}').render(Context({'plat': plat}))
 
-        )
\ No newline at end of file
+        self.assertEqual(
+            html, '<img src="/static/image/default.jpg" alt="Riz" class="rond" loading="lazy" decoding="async">'
+        )
@@ -5,10 +5,22 @@ from . import views
 urlpatterns = [
     path('carte/', views.menu, name='menu'),
 
+    # API JSON en lecture seule (ETag / Last-Modified)
+    path('api/carte/', views.carte_api, name='carte_api'),
+
     path('commande/<int:pk>/', views.commande, name='commande'),
 
+    # Panier (en session) et validation en une seule commande
+    path('panier/', views.panier, name='panier'),
+    path('panier/ajouter/<int:pk>/', views.ajouter_au_panier, name='ajouter_au_panier'),
+    path('panier/modifier/<int:pk>/', views.modifier_panier, name='modifier_panier'),
+    path('panier/valider/', views.valider_panier, name='valider_panier'),
+
     path('mesCommande/', views.detail, name='Mes_commande'),
 
+    # Long polling du statut des commandes (version des commandes du client)
+    path('mesCommande/suivi/', views.suivi_commandes, name='suivi_commandes'),
+
     path('reorder/<int:commande_id>/', views.reorder, name='reorder'),
 
     # Annuler une commande en attente
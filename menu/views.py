@@ -1,26 +1,52 @@
-from django.http import HttpResponse, JsonResponse
+import asyncio
+
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Count, Q, Sum
+from django.db.models import Prefetch
 from django.contrib import messages
 
+from .cache import acategories_de_la_carte, derniere_modification_menu, donnees_carte, version_menu
 from .models import Plat, CategorieMenu
-from commandes.models import Commande
-
+from .panier import Panier
+from .recherche import filtrer_commandes
+from .stock import StockInsuffisant
+from commandes.models import Commande, LigneCommande
+from compte.models import StatistiquesClient
+from compte.stats import CHAMPS_STATUT
+from restaurant.asynchrone import charger_utilisateur
+from restaurant.pagination import apaginer_par_curseur
+from restaurant.requetes import budget_requetes
+from commandes import suivi
+from commandes.evenements import get_broker
+from commandes.services import passer_commande, annuler_commande
+
+# Durée maximale (secondes) pendant laquelle une requête de suivi reste en attente
+ATTENTE_SUIVI = 25
+
+
+def _prefetch_lignes(*related):
+    """Charge les lignes d'un lot de commandes (et leurs plats) en une seule requête."""
+    return Prefetch(
+        'lignes',
+        queryset=LigneCommande.objects.select_related('plat', *related)
+    )
 
 
-def menu(request):
+@budget_requetes(3)
+async def menu(request):
     """
     Affiche le menu en regroupant les plats par catégorie.
     Les plats non disponibles ne sont pas inclus.
     """
-    categories_avec_plats = CategorieMenu.objects.filter(
-        plats__disponible=True
-    ).prefetch_related('plats').order_by('ordre').distinct()
-
+    # Charge la session (panier, messages) sans requête synchrone
+    await charger_utilisateur(request)
     context = {
-        'categories': categories_avec_plats,
+        # Blocs rendus en cache, invalidés par catégorie (voir menu/cache.py)
+        'categories': await acategories_de_la_carte(),
+        'panier': Panier(request),
     }
 
     return render(
@@ -30,6 +56,27 @@ def menu(request):
     )
 
 
+
+def _etag_carte(request):
+    return f'"menu-{version_menu()}"'
+
+
+def _derniere_modification_carte(request):
+    return derniere_modification_menu()
+
+
+@budget_requetes(2)
+@require_safe
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=_etag_carte, last_modified_func=_derniere_modification_carte)
+def carte_api(request):
+    """
+    Menu en JSON (catégories, plats, prix, stock, images) pour les bornes et l'application mobile.
+    Un client qui renvoie son ETag (If-None-Match) reçoit un 304 sans qu'aucune ligne ne soit lue.
+    """
+    return JsonResponse(donnees_carte())
+
+@budget_requetes(14)
 @login_required
 def commande(request, pk: int = None):
     """
@@ -46,26 +93,9 @@ def commande(request, pk: int = None):
         messages.error(request, f"Le plat '{plat_a_commander.nom}' n'est plus disponible.")
         return redirect('menu')
 
-    if plat_a_commander.stock <= 0:
-        plat_a_commander.disponible = False
-        plat_a_commander.save()
-        messages.error(request, f"Le plat '{plat_a_commander.nom}' est en rupture de stock.")
-        return redirect('menu')
-
-    # Créer la commande
+    # Créer la commande (le stock est décrémenté dans la même transaction)
     try:
-        nouvelle_commande = Commande.objects.create(
-            plats=plat_a_commander,
-            montant=plat_a_commander.prix,
-            client=request.user,
-            status='pending'  # Statut initial
-        )
-
-        # Mettre à jour le stock
-        plat_a_commander.stock -= 1
-        if plat_a_commander.stock == 0:
-            plat_a_commander.disponible = False
-        plat_a_commander.save()
+        nouvelle_commande = passer_commande(request.user, {plat_a_commander.pk: 1})
 
         messages.success(
             request,
@@ -74,56 +104,166 @@ def commande(request, pk: int = None):
         )
         return redirect('Mes_commande')
 
+    except StockInsuffisant:
+        messages.error(request, f"Le plat '{plat_a_commander.nom}' est en rupture de stock.")
+        return redirect('menu')
+
     except Exception as e:
         messages.error(request, f"Une erreur est survenue lors de la commande : {str(e)}")
         return redirect('menu')
 
 
+@budget_requetes(5)
+def ajouter_au_panier(request, pk: int):
+    """
+    Ajoute un plat au panier (en session) sans créer de commande.
+    """
+    plat = get_object_or_404(Plat, id=pk)
+
+    if not plat.disponible:
+        messages.error(request, f"Le plat '{plat.nom}' n'est plus disponible.")
+        return redirect('menu')
+
+    Panier(request).ajouter(plat.pk)
+    messages.success(request, f"'{plat.nom}' a été ajouté à votre panier.")
+    return redirect('menu')
+
+
+@budget_requetes(2)
+def panier(request):
+    """
+    Affiche le contenu du panier avec le total.
+    """
+    panier_client = Panier(request)
+    quantites = panier_client.quantites()
+    plats = Plat.objects.filter(pk__in=quantites).select_related('categorie')
+
+    lignes = [
+        {
+            'plat': plat,
+            'quantite': quantites[plat.pk],
+            'montant': plat.prix * quantites[plat.pk],
+        }
+        for plat in plats
+    ]
+
+    context = {
+        'lignes': lignes,
+        'total': sum(ligne['montant'] for ligne in lignes),
+        'panier': panier_client,
+    }
+
+    return render(
+        request=request,
+        template_name='menu/panier.html',
+        context=context
+    )
+
+
+@budget_requetes(5)
+def modifier_panier(request, pk: int):
+    """
+    Change la quantité d'un plat du panier (0 pour le retirer).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    try:
+        quantite = int(request.POST.get('quantite', 0))
+    except ValueError:
+        quantite = 0
+
+    Panier(request).modifier(pk, quantite)
+    return redirect('panier')
+
+
+@budget_requetes(16)
+@login_required
+def valider_panier(request):
+    """
+    Transforme le panier en une commande unique (une transaction pour tous les plats).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    panier_client = Panier(request)
+    if not panier_client:
+        messages.error(request, "Votre panier est vide.")
+        return redirect('menu')
+
+    try:
+        nouvelle_commande = passer_commande(request.user, panier_client.quantites())
+
+    except StockInsuffisant as e:
+        nom = Plat.objects.filter(pk=e.plat_id).values_list('nom', flat=True).first() or f"#{e.plat_id}"
+        messages.error(request, f"Le plat '{nom}' n'est plus disponible en quantité suffisante.")
+        return redirect('panier')
+
+    except Exception as e:
+        messages.error(request, f"Une erreur est survenue lors de la commande : {str(e)}")
+        return redirect('panier')
+
+    panier_client.vider()
+    messages.success(
+        request,
+        f"Votre commande #{nouvelle_commande.pk} ({nouvelle_commande.nbPlat} plat(s)) a été créée avec succès !"
+    )
+    return redirect('Mes_commande')
+
+
+@budget_requetes(4)
 @login_required
-def detail(request):
+async def detail(request):
     """
     Affiche l'historique des commandes du client avec filtres, statistiques et pagination.
     """
+    user = await charger_utilisateur(request)
+
     # Récupérer les paramètres de filtrage
     status_filter = request.GET.get('status', 'all')
     search_query = request.GET.get('search', '').strip()
 
     # Base queryset avec optimisation
     commandes = Commande.objects.filter(
-        client=request.user
-    ).select_related('plats').order_by('-created_at')
+        client=user
+    ).prefetch_related(_prefetch_lignes())
 
     # Appliquer le filtre de statut
     if status_filter and status_filter != 'all':
         commandes = commandes.filter(status=status_filter)
 
-    # Appliquer le filtre de recherche (par nom de plat ou numéro de commande)
+    # Appliquer le filtre de recherche (numéro de commande exact ou nom de plat)
     if search_query:
-        commandes = commandes.filter(
-            Q(plats__nom__icontains=search_query) |
-            Q(pk__icontains=search_query)
-        )
+        commandes = filtrer_commandes(commandes, search_query)
 
-    # Calculer les statistiques globales
-    stats = Commande.objects.filter(client=request.user).aggregate(
-        total=Count('id'),
-        completed=Count('id', filter=Q(status='completed')),
-        pending=Count('id', filter=Q(status='pending')),
-        failed=Count('id', filter=Q(status='failed')),
-        total_spent=Sum('montant')
+    # Statistiques globales, tenues à jour à chaque commande (compte/stats.py)
+    stats = (
+        await StatistiquesClient.objects.filter(client=user).afirst()
+        or StatistiquesClient(client=user)
     )
 
-    # Pagination (10 commandes par page)
-    paginator = Paginator(commandes, 10)
-    page_number = request.GET.get('page', 1)
-    commandes_page = paginator.get_page(page_number)
+    # Total affiché sans COUNT(*) : lu dans les statistiques quand le filtre le permet
+    total_approximatif = None
+    if not search_query:
+        if status_filter in ('', 'all'):
+            total_approximatif = stats.total
+        elif status_filter in CHAMPS_STATUT:
+            total_approximatif = getattr(stats, CHAMPS_STATUT[status_filter])
+
+    # Pagination par curseur (10 commandes par page)
+    commandes_page = await apaginer_par_curseur(
+        commandes,
+        request.GET.get('curseur'),
+        par_page=10,
+        total_approximatif=total_approximatif,
+    )
 
     context = {
         'commandes': commandes_page,
         'stats': stats,
         'current_filter': status_filter,
         'search_query': search_query,
-        'paginator': paginator,
+        'version_commandes': await suivi.aversion_client(user.pk),
     }
 
     return render(
@@ -133,10 +273,11 @@ def detail(request):
     )
 
 
+@budget_requetes(15)
 @login_required
 def reorder(request, commande_id: int):
     """
-    Permet de recommander un plat à partir d'une commande précédente.
+    Permet de recommander les plats d'une commande précédente.
     """
     if request.method != 'POST':
         return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
@@ -148,35 +289,23 @@ def reorder(request, commande_id: int):
         client=request.user
     )
 
-    plat = commande_originale.plats
-
-    # Vérifier la disponibilité
-    if not plat.disponible or plat.stock <= 0:
-        messages.error(
-            request,
-            f"Désolé, le plat '{plat.nom}' n'est plus disponible actuellement."
-        )
-        return redirect('Mes_commande')
+    quantites = dict(commande_originale.lignes.values_list('plat_id', 'quantite'))
 
-    # Créer la nouvelle commande
+    # Créer la nouvelle commande (mêmes plats, mêmes quantités, prix actuels)
     try:
-        nouvelle_commande = Commande.objects.create(
-            plats=plat,
-            montant=plat.prix,
-            client=request.user,
-            status='pending'
-        )
-
-        # Mettre à jour le stock
-        plat.stock -= 1
-        if plat.stock == 0:
-            plat.disponible = False
-        plat.save()
+        nouvelle_commande = passer_commande(request.user, quantites)
 
         messages.success(
             request,
             f"Votre commande #{nouvelle_commande.pk} a été créée ! "
-            f"Vous avez recommandé '{plat.nom}'."
+            f"Vous avez recommandé la commande #{commande_originale.pk}."
+        )
+
+    except StockInsuffisant as e:
+        nom = Plat.objects.filter(pk=e.plat_id).values_list('nom', flat=True).first() or f"#{e.plat_id}"
+        messages.error(
+            request,
+            f"Désolé, le plat '{nom}' n'est plus disponible actuellement."
         )
 
     except Exception as e:
@@ -185,16 +314,57 @@ def reorder(request, commande_id: int):
     return redirect('Mes_commande')
 
 
+@budget_requetes(2)
+@login_required
+async def suivi_commandes(request):
+    """
+    Long polling du statut des commandes du client.
+    `?version=` est la dernière version reçue : la requête attend (sans
+    requête SQL) qu'une commande change ou que `ATTENTE_SUIVI` secondes
+    passent, puis retourne seulement les commandes modifiées et la nouvelle
+    version. Sans `version`, retourne immédiatement la version courante.
+    """
+    user = await request.auser()
+    try:
+        version = int(request.GET['version'])
+    except (KeyError, ValueError):
+        return JsonResponse({'version': await suivi.aversion_client(user.pk), 'commandes': []})
+    try:
+        attente = min(float(request.GET.get('attente', ATTENTE_SUIVI)), ATTENTE_SUIVI)
+    except ValueError:
+        attente = ATTENTE_SUIVI
+
+    # Abonnement avant la lecture de la version : aucun changement ne peut être manqué
+    abonnement = get_broker().abonner(suivi.canal_client(user.pk))
+    try:
+        if await suivi.aversion_client(user.pk) <= version:
+            try:
+                await abonnement.recevoir(timeout=attente)
+            except asyncio.TimeoutError:
+                return JsonResponse({'version': version, 'commandes': []})
+        commandes = await suivi.commandes_modifiees(user.pk, version)
+    finally:
+        abonnement.fermer()
+
+    return JsonResponse({
+        'version': max([version, *(commande['version'] for commande in commandes)]),
+        'commandes': commandes,
+    })
+
+
+@budget_requetes(2)
 @login_required
-def commande_detail_ajax(request, commande_id: int):
+async def commande_detail_ajax(request, commande_id: int):
     """
     Retourne les détails d'une commande en JSON pour affichage dans un modal.
     """
-    commande = get_object_or_404(
-        Commande,
-        id=commande_id,
-        client=request.user
-    )
+    user = await request.auser()
+    try:
+        commande = await Commande.objects.prefetch_related(
+            _prefetch_lignes('plat__categorie')
+        ).aget(id=commande_id, client=user)
+    except Commande.DoesNotExist:
+        raise Http404
 
     data = {
         'id': commande.pk,
@@ -202,17 +372,22 @@ def commande_detail_ajax(request, commande_id: int):
         'status_display': commande.get_status_display(),
         'created_at': commande.created_at.strftime('%d %B %Y à %H:%M'),
         'montant': float(commande.montant),
-        'plat': {
-            'nom': commande.plats.nom,
-            'description': commande.plats.description,
-            'prix': float(commande.plats.prix),
-            'categorie': commande.plats.categorie.nom if commande.plats.categorie else None,
-        }
+        'lignes': [
+            {
+                'nom': ligne.plat.nom,
+                'description': ligne.plat.description,
+                'quantite': ligne.quantite,
+                'prix': float(ligne.prix_unitaire),
+                'categorie': ligne.plat.categorie.nom if ligne.plat.categorie else None,
+            }
+            for ligne in commande.lignes.all()
+        ]
     }
 
     return JsonResponse(data)
 
 
+@budget_requetes(12)
 @login_required
 def cancel_commande(request, commande_id: int):
     """
@@ -236,15 +411,13 @@ def cancel_commande(request, commande_id: int):
         return redirect('Mes_commande')
 
     try:
-        # Annuler la commande
-        commande.status = 'failed'
-        commande.save()
-
-        # Remettre le stock
-        plat = commande.plats
-        plat.stock += 1
-        plat.disponible = True
-        plat.save()
+        # Annuler la commande et remettre le stock (si elle est toujours en attente)
+        if not annuler_commande(commande, auteur=request.user):
+            messages.error(
+                request,
+                "Cette commande ne peut plus être annulée car elle n'est plus en attente."
+            )
+            return redirect('Mes_commande')
 
         messages.success(
             request,
@@ -20,10 +20,10 @@ class TemoignageAdmin(admin.ModelAdmin):
 @admin.register(HorairesOuverture)
 class HorairesOuvertureAdmin(admin.ModelAdmin):
     # Les champs à afficher dans la liste des objets (tableau)
-    list_display = ('jour', 'heure_ouverture', 'heure_fermeture', 'est_ferme')
+    list_display = ('jour', 'heure_ouverture', 'heure_fermeture', 'est_ferme', 'places_par_creneau')
 
     # Les champs modifiables directement depuis la liste des objets
-    list_editable = ('heure_ouverture', 'heure_fermeture', 'est_ferme')
+    list_editable = ('heure_ouverture', 'heure_fermeture', 'est_ferme', 'places_par_creneau')
 
     # Les champs par lesquels on peut filtrer la liste
     list_filter = ('est_ferme',)
@@ -0,0 +1,128 @@
+"""
+Cache de la page d'accueil.
+
+La page a trois blocs de données : les plats spéciaux, les horaires et les
+témoignages. Les plats et les témoignages sont mis en cache sous une clé
+versionnée : les plats suivent la version du menu (menu/cache.py,
+incrémentée par les enregistrements de `Plat` et les mouvements de stock),
+les témoignages ont leur propre version, incrémentée par pages/signals.py.
+Les horaires sont gardés en mémoire (pages/horaires.py) avec leur version.
+
+Les visiteurs anonymes voient tous la même page : elle est gardée entière,
+déjà rendue, sous la combinaison des trois versions et de l'état
+d'ouverture (« ouvert », « ouvre demain à 11:00 »). Pour un client connecté
+(son nom est dans l'en-tête), seuls les blocs de données viennent du cache
+et la page est rendue à chaque fois. Un affichage en cache ne fait aucune
+requête SQL. Sans cache partagé, versions et blocs expirent au bout de
+quelques secondes (restaurant/cache.py).
+"""
+import time
+
+from django.core.cache import cache
+
+from menu.cache import aversion_menu
+from menu.models import Plat
+from restaurant.cache import duree
+from .models import Temoignage
+
+CLE_VERSION_HORAIRES = 'pages:accueil:version:horaires'
+CLE_VERSION_TEMOIGNAGES = 'pages:accueil:version:temoignages'
+DUREE = 60 * 60 * 24
+
+
+def _nouvelle_version():
+    return time.time_ns()
+
+
+def _incrementer(cle):
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.set(cle, _nouvelle_version(), duree(DUREE))
+
+
+def invalider_horaires():
+    _incrementer(CLE_VERSION_HORAIRES)
+
+
+def invalider_temoignages():
+    _incrementer(CLE_VERSION_TEMOIGNAGES)
+
+
+def version_horaires() -> int:
+    version = cache.get(CLE_VERSION_HORAIRES)
+    if version is None:
+        version = _nouvelle_version()
+        cache.set(CLE_VERSION_HORAIRES, version, duree(DUREE))
+    return version
+
+
+async def aversion_horaires() -> int:
+    version = await cache.aget(CLE_VERSION_HORAIRES)
+    if version is None:
+        version = _nouvelle_version()
+        await cache.aset(CLE_VERSION_HORAIRES, version, duree(DUREE))
+    return version
+
+
+async def aversions() -> dict:
+    """{'plats', 'horaires', 'temoignages'} : versions courantes des trois blocs."""
+    cles = [CLE_VERSION_HORAIRES, CLE_VERSION_TEMOIGNAGES]
+    versions = await cache.aget_many(cles)
+    manquantes = {cle: _nouvelle_version() for cle in cles if cle not in versions}
+    if manquantes:
+        await cache.aset_many(manquantes, duree(DUREE))
+        versions.update(manquantes)
+    return {
+        'plats': await aversion_menu(),
+        'horaires': versions[CLE_VERSION_HORAIRES],
+        'temoignages': versions[CLE_VERSION_TEMOIGNAGES],
+    }
+
+
+def _cle_page(versions: dict, etat: dict) -> str:
+    return 'pages:accueil:page:{plats}:{horaires}:{temoignages}:'.format(**versions) + ':'.join(
+        f'{valeur:%Y%m%d%H%M}' if valeur else '-' for valeur in (etat['fermeture'], etat['prochaine_ouverture'])
+    )
+
+
+async def apage_anonyme(versions: dict, etat: dict):
+    """Page rendue (bytes) pour les visiteurs anonymes, ou None."""
+    return await cache.aget(_cle_page(versions, etat))
+
+
+async def aenregistrer_page_anonyme(versions: dict, etat: dict, contenu: bytes):
+    await cache.aset(_cle_page(versions, etat), contenu, duree(DUREE))
+
+
+async def _plats_speciaux():
+    # Les plats spéciaux, ou les 3 premiers si aucun n'est marqué spécial
+    plats = [plat async for plat in Plat.objects.filter(is_special=True, disponible=True)[:3]]
+    if not plats:
+        plats = [plat async for plat in Plat.objects.filter(disponible=True)[:3]]
+    return plats
+
+
+async def _temoignages():
+    return [temoignage async for temoignage in Temoignage.objects.filter(visible=True).order_by('-date_ajout')[:2]]
+
+
+BLOCS = {
+    'plats_speciaux': ('plats', _plats_speciaux),
+    'temoignages': ('temoignages', _temoignages),
+}
+
+
+async def acontexte_accueil(versions: dict) -> dict:
+    """Plats spéciaux et témoignages ; seuls les blocs absents du cache sont relus en base."""
+    cles = {nom: f'pages:accueil:{nom}:{versions[version]}' for nom, (version, _) in BLOCS.items()}
+    blocs = await cache.aget_many(cles.values())
+    contexte, manquants = {}, {}
+    for nom, (_, lire) in BLOCS.items():
+        if cles[nom] in blocs:
+            contexte[nom] = blocs[cles[nom]]
+        else:
+            contexte[nom] = manquants[cles[nom]] = await lire()
+    if manquants:
+        await cache.aset_many(manquants, duree(DUREE))
+    return contexte
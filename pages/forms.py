@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from restaurant.asynchrone import ahacher_mot_de_passe
+
 
 # --- FORMULAIRE DE CONNEXION ---
 class UserLoginForm(forms.Form):
@@ -75,4 +77,14 @@ class UserRegisterForm(UserCreationForm):
         email = self.cleaned_data.get('email')
         if User.objects.filter(email=email).exists():
             raise forms.ValidationError("Cette adresse email est déjà utilisée.")
-        return email
\ No newline at end of file
+        return email
+
+    async def asave(self):
+        """
+        Équivalent asynchrone de `save()` : le mot de passe est haché dans le
+        pool de hachage, pas dans la boucle d'événements.
+        """
+        user = self.instance
+        user.password = await ahacher_mot_de_passe(self.cleaned_data['password1'])
+        await user.asave()
+        return user
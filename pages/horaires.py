@@ -0,0 +1,130 @@
+"""
+Horaires d'ouverture en mémoire.
+
+Les 7 lignes de `HorairesOuverture` sont lues une fois et précalculées dans
+une `Semaine` qui répond en temps constant à « ouvert en ce moment ? » et
+« prochaine ouverture ? ». La semaine est gardée par processus avec la
+version des horaires (pages/cache.py) : enregistrer un horaire incrémente
+la version et la semaine est reconstruite au prochain appel. La page
+d'accueil, la validation des réservations (reservation/capacite.py) et
+l'API JSON des horaires la partagent.
+
+Sans cache partagé (`settings.CACHE_PARTAGE`), la version n'est incrémentée
+que dans le worker qui a enregistré les horaires : les autres accepteraient
+des réservations selon les anciens. La semaine est alors relue à chaque appel
+(7 lignes).
+"""
+import datetime
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import aversion_horaires, version_horaires
+from .models import HorairesOuverture
+
+# Code du jour indexé par `date.weekday()`
+JOURS = [code for code, _ in HorairesOuverture.JOURS_CHOICES]
+MINUIT = 24 * 60
+
+
+def _minutes(heure: datetime.time) -> int:
+    return heure.hour * 60 + heure.minute
+
+
+def _intervalle(horaire):
+    """(ouverture, fermeture) en minutes depuis minuit ; une fermeture après minuit dépasse 24 h."""
+    ouverture, fermeture = _minutes(horaire.heure_ouverture), _minutes(horaire.heure_fermeture)
+    return ouverture, fermeture + MINUIT if fermeture <= ouverture else fermeture
+
+
+class Semaine:
+    """Horaires de la semaine, précalculés par jour."""
+
+    def __init__(self, horaires):
+        self.horaires = list(horaires)
+        ouverts = {horaire.jour: horaire for horaire in self.horaires if not horaire.est_ferme}
+        self._jours = [ouverts.get(code) for code in JOURS]
+        self._intervalles = [horaire and _intervalle(horaire) for horaire in self._jours]
+        # Nombre de jours (1 à 7) jusqu'au prochain jour d'ouverture, pour chaque jour
+        self._prochain = [
+            next((decalage for decalage in range(1, 8) if self._jours[(jour + decalage) % 7]), None)
+            for jour in range(7)
+        ]
+
+    def horaire(self, date: datetime.date):
+        """Horaires du jour de `date`, ou None si le restaurant est fermé ce jour-là."""
+        return self._jours[date.weekday()]
+
+    def fermeture(self, moment: datetime.datetime):
+        """Heure de fermeture (datetime) si le restaurant est ouvert à `moment`, sinon None."""
+        moment = timezone.localtime(moment)
+        jour, minutes = moment.weekday(), _minutes(moment.time())
+        debut = datetime.datetime.combine(moment.date(), datetime.time(), tzinfo=moment.tzinfo)
+        courant = self._intervalles[jour]
+        if courant and courant[0] <= minutes < courant[1]:
+            return debut + datetime.timedelta(minutes=courant[1])
+        # Service de la veille qui finit après minuit
+        veille = self._intervalles[jour - 1]
+        if veille and minutes + MINUIT < veille[1]:
+            return debut + datetime.timedelta(minutes=veille[1] - MINUIT)
+        return None
+
+    def est_ouvert(self, moment: datetime.datetime) -> bool:
+        return self.fermeture(moment) is not None
+
+    def prochaine_ouverture(self, moment: datetime.datetime):
+        """Prochaine ouverture (datetime) après `moment`, ou None si le restaurant ne rouvre jamais."""
+        moment = timezone.localtime(moment)
+        jour = moment.weekday()
+        courant = self._intervalles[jour]
+        if courant and _minutes(moment.time()) < courant[0]:
+            return datetime.datetime.combine(moment.date(), self._jours[jour].heure_ouverture, tzinfo=moment.tzinfo)
+        decalage = self._prochain[jour]
+        if decalage is None:
+            return None
+        return datetime.datetime.combine(
+            moment.date() + datetime.timedelta(days=decalage),
+            self._jours[(jour + decalage) % 7].heure_ouverture,
+            tzinfo=moment.tzinfo,
+        )
+
+    def etat(self, moment: datetime.datetime) -> dict:
+        """{'ouvert', 'fermeture', 'prochaine_ouverture'} à `moment`."""
+        fermeture = self.fermeture(moment)
+        return {
+            'ouvert': fermeture is not None,
+            'fermeture': fermeture,
+            'prochaine_ouverture': self.prochaine_ouverture(moment),
+        }
+
+
+_semaine = (None, None)
+_verrou = threading.Lock()
+
+
+def _requete():
+    return HorairesOuverture.objects.order_by('id')
+
+
+def semaine() -> Semaine:
+    """La semaine courante ; aucune requête SQL tant que les horaires ne changent pas (cache partagé)."""
+    global _semaine
+    if not getattr(settings, 'CACHE_PARTAGE', False):
+        return Semaine(_requete())
+    # Version lue avant les lignes : une semaine n'est jamais plus ancienne que sa version
+    version = version_horaires()
+    with _verrou:
+        if _semaine[0] != version:
+            _semaine = (version, Semaine(_requete()))
+        return _semaine[1]
+
+
+async def asemaine() -> Semaine:
+    global _semaine
+    if not getattr(settings, 'CACHE_PARTAGE', False):
+        return Semaine([horaire async for horaire in _requete()])
+    version = await aversion_horaires()
+    if _semaine[0] != version:
+        _semaine = (version, Semaine([horaire async for horaire in _requete()]))
+    return _semaine[1]
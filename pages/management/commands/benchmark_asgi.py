@@ -0,0 +1,146 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Sum
+from django.urls import reverse
+
+from commandes import taches
+from commandes.models import LigneCommande
+from commandes.services import passer_commande
+from menu.models import Plat
+from menu.stock import restaurer_lot
+from taches.models import Tache
+
+PAGES = ['home', 'menu', 'Mes_commande', 'mes_reservations']
+HOTE = '127.0.0.1'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit des pages de lecture servies par le gestionnaire WSGI (un thread par requête) "
+        "et par le gestionnaire ASGI (boucle asyncio, vues asynchrones), dans le processus, sans réseau. "
+        "Un client, sa session et ses commandes sont créés pour l'occasion puis supprimés, le stock rendu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requetes', type=int, default=400, help="Requêtes par mesure.")
+        parser.add_argument('--concurrence', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--page', action='append', dest='pages', help="Nom d'URL à mesurer (répétable).")
+
+    def handle(self, *args, **options):
+        chemins = [reverse(page) for page in options['pages'] or PAGES]
+        user, session = self.preparer()
+        try:
+            cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+            for chemin in chemins:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{chemin}'))
+                for concurrence in options['concurrence']:
+                    for nom, mesurer in (('WSGI', self.mesurer_wsgi), ('ASGI', self.mesurer_asgi)):
+                        durees, total, statuts = mesurer(chemin, cookie, options['requetes'], concurrence)
+                        self.stdout.write(
+                            f'  {nom} x{concurrence:<3} {options["requetes"] / total:8.1f} req/s   '
+                            f'médiane {statistics.median(durees):7.2f} ms   max {max(durees):8.2f} ms   '
+                            f'statuts {sorted(statuts)}'
+                        )
+        finally:
+            self.nettoyer(user, session)
+
+    def preparer(self):
+        """Client de test (avec quelques commandes) et session authentifiée, réellement enregistrés."""
+        user = User.objects.create_user('benchmark-asgi', password=None)
+        plat = Plat.objects.filter(disponible=True, stock__gte=10).first()
+        if plat is not None:
+            for _ in range(3):
+                passer_commande(user, {plat.pk: 1})
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return user, session
+
+    def nettoyer(self, user, session):
+        """Supprime le client, ses commandes et leurs e-mails en file, et rend le stock pris."""
+        session.delete()
+        lignes = LigneCommande.objects.filter(commande__client=user)
+        quantites = dict(
+            lignes.order_by().values('plat_id').annotate(quantite=Sum('quantite')).values_list('plat_id', 'quantite')
+        )
+        commandes = list(lignes.values_list('commande_id', flat=True).distinct())
+        user.delete()
+        restaurer_lot(quantites)
+        Tache.objects.filter(nom=taches.envoyer_confirmation.nom, arguments__args__0__in=commandes).delete()
+
+    def mesurer_wsgi(self, chemin, cookie, requetes, concurrence):
+        application = get_wsgi_application()
+        statuts = set()
+
+        def requete(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': chemin, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOTE, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': HOTE, 'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            debut = time.perf_counter()
+            reponse = application(environ, lambda statut, entetes: statuts.add(statut.split()[0]))
+            try:
+                b''.join(reponse)
+            finally:
+                reponse.close()
+            return (time.perf_counter() - debut) * 1000
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrence) as pool:
+            durees = list(pool.map(requete, range(requetes)))
+        return durees, time.perf_counter() - debut, statuts
+
+    def mesurer_asgi(self, chemin, cookie, requetes, concurrence):
+        application = get_asgi_application()
+        statuts = set()
+
+        async def requete(limite):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': chemin, 'raw_path': chemin.encode(),
+                'query_string': b'', 'root_path': '',
+                'headers': [(b'host', HOTE.encode()), (b'cookie', cookie.encode())],
+                'client': (HOTE, 50000), 'server': (HOTE, 80),
+            }
+            corps_lu = asyncio.Event()
+
+            async def recevoir():
+                if corps_lu.is_set():
+                    # Le client ne se déconnecte jamais : attend l'annulation par Django
+                    await asyncio.Event().wait()
+                corps_lu.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def envoyer(message):
+                if message['type'] == 'http.response.start':
+                    statuts.add(str(message['status']))
+
+            async with limite:
+                debut = time.perf_counter()
+                await application(scope, recevoir, envoyer)
+                return (time.perf_counter() - debut) * 1000
+
+        async def charge():
+            limite = asyncio.Semaphore(concurrence)
+            debut = time.perf_counter()
+            durees = await asyncio.gather(*(requete(limite) for _ in range(requetes)))
+            return list(durees), time.perf_counter() - debut
+
+        durees, total = asyncio.run(charge())
+        return durees, total, statuts
@@ -0,0 +1,296 @@
+import datetime
+import io
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from commandes import taches
+from commandes.models import Commande, LigneCommande
+from experiance.models import Temoignage
+from menu.models import Plat
+from menu.stock import restaurer_lot
+from pages.horaires import semaine
+from reservation import capacite
+from restaurant.requetes import relever
+from taches.models import Tache
+
+HOTE = '127.0.0.1'
+PREFIXE = 'charge-'
+MOT_DE_PASSE = 'charge-mot-de-passe'
+# Parcours d'un client : poids relatif de chaque action
+MELANGE = {
+    'carte': 40,
+    'mes_commandes': 15,
+    'commander': 12,
+    'reserver': 10,
+    'avis': 8,
+    'annuler': 5,
+    'connexion': 3,
+}
+
+
+def centile(durees, rang):
+    if len(durees) < 2:
+        return durees[0]
+    return statistics.quantiles(durees, n=100, method='inclusive')[rang - 1]
+
+
+class UtilisateurVirtuel:
+    """Un client du site : ses cookies, et ses requêtes envoyées à l'application WSGI dans ce thread."""
+
+    def __init__(self, application, user, mesures, hasard):
+        self.application = application
+        self.user = user
+        self.mesures = mesures
+        self.hasard = hasard
+        self.cookies = {}
+
+    def requete(self, etiquette, methode, chemin, donnees=None):
+        corps = urlencode(donnees or {}).encode()
+        environ = {
+            'REQUEST_METHOD': methode, 'PATH_INFO': chemin, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': HOTE, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOTE,
+            'HTTP_COOKIE': '; '.join(f'{nom}={valeur}' for nom, valeur in self.cookies.items()),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded', 'CONTENT_LENGTH': str(len(corps)),
+            'wsgi.input': io.BytesIO(corps), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        if 'csrftoken' in self.cookies:
+            environ['HTTP_X_CSRFTOKEN'] = self.cookies['csrftoken']
+        reponse = {}
+
+        def demarrer(statut, entetes):
+            reponse['statut'] = int(statut.split()[0])
+            for nom, valeur in entetes:
+                if nom.lower() == 'set-cookie':
+                    for morceau in SimpleCookie(valeur).values():
+                        if morceau['max-age'] == '0':
+                            self.cookies.pop(morceau.key, None)
+                        else:
+                            self.cookies[morceau.key] = morceau.value
+
+        debut = time.perf_counter()
+        with relever() as releve:
+            corps_reponse = self.application(environ, demarrer)
+            try:
+                b''.join(corps_reponse)
+            finally:
+                corps_reponse.close()
+        self.mesures.append((etiquette, (time.perf_counter() - debut) * 1000, releve.nombre, reponse['statut']))
+        return reponse['statut']
+
+    def connexion(self):
+        self.cookies.clear()
+        self.requete('page_connexion', 'GET', reverse('login'))
+        self.requete('connexion', 'POST', reverse('login'), {'username': self.user.username, 'password': MOT_DE_PASSE})
+
+    def carte(self):
+        self.requete('carte', 'GET', reverse('menu'))
+
+    def mes_commandes(self):
+        self.requete('mes_commandes', 'GET', reverse('Mes_commande'))
+
+    def commander(self, plats):
+        self.requete('commander', 'GET', reverse('commande', args=[self.hasard.choice(plats)]))
+
+    def annuler(self, plats):
+        commande = (
+            Commande.objects.filter(client=self.user, status=Commande.StatusChoices.PENDING)
+            .order_by('-pk').values_list('pk', flat=True).first()
+        )
+        if commande is None:
+            return self.commander(plats)
+        self.requete('annuler', 'POST', reverse('cancel_commande', args=[commande]))
+
+    def reserver(self):
+        horaires = semaine()
+        for decalage in self.hasard.sample(range(1, 29), 28):
+            date = timezone.localdate() + datetime.timedelta(days=decalage)
+            horaire = horaires.horaire(date)
+            creneaux = horaire and capacite.creneaux_de_reservation(horaire)
+            if creneaux:
+                break
+        else:
+            return self.carte()
+        self.requete('reserver', 'POST', reverse('reservation'), {
+            'nom_client': self.user.username, 'email': f'{self.user.username}@example.com',
+            'telephone': '600000000', 'date_reservation': date.isoformat(),
+            'heure_reservation': self.hasard.choice(creneaux).strftime('%H:%M'),
+            'nb_personnes': self.hasard.randint(1, 4),
+        })
+
+    def avis(self):
+        self.requete('avis', 'POST', reverse('laisser_avis'), {
+            'auteur': self.user.username, 'titre_plat': 'Ndolé', 'note': self.hasard.randint(1, 5),
+            'texte': "Avis laissé pendant un test de charge.",
+        })
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge dans le processus : N clients virtuels (threads) envoient à l'application WSGI "
+        "un mélange pondéré de requêtes (carte, connexion, commande, historique, annulation, réservation, "
+        "avis) et la commande affiche, par point d'entrée, les latences p50/p95/p99, le débit et les "
+        "requêtes SQL par requête. Les clients, leurs commandes, réservations et avis sont supprimés et "
+        "le stock qu'ils ont pris rendu à la fin. --json enregistre les résultats, --comparer les compare à un essai précédent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--utilisateurs', type=int, default=8, help="Clients virtuels simultanés.")
+        parser.add_argument('--duree', type=float, default=20, help="Durée de l'essai (secondes).")
+        parser.add_argument('--graine', type=int, default=0, help="Graine du tirage des actions.")
+        parser.add_argument('--json', help="Fichier où enregistrer les résultats.")
+        parser.add_argument('--comparer', help="Résultats JSON d'un essai précédent.")
+
+    def handle(self, *args, **options):
+        plats = list(Plat.objects.filter(disponible=True, stock__gt=0).values_list('pk', flat=True))
+        if not plats:
+            raise CommandError("Aucun plat disponible : lancez l'essai sur une base avec une carte.")
+        precedent = self.lire(options['comparer']) if options['comparer'] else None
+
+        mot_de_passe = make_password(MOT_DE_PASSE)
+        users = User.objects.bulk_create([
+            User(username=f'{PREFIXE}{numero}', password=mot_de_passe) for numero in range(options['utilisateurs'])
+        ])
+        try:
+            mesures, duree = self.lancer(users, plats, options)
+        finally:
+            self.nettoyer(users)
+
+        resultats = self.resultats(mesures, duree, options)
+        self.afficher(resultats, precedent)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as fichier:
+                json.dump(resultats, fichier, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Résultats enregistrés dans {options['json']}.")
+
+    def lancer(self, users, plats, options):
+        application = get_wsgi_application()
+        actions, poids = zip(*MELANGE.items())
+        fin = time.monotonic() + options['duree']
+        mesures, verrou = [], threading.Lock()
+
+        def client(numero):
+            hasard = random.Random(options['graine'] * 1000 + numero)
+            locales = []
+            virtuel = UtilisateurVirtuel(application, users[numero], locales, hasard)
+            try:
+                virtuel.connexion()
+                while time.monotonic() < fin:
+                    action = hasard.choices(actions, poids)[0]
+                    if action in ('commander', 'annuler'):
+                        getattr(virtuel, action)(plats)
+                    else:
+                        getattr(virtuel, action)()
+            finally:
+                connections.close_all()
+                with verrou:
+                    mesures.extend(locales)
+
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users), thread_name_prefix='charge') as pool:
+            list(pool.map(client, range(len(users))))
+        return mesures, time.perf_counter() - debut
+
+    def nettoyer(self, users):
+        """
+        Supprime les clients virtuels et ce qu'ils ont laissé, et rend au stock
+        ce que leurs commandes encore actives ont pris (les annulées l'ont déjà
+        rendu) : les commandes réelles passées pendant l'essai restent comptées.
+        """
+        lignes = LigneCommande.objects.filter(commande__client__in=users)
+        quantites = dict(
+            lignes.exclude(commande__status=Commande.StatusChoices.FAILED)
+            .order_by().values('plat_id').annotate(quantite=Sum('quantite')).values_list('plat_id', 'quantite')
+        )
+        commandes = list(lignes.values_list('commande_id', flat=True).distinct())
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
+        Temoignage.objects.filter(auteur__startswith=PREFIXE).delete()
+        Tache.objects.filter(nom=taches.envoyer_confirmation.nom, arguments__args__0__in=commandes).delete()
+        restaurer_lot(quantites)
+
+    def resultats(self, mesures, duree, options):
+        par_etiquette = {}
+        for etiquette, ms, requetes, statut in mesures:
+            par_etiquette.setdefault(etiquette, []).append((ms, requetes, statut))
+
+        def resume(lignes):
+            durees = sorted(ms for ms, _, _ in lignes)
+            return {
+                'requetes_http': len(lignes),
+                'par_seconde': round(len(lignes) / duree, 1),
+                'p50_ms': round(centile(durees, 50), 2),
+                'p95_ms': round(centile(durees, 95), 2),
+                'p99_ms': round(centile(durees, 99), 2),
+                'sql_par_requete': round(statistics.mean(requetes for _, requetes, _ in lignes), 2),
+                'erreurs': sum(statut >= 500 for _, _, statut in lignes),
+            }
+
+        return {
+            'date': timezone.now().isoformat(),
+            'commit': self.commit(),
+            'base': connections['default'].vendor,
+            'utilisateurs': options['utilisateurs'],
+            'duree_s': round(duree, 2),
+            'total': resume([ligne for lignes in par_etiquette.values() for ligne in lignes]),
+            'points': {etiquette: resume(lignes) for etiquette, lignes in sorted(par_etiquette.items())},
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5,
+            ).stdout.strip()
+        except OSError:
+            return ''
+
+    def lire(self, chemin):
+        try:
+            with open(chemin, encoding='utf-8') as fichier:
+                return json.load(fichier)
+        except (OSError, ValueError) as erreur:
+            raise CommandError(f"{chemin} : {erreur}")
+
+    def afficher(self, resultats, precedent):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{resultats['utilisateurs']} client(s), {resultats['duree_s']} s, base {resultats['base']}, "
+            f"commit {resultats['commit'] or '?'}"
+        ))
+        self.stdout.write(
+            f"  {'':<16}{'req':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL/req':>9}{'5xx':>6}"
+        )
+        lignes = [*resultats['points'].items(), ('total', resultats['total'])]
+        for etiquette, point in lignes:
+            ligne = (
+                f"  {etiquette:<16}{point['requetes_http']:>7}{point['par_seconde']:>9}{point['p50_ms']:>9}"
+                f"{point['p95_ms']:>9}{point['p99_ms']:>9}{point['sql_par_requete']:>9}{point['erreurs']:>6}"
+            )
+            ancien = precedent and (
+                precedent['total'] if etiquette == 'total' else precedent['points'].get(etiquette)
+            )
+            if ancien:
+                ligne += (
+                    f"   p95 {point['p95_ms'] - ancien['p95_ms']:+.2f} ms, "
+                    f"req/s {point['par_seconde'] - ancien['par_seconde']:+.1f}, "
+                    f"SQL {point['sql_par_requete'] - ancien['sql_par_requete']:+.2f}"
+                )
+            self.stdout.write(ligne)
+        if precedent:
+            self.stdout.write(f"Comparé au commit {precedent.get('commit') or '?'} du {precedent.get('date')}.")
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horairesouverture',
+            name='places_par_creneau',
+            field=models.PositiveIntegerField(default=40, verbose_name='Places par créneau'),
+        ),
+    ]
@@ -26,6 +26,8 @@ class HorairesOuverture(models.Model):
     heure_ouverture = models.TimeField()
     heure_fermeture = models.TimeField()
     est_ferme = models.BooleanField(default=False)
+    # Couverts disponibles à un même moment (voir reservation/capacite.py)
+    places_par_creneau = models.PositiveIntegerField(default=40, verbose_name="Places par créneau")
 
     class Meta:
         verbose_name_plural = "Horaires d'ouverture"
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache
+from .models import HorairesOuverture, Temoignage
+
+
+# Après le commit, comme pour la carte (menu/signals.py) : la semaine (pages/horaires.py)
+# et les blocs de l'accueil ne doivent pas être recalculés avec les anciennes lignes
+@receiver(post_save, sender=HorairesOuverture)
+@receiver(post_delete, sender=HorairesOuverture)
+def invalider_horaires(sender, instance, **kwargs):
+    transaction.on_commit(cache.invalider_horaires)
+
+
+@receiver(post_save, sender=Temoignage)
+@receiver(post_delete, sender=Temoignage)
+def invalider_temoignages(sender, instance, **kwargs):
+    transaction.on_commit(cache.invalider_temoignages)
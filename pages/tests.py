@@ -1,3 +1,304 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from commandes.services import passer_commande
+from experiance.models import Temoignage as Avis
+from menu import stock, views as menu_views
+from menu.models import CategorieMenu, Plat
+from reservation import views as reservation_views
+from reservation.models import Table
+from restaurant.asynchrone import hors_boucle
+from restaurant.testing import REGLAGES_CACHE_PARTAGE
+from taches.models import Tache
+from . import horaires, views
+from .horaires import Semaine
+from .models import HorairesOuverture, Temoignage
+
+
+class VuesAsynchronesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='secret-123')
+
+    def test_vues_de_lecture_asynchrones(self):
+        for vue in (views.home, views.login_user, views.register_user, menu_views.menu,
+                    menu_views.detail, menu_views.commande_detail_ajax, reservation_views.mes_reservations):
+            self.assertTrue(iscoroutinefunction(vue), vue.__name__)
+
+    async def test_pages_sous_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        for nom in ('home', 'menu', 'Mes_commande', 'mes_reservations'):
+            response = await self.async_client.get(reverse(nom))
+            self.assertEqual(response.status_code, 200, nom)
+            self.assertContains(response, 'client')
+
+    async def test_hachage_hors_de_la_boucle(self):
+        nom = await hors_boucle(lambda: threading.current_thread().name)
+        self.assertTrue(nom.startswith('hachage'))
+
+
+class ConnexionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='secret-123')
+
+    def test_connexion(self):
+        response = self.client.post(reverse('login'), {'username': 'client', 'password': 'secret-123'})
+
+        self.assertRedirects(response, reverse('home'))
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_mauvais_mot_de_passe(self):
+        for username in ('client', 'inconnu'):
+            response = self.client.post(reverse('login'), {'username': username, 'password': 'faux'})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_echec_signale(self):
+        echecs = []
+
+        def noter(sender, credentials, request, **kwargs):
+            echecs.append((credentials, request.path))
+
+        user_login_failed.connect(noter)
+        self.addCleanup(user_login_failed.disconnect, noter)
+        self.client.post(reverse('login'), {'username': 'client', 'password': 'faux'})
+
+        self.assertEqual(echecs, [({'username': 'client', 'password': '********************'}, reverse('login'))])
+
+    def test_compte_inactif(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.client.post(reverse('login'), {'username': 'client', 'password': 'secret-123'})
+
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_inscription(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'nouveau',
+            'email': 'nouveau@exemple.com',
+            'password1': 'Ndole-et-miondo-42',
+            'password2': 'Ndole-et-miondo-42',
+        })
+
+        self.assertRedirects(response, reverse('login'))
+        self.assertTrue(User.objects.get(username='nouveau').check_password('Ndole-et-miondo-42'))
+
+    def test_inscription_email_deja_utilise(self):
+        User.objects.filter(pk=self.user.pk).update(email='client@exemple.com')
+
+        response = self.client.post(reverse('register'), {
+            'username': 'nouveau',
+            'email': 'client@exemple.com',
+            'password1': 'Ndole-et-miondo-42',
+            'password2': 'Ndole-et-miondo-42',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(username='nouveau').exists())
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class CacheAccueilTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='secret-123')
+        categorie = CategorieMenu.objects.create(nom='Plats', ordre=1)
+        cls.plat = Plat.objects.create(categorie=categorie, nom='Ndolé', prix=3500, stock=5, is_special=True)
+        HorairesOuverture.objects.create(jour='MAR', heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22))
+        Temoignage.objects.create(auteur='Awa', titre_plat='Ndolé', texte='Excellent')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_anonyme_partagee(self):
+        self.client.get(reverse('home'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Ndolé')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Temoignage.objects.create(auteur='Bob', titre_plat='Poulet DG', texte='Parfait')
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(reverse('home')), 'Bob')
+
+    @override_settings(CACHE_PARTAGE=False, CACHE_DUREE_LOCALE=0)
+    def test_sans_cache_partage_la_page_expire(self):
+        self.client.get(reverse('home'))
+
+        with CaptureQueriesContext(connection) as requetes:
+            self.assertContains(self.client.get(reverse('home')), 'Ndolé')
+        self.assertTrue(requetes.captured_queries)
+
+    def test_blocs_pour_les_clients_connectes(self):
+        self.client.get(reverse('home'))
+        self.client.force_login(self.user)
+
+        # Utilisateur lu une fois puis gardé en cache (compte/backends.py) ; session et blocs viennent du cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'client')
+        self.assertContains(response, '11:00')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HorairesOuverture.objects.filter(jour='MAR').get().delete()
+        self.assertNotContains(self.client.get(reverse('home')), '11:00')
+
+    def test_plat_et_stock_invalident(self):
+        self.client.get(reverse('home'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plat.nom = 'Eru'
+            self.plat.save()
+        self.assertContains(self.client.get(reverse('home')), 'Eru')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.reserver(self.plat.pk, 5)
+        self.assertNotContains(self.client.get(reverse('home')), 'Eru')
+
+
+class SemaineTest(SimpleTestCase):
+    def setUp(self):
+        self.semaine = Semaine([
+            HorairesOuverture(jour='LUN', heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22), est_ferme=True),
+            HorairesOuverture(jour='MAR', heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22)),
+            # Ferme après minuit
+            HorairesOuverture(jour='SAM', heure_ouverture=datetime.time(18), heure_fermeture=datetime.time(2)),
+        ])
+
+    def moment(self, jour, heure, minute=0):
+        # 2026-10-19 est un lundi
+        return timezone.make_aware(datetime.datetime(2026, 10, 19 + jour, heure, minute))
+
+    def test_ouvert_maintenant(self):
+        self.assertFalse(self.semaine.est_ouvert(self.moment(0, 12)))
+        self.assertTrue(self.semaine.est_ouvert(self.moment(1, 11)))
+        self.assertFalse(self.semaine.est_ouvert(self.moment(1, 22)))
+        self.assertEqual(self.semaine.fermeture(self.moment(1, 12)), self.moment(1, 22))
+        # Dimanche 1 h : service du samedi soir
+        self.assertEqual(self.semaine.fermeture(self.moment(6, 1)), self.moment(6, 2))
+        self.assertFalse(self.semaine.est_ouvert(self.moment(6, 2)))
+        self.assertIsNone(self.semaine.horaire(self.moment(0, 12).date()))
+
+    def test_prochaine_ouverture(self):
+        self.assertEqual(self.semaine.prochaine_ouverture(self.moment(1, 9)), self.moment(1, 11))
+        self.assertEqual(self.semaine.prochaine_ouverture(self.moment(1, 12)), self.moment(5, 18))
+        self.assertEqual(self.semaine.prochaine_ouverture(self.moment(5, 23)), self.moment(8, 11))
+        self.assertIsNone(Semaine([]).prochaine_ouverture(self.moment(0, 12)))
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class HorairesApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for jour, _ in HorairesOuverture.JOURS_CHOICES:
+            HorairesOuverture.objects.create(jour=jour, heure_ouverture=datetime.time(0), heure_fermeture=datetime.time(0))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_horaires_en_memoire(self):
+        self.client.get(reverse('horaires_api'))
+
+        with self.assertNumQueries(0):
+            donnees = self.client.get(reverse('horaires_api')).json()
+        self.assertTrue(donnees['ouvert'])
+        self.assertEqual(len(donnees['semaine']), 7)
+
+        horaire = HorairesOuverture.objects.get(jour=horaires.JOURS[timezone.localdate().weekday()])
+        with self.captureOnCommitCallbacks(execute=True):
+            horaire.est_ferme = True
+            horaire.save()
+        self.assertFalse(self.client.get(reverse('horaires_api')).json()['ouvert'])
+
+    @override_settings(CACHE_PARTAGE=False)
+    def test_sans_cache_partage_horaires_relus(self):
+        self.client.get(reverse('horaires_api'))
+
+        # Horaires modifiés dans un autre worker : aucune invalidation vue ici
+        HorairesOuverture.objects.update(est_ferme=True)
+
+        self.assertFalse(self.client.get(reverse('horaires_api')).json()['ouvert'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkChargeTest(TransactionTestCase):
+    """Les clients virtuels utilisent des threads : leurs requêtes doivent voir les données (pas de transaction de test)."""
+
+    def setUp(self):
+        cache.clear()
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        self.plats = [
+            Plat.objects.create(categorie=categorie, nom=f'Plat {i}', description='...', prix=1000, stock=50)
+            for i in range(3)
+        ]
+        for jour, _ in HorairesOuverture.JOURS_CHOICES:
+            HorairesOuverture.objects.create(jour=jour, heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22))
+        Table.objects.create(numero='T1', places=4)
+
+    def test_essai_et_nettoyage(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        chemin = os.path.join(dossier, 'charge.json')
+        # Une vraie commande et un plat retiré par l'équipe ne doivent pas être touchés
+        vrai_client = User.objects.create_user('vrai-client', email='client@example.com')
+        commande = passer_commande(vrai_client, {self.plats[0].pk: 2})
+        retire = Plat.objects.create(
+            categorie=self.plats[0].categorie, nom='Retiré', description='...', prix=1000, stock=50, disponible=False,
+        )
+
+        call_command('benchmark_charge', '--utilisateurs', '2', '--duree', '0.5', '--json', chemin, stdout=io.StringIO())
+        sortie = io.StringIO()
+        call_command('benchmark_charge', '--utilisateurs', '2', '--duree', '0.5', '--comparer', chemin, stdout=sortie)
+
+        with open(chemin, encoding='utf-8') as fichier:
+            resultats = json.load(fichier)
+        self.assertEqual(resultats['total']['erreurs'], 0)
+        self.assertGreaterEqual(resultats['points']['connexion']['requetes_http'], 2)
+        self.assertLessEqual(resultats['total']['p50_ms'], resultats['total']['p99_ms'])
+        self.assertIn('Comparé au commit', sortie.getvalue())
+        # Clients virtuels, commandes et avis supprimés, stock pris par les clients virtuels rendu
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['vrai-client'])
+        self.assertFalse(Avis.objects.exists())
+        self.assertEqual(
+            dict(Plat.objects.values_list('pk', 'stock')),
+            {self.plats[0].pk: 48, self.plats[1].pk: 50, self.plats[2].pk: 50, retire.pk: 50},
+        )
+        self.assertFalse(Plat.objects.get(pk=retire.pk).disponible)
+        self.assertEqual(list(Tache.objects.values_list('arguments__args__0', flat=True)), [commande.pk])
+
+
+class BenchmarkAsgiTest(TransactionTestCase):
+    def test_stock_rendu_et_file_videe(self):
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        plat = Plat.objects.create(categorie=categorie, nom='Ndolé', description='...', prix=3500, stock=50)
+
+        call_command(
+            'benchmark_asgi', '--requetes', '2', '--concurrence', '1', '--page', 'menu', stdout=io.StringIO(),
+        )
+
+        plat.refresh_from_db()
+        self.assertEqual((plat.stock, plat.disponible), (50, True))
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Tache.objects.exists())
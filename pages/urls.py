@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import home,login_user,logout_user,register_user
+from .views import home,horaires_api,login_user,logout_user,register_user
 
 urlpatterns = [
     path('',home, name="home"),
     path('login/',login_user, name="login"),
     path('logout/',logout_user, name="logout"),
     path('register/',register_user, name="register"),
+    path('api/horaires/',horaires_api, name="horaires_api"),
 ]
\ No newline at end of file
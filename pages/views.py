@@ -1,42 +1,80 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_safe
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib import messages
-from menu.models import Plat
-from .models import HorairesOuverture, Temoignage
+from restaurant.asynchrone import charger_utilisateur
+from restaurant.requetes import budget_requetes
+from .cache import acontexte_accueil, aenregistrer_page_anonyme, apage_anonyme, aversions
+from .horaires import asemaine
 from .forms import UserLoginForm, UserRegisterForm
 
 
-def home(request):
+@budget_requetes(2)
+async def home(request):
     """
     Vue de la page d'accueil.
-    Charge les plats spéciaux, les horaires et les témoignages.
+    Charge les plats spéciaux et les témoignages (pages/cache.py) et les
+    horaires (pages/horaires.py) ; les visiteurs anonymes reçoivent la page
+    déjà rendue.
     """
-    try:
-        # On récupère les plats spéciaux, ou les 3 premiers si aucun n'est marqué spécial
-        plats_speciaux = Plat.objects.filter(is_special=True, disponible=True)[:3]
-        if not plats_speciaux:
-            plats_speciaux = Plat.objects.filter(disponible=True)[:3]
-    except Exception:
-        plats_speciaux = []
+    user = await charger_utilisateur(request)
+    versions = await aversions()
+    semaine = await asemaine()
+    etat = semaine.etat(timezone.now())
 
-    horaires = HorairesOuverture.objects.all().order_by('id')
-    temoignages = Temoignage.objects.filter(visible=True).order_by('-date_ajout')[:2]
+    if not user.is_authenticated:
+        contenu = await apage_anonyme(versions, etat)
+        if contenu is not None:
+            return HttpResponse(contenu)
 
     context = {
-        'plats_speciaux': plats_speciaux,
-        'horaires': horaires,
-        'temoignages': temoignages,
+        **await acontexte_accueil(versions),
+        'horaires': semaine.horaires,
+        'ouverture': etat,
     }
-
-    return render(request, 'index.html', context)
-
-
-def login_user(request):
+    response = render(request, 'index.html', context)
+
+    if not user.is_authenticated:
+        await aenregistrer_page_anonyme(versions, etat, response.content)
+    return response
+
+
+@budget_requetes(1)
+@require_safe
+@cache_control(public=True, max_age=60)
+async def horaires_api(request):
+    """Horaires de la semaine et état d'ouverture en JSON (bornes, application mobile)."""
+    semaine = await asemaine()
+    etat = semaine.etat(timezone.now())
+    return JsonResponse({
+        'ouvert': etat['ouvert'],
+        'fermeture': etat['fermeture'],
+        'prochaine_ouverture': etat['prochaine_ouverture'],
+        'semaine': [
+            {
+                'jour': horaire.jour,
+                'libelle': horaire.get_jour_display(),
+                'ouverture': horaire.heure_ouverture,
+                'fermeture': horaire.heure_fermeture,
+                'ferme': horaire.est_ferme,
+            }
+            for horaire in semaine.horaires
+        ],
+    })
+
+
+@budget_requetes(4)
+async def login_user(request):
     """
     Gère la connexion des utilisateurs.
+    Le mot de passe est vérifié dans le pool de hachage (compte/backends.py).
     """
     # Si l'utilisateur est déjà connecté, on le redirige vers l'accueil
-    if request.user.is_authenticated:
+    if (await charger_utilisateur(request)).is_authenticated:
         return redirect('home')
 
     if request.method == 'POST':
@@ -46,10 +84,10 @@ def login_user(request):
             username = login_form.cleaned_data.get('username')
             password = login_form.cleaned_data.get('password')
 
-            user = authenticate(request, username=username, password=password)
+            user = await aauthenticate(request, username=username, password=password)
 
             if user is not None:
-                login(request, user)
+                await alogin(request, user)
                 # Message de succès (barre verte)
                 messages.success(request, f"Ravi de vous revoir, {username} !")
 
@@ -75,20 +113,23 @@ def login_user(request):
     return render(request, 'login.html', context)
 
 
-def register_user(request):
+@budget_requetes(6)
+async def register_user(request):
     """
     Gère l'inscription des nouveaux utilisateurs.
+    Le mot de passe est haché dans le pool de hachage (restaurant/asynchrone.py).
     """
     # Si l'utilisateur est déjà connecté, on le redirige
-    if request.user.is_authenticated:
+    if (await charger_utilisateur(request)).is_authenticated:
         return redirect('home')
 
     if request.method == 'POST':
         register_form = UserRegisterForm(request.POST)
 
-        if register_form.is_valid():
+        # Unicité du nom et de l'email : requêtes SQL synchrones
+        if await sync_to_async(register_form.is_valid)():
             # Sauvegarde l'utilisateur dans la base de données
-            register_form.save()
+            await register_form.asave()
 
             username = register_form.cleaned_data.get('username')
             messages.success(request, f"Compte créé avec succès pour {username} ! Veuillez vous connecter.")
@@ -109,6 +150,7 @@ def register_user(request):
     return render(request, 'register.html', context)
 
 
+@budget_requetes(3)
 def logout_user(request):
     """
     Déconnecte l'utilisateur et redirige vers l'accueil.
@@ -1,10 +1,37 @@
-from django.contrib import admin
-from .models import Reservation
+import datetime
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from . import capacite, occupation, tables
+from .forms import ReservationAdminForm
+from .models import OccupationCreneau, Reservation, Table
+
+
+@admin.register(Table)
+class TableAdmin(admin.ModelAdmin):
+    list_display = ('numero', 'places', 'voisines_resume', 'active')
+    list_editable = ('places', 'active')
+    list_filter = ('active',)
+    filter_horizontal = ('voisines',)
+
+    def voisines_resume(self, obj):
+        return ', '.join(voisine.numero for voisine in obj.voisines.all())
+    voisines_resume.short_description = 'Combinable avec'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('voisines')
 
 
 # Personnalisation de l'affichage pour le modèle Reservation
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
+    # Vérifie la capacité des créneaux (fiche et statut modifié depuis la liste)
+    form = ReservationAdminForm
+
     # Les champs à afficher dans la liste des objets (tableau)
     list_display = (
         'nom_client',
@@ -12,6 +39,7 @@ class ReservationAdmin(admin.ModelAdmin):
         'heure_reservation',
         'nb_personnes',
         'statut',
+        'tables_resume',
         'telephone'
     )
 
@@ -42,7 +70,7 @@ class ReservationAdmin(admin.ModelAdmin):
             'fields': ('nom_client', 'telephone', 'email')
         }),
         ('Détails de la Réservation', {
-            'fields': ('date_reservation', 'heure_reservation', 'nb_personnes', 'statut', 'note_speciale')
+            'fields': ('date_reservation', 'heure_reservation', 'nb_personnes', 'statut', 'tables', 'note_speciale')
         }),
         ('Suivi', {
             'fields': ('date_demande',),
@@ -52,4 +80,74 @@ class ReservationAdmin(admin.ModelAdmin):
     )
 
     # Rendre certains champs non modifiables
-    readonly_fields = ('date_demande',)
\ No newline at end of file
+    # Les tables sont attribuées par le solveur (reservation/tables.py)
+    readonly_fields = ('date_demande', 'tables')
+
+    def tables_resume(self, obj):
+        return ', '.join(table.numero for table in obj.tables.all()) or '-'
+    tables_resume.short_description = 'Tables'
+
+    actions = ['placer_journees']
+
+    def placer_journees(self, request, queryset):
+        dates = sorted(set(queryset.values_list('date_reservation', flat=True)))
+        non_placees = sum((tables.affecter_journee(date) for date in dates), [])
+        self.message_user(request, f'Réservations confirmées placées sur {len(dates)} journée(s).')
+        if non_placees:
+            self.message_user(
+                request, f'{len(non_placees)} réservation(s) sans table disponible.', level=messages.WARNING
+            )
+    placer_journees.short_description = '🪑 Placer les réservations confirmées de ces journées'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('tables')
+
+    def get_urls(self):
+        return [
+            path('occupation/', self.admin_site.admin_view(self.occupation_view), name='reservation_reservation_occupation'),
+        ] + super().get_urls()
+
+    def occupation_view(self, request):
+        """Carte des couverts par créneau et par jour du mois (?mois=AAAA-MM), en cache."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            mois = datetime.datetime.strptime(request.GET.get('mois', ''), '%Y-%m').date()
+        except ValueError:
+            mois = timezone.localdate().replace(day=1)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Occupation des créneaux",
+            'mois': mois,
+            'mois_precedent': (mois - datetime.timedelta(days=1)).replace(day=1),
+            'mois_suivant': (mois + datetime.timedelta(days=31)).replace(day=1),
+            'grille': occupation.occupation_du_mois(mois.year, mois.month),
+        }
+        return TemplateResponse(request, 'admin/reservation/reservation/occupation.html', context)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ReservationAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        # Occupation des créneaux mise à jour dans la même transaction
+        capacite.enregistrer(obj)
+        # Placement incrémental : seule cette réservation (ou son service) change de tables
+        if tables.reaffecter(obj):
+            messages.warning(request, "Aucune table disponible pour certaines réservations de ce service.")
+
+
+@admin.register(OccupationCreneau)
+class OccupationCreneauAdmin(admin.ModelAdmin):
+    list_display = ('date', 'heure', 'places_occupees')
+    list_filter = ('date',)
+    date_hierarchy = 'date'
+    ordering = ('date', 'heure')
+
+    # Tenue à jour par reservation/capacite.py : consultation seulement
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,235 @@
+"""
+Capacité du restaurant et occupation des créneaux de réservation.
+
+La journée est découpée en créneaux de `RESERVATION_DUREE_CRENEAU` minutes
+entre l'ouverture et la fermeture (`pages.HorairesOuverture`), chaque jour
+ayant `places_par_creneau` couverts. Un repas occupe ses places pendant
+`RESERVATION_DUREE_REPAS` minutes, donc sur plusieurs créneaux consécutifs.
+
+Les places occupées sont tenues dans `OccupationCreneau`. Comme pour le stock
+des plats (menu/stock.py), prendre des places est un ``UPDATE`` conditionnel
+unique (``SET places = places + n WHERE places <= capacité - n``) sur les
+créneaux couverts : deux réservations simultanées ne peuvent pas dépasser la
+capacité, et vérifier une disponibilité ne lit que quelques lignes par clé.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from pages.horaires import semaine
+from pages.models import HorairesOuverture
+from .models import OccupationCreneau, Reservation
+
+# Statuts dont les places sont comptées (une réservation annulée libère les siennes)
+STATUTS_OCCUPANT = ('PENDING', 'CONFIRMED', 'COMPLETED')
+MINUIT = 24 * 60
+
+
+class CreneauIndisponible(Exception):
+    """Date passée, jour de fermeture, heure en dehors des horaires ou nombre de couverts invalide."""
+
+
+class CreneauComplet(Exception):
+    """Levée quand un créneau n'a plus assez de places libres."""
+
+    def __init__(self, date, heure, nb_personnes):
+        self.date = date
+        self.heure = heure
+        self.nb_personnes = nb_personnes
+        super().__init__(
+            f"Plus assez de places le {date:%d/%m/%Y} à {heure:%H:%M} pour {nb_personnes} personne(s)."
+        )
+
+
+def _duree_creneau() -> int:
+    return getattr(settings, 'RESERVATION_DUREE_CRENEAU', 30)
+
+
+def _duree_repas() -> int:
+    return getattr(settings, 'RESERVATION_DUREE_REPAS', 90)
+
+
+def _minutes(heure: datetime.time) -> int:
+    return heure.hour * 60 + heure.minute
+
+
+def _heure(minutes: int) -> datetime.time:
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def intervalle_repas(heure: datetime.time) -> tuple:
+    """(début, fin) en minutes depuis minuit du repas commençant à `heure`."""
+    debut = _minutes(heure)
+    return debut, debut + _duree_repas()
+
+
+def debut_creneau(heure: datetime.time) -> datetime.time:
+    """Début du créneau contenant `heure` (19:10 -> 19:00 avec des créneaux de 30 minutes)."""
+    minutes = _minutes(heure)
+    return _heure(minutes - minutes % _duree_creneau())
+
+
+def creneaux_couverts(heure: datetime.time) -> list:
+    """Créneaux occupés par un repas commençant à `heure`."""
+    debut = _minutes(debut_creneau(heure))
+    fin = min(debut + _duree_repas(), MINUIT)
+    return [_heure(minutes) for minutes in range(debut, fin, _duree_creneau())]
+
+
+def creneaux_de_reservation(horaire: HorairesOuverture) -> list:
+    """Heures auxquelles on peut réserver : de l'ouverture au dernier service avant la fermeture."""
+    ouverture = -(-_minutes(horaire.heure_ouverture) // _duree_creneau()) * _duree_creneau()
+    fermeture = _minutes(horaire.heure_fermeture)
+    if fermeture <= _minutes(horaire.heure_ouverture):
+        # Fermeture après minuit : les créneaux s'arrêtent à minuit
+        fermeture = MINUIT
+    return [_heure(minutes) for minutes in range(ouverture, fermeture - _duree_repas() + 1, _duree_creneau())]
+
+
+def _verifier_couverts(nb_personnes):
+    # Un nombre négatif ferait baisser l'occupation du créneau (l'UPDATE ajoute nb_personnes)
+    if nb_personnes < 1:
+        raise CreneauIndisponible("Une réservation est pour une personne au moins.")
+
+
+def horaires_du_jour(date: datetime.date):
+    """Horaires du jour de `date`, ou None si le restaurant est fermé ce jour-là (sans requête SQL)."""
+    return semaine().horaire(date)
+
+
+def _places(reservation):
+    """(date, début de créneau, couverts) des places tenues par `reservation`, ou None."""
+    if reservation is None or reservation.statut not in STATUTS_OCCUPANT:
+        return None
+    return (reservation.date_reservation, debut_creneau(reservation.heure_reservation), reservation.nb_personnes)
+
+
+def verifier(reservation: Reservation, ancienne: Reservation = None):
+    """
+    Vérifie que `reservation` (non enregistrée, ou modifiée à partir de
+    `ancienne`) peut prendre ses places ; lève `CreneauIndisponible` ou
+    `CreneauComplet`. Ne fait rien si ses places ne changent pas.
+    Lecture seule : la garantie finale est l'UPDATE de `enregistrer`.
+    """
+    places = _places(reservation)
+    if places is None or places == _places(ancienne):
+        return
+    date, heure, nb_personnes = places
+    _verifier_couverts(nb_personnes)
+
+    maintenant = timezone.localtime()
+    if (date, heure) < (maintenant.date(), debut_creneau(maintenant.time())):
+        raise CreneauIndisponible("Cette date est déjà passée.")
+    horaire = horaires_du_jour(date)
+    if horaire is None:
+        raise CreneauIndisponible("Le restaurant est fermé ce jour-là.")
+    creneaux = creneaux_de_reservation(horaire)
+    if heure not in creneaux:
+        raise CreneauIndisponible(
+            f"Ce jour-là, les réservations sont possibles de {creneaux[0]:%H:%M} à {creneaux[-1]:%H:%M}."
+            if creneaux else "Aucune réservation n'est possible ce jour-là."
+        )
+
+    couverts = creneaux_couverts(heure)
+    occupation = defaultdict(int, OccupationCreneau.objects.filter(
+        date=date, heure__in=couverts
+    ).values_list('heure', 'places_occupees'))
+    anciennes_places = _places(ancienne)
+    if anciennes_places and anciennes_places[0] == date:
+        # Les places de la réservation modifiée seront libérées
+        for creneau in creneaux_couverts(anciennes_places[1]):
+            occupation[creneau] -= anciennes_places[2]
+    if any(occupation[creneau] + nb_personnes > horaire.places_par_creneau for creneau in couverts):
+        raise CreneauComplet(date, heure, nb_personnes)
+
+
+def _occuper(horaire, date, heure, nb_personnes):
+    _verifier_couverts(nb_personnes)
+    if horaire is None:
+        raise CreneauIndisponible("Le restaurant est fermé ce jour-là.")
+    couverts = creneaux_couverts(heure)
+    OccupationCreneau.objects.bulk_create(
+        [OccupationCreneau(date=date, heure=creneau) for creneau in couverts],
+        ignore_conflicts=True,
+    )
+    updated = OccupationCreneau.objects.filter(
+        date=date,
+        heure__in=couverts,
+        places_occupees__lte=horaire.places_par_creneau - nb_personnes,
+    ).update(places_occupees=F('places_occupees') + nb_personnes)
+    if updated != len(couverts):
+        raise CreneauComplet(date, heure, nb_personnes)
+
+
+def _liberer(date, heure, nb_personnes):
+    OccupationCreneau.objects.filter(date=date, heure__in=creneaux_couverts(heure)).update(
+        places_occupees=F('places_occupees') - nb_personnes
+    )
+
+
+def enregistrer(reservation: Reservation):
+    """
+    Enregistre la réservation (création ou modification) et met à jour
+    l'occupation des créneaux dans la même transaction. Si les places ne
+    sont plus disponibles, rien n'est enregistré et `CreneauComplet` est levée.
+    """
+    apres = _places(reservation)
+    # Horaires lus avant la transaction : sans cache partagé, c'est une requête (pages/horaires.py)
+    horaire = horaires_du_jour(apres[0]) if apres else None
+    with transaction.atomic():
+        ancienne = None
+        if reservation.pk:
+            ancienne = Reservation.objects.select_for_update().filter(pk=reservation.pk).only(
+                'date_reservation', 'heure_reservation', 'nb_personnes', 'statut'
+            ).first()
+        avant = _places(ancienne)
+        if avant != apres:
+            if avant:
+                _liberer(*avant)
+            if apres:
+                _occuper(horaire, *apres)
+        reservation.save()
+    return reservation
+
+
+def liberer(reservation: Reservation):
+    """Libère les places d'une réservation supprimée."""
+    places = _places(reservation)
+    if places:
+        _liberer(*places)
+
+
+def prochains_creneaux(date: datetime.date, heure: datetime.time, nb_personnes: int, nombre=3, jours=7) -> list:
+    """
+    Les `nombre` prochains créneaux (datetime) à partir de `date` et `heure`
+    où `nb_personnes` couverts sont encore libres, sur `jours` jours au plus.
+    Une seule requête : l'occupation de la période.
+    """
+    horaires = semaine()
+    occupation = defaultdict(int)
+    for jour, creneau, places in OccupationCreneau.objects.filter(
+        date__range=(date, date + datetime.timedelta(days=jours)), places_occupees__gt=0
+    ).values_list('date', 'heure', 'places_occupees'):
+        occupation[jour, creneau] = places
+
+    maintenant = timezone.localtime()
+    depart = max((date, heure), (maintenant.date(), maintenant.time()))
+    suggestions = []
+    for decalage in range(jours + 1):
+        jour = date + datetime.timedelta(days=decalage)
+        horaire = horaires.horaire(jour)
+        if horaire is None:
+            continue
+        for creneau in creneaux_de_reservation(horaire):
+            if (jour, creneau) < depart:
+                continue
+            if all(occupation[jour, c] + nb_personnes <= horaire.places_par_creneau
+                   for c in creneaux_couverts(creneau)):
+                suggestions.append(datetime.datetime.combine(jour, creneau))
+                if len(suggestions) == nombre:
+                    return suggestions
+    return suggestions
@@ -1,8 +1,43 @@
 from django import forms
+from django.core.validators import MaxValueValidator
+from .capacite import CreneauComplet, CreneauIndisponible, prochains_creneaux, verifier
 from .models import Reservation
 
 
-class ReservationForm(forms.ModelForm):
+class CapaciteFormMixin:
+    """
+    Refuse une réservation si le restaurant est fermé ou si le créneau est
+    complet ; `self.suggestions` liste alors les prochains créneaux libres.
+    Les champs absents du formulaire gardent la valeur de l'instance.
+    """
+    CHAMPS_CAPACITE = ('date_reservation', 'heure_reservation', 'nb_personnes', 'statut')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self.suggestions = []
+        valeurs = {champ: cleaned_data.get(champ, getattr(self.instance, champ)) for champ in self.CHAMPS_CAPACITE}
+        if None in valeurs.values():
+            return cleaned_data
+
+        try:
+            verifier(Reservation(**valeurs), self.instance if self.instance.pk else None)
+        except CreneauIndisponible as e:
+            raise forms.ValidationError(str(e))
+        except CreneauComplet as e:
+            self.suggestions = prochains_creneaux(e.date, e.heure, e.nb_personnes)
+            message = str(e)
+            if self.suggestions:
+                message += " Prochains créneaux libres : " + ", ".join(
+                    f"{suggestion:%d/%m à %H:%M}" for suggestion in self.suggestions
+                ) + "."
+            raise forms.ValidationError(message)
+        return cleaned_data
+
+
+class ReservationForm(CapaciteFormMixin, forms.ModelForm):
+    # Au-delà, un groupe appelle le restaurant
+    NB_PERSONNES_MAX = 20
+
     class Meta:
         model = Reservation
         fields = [
@@ -30,10 +65,11 @@ class ReservationForm(forms.ModelForm):
             'class': common_classes,
             'placeholder': '6XX XX XX XX'
         })
+        self.fields['nb_personnes'].validators.append(MaxValueValidator(self.NB_PERSONNES_MAX))
         self.fields['nb_personnes'].widget.attrs.update({
             'class': common_classes,
             'min': 1,
-            'max': 20
+            'max': self.NB_PERSONNES_MAX
         })
 
         # Styles spécifiques pour date et heure
@@ -50,4 +86,10 @@ class ReservationForm(forms.ModelForm):
         self.fields['note_speciale'].widget.attrs.update({
             'class': 'w-full px-4 py-3 rounded-xl border border-gray-300 focus:border-orange-500 focus:ring-2 focus:ring-orange-200 outline-none transition-all duration-200 bg-gray-50 hover:bg-white min-h-[120px] resize-none',
             'placeholder': 'Précisez ici vos allergies, régime spécial ou occasion particulière...'
-        })
\ No newline at end of file
+        })
+
+
+class ReservationAdminForm(CapaciteFormMixin, forms.ModelForm):
+    class Meta:
+        model = Reservation
+        fields = '__all__'
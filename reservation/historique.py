@@ -0,0 +1,46 @@
+"""
+Page « Mes réservations » : réservations à venir et historique paginé.
+
+Une seule requête, servie par l'index (`client, -date_reservation,
+-heure_reservation`) : chaque ligne est classée « à venir » (date future et
+non annulée) ou « passée », et une fonction de fenêtre numérote les
+réservations passées à partir du curseur. On garde toutes les réservations à
+venir et une page de l'historique (+1 ligne pour savoir s'il y a une suite).
+"""
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from restaurant.pagination import condition_curseur, construire_page, decoder_curseur, ordre_curseur
+from .models import Reservation
+
+CHAMPS = ('date_reservation', 'heure_reservation')
+
+
+def _a_venir(aujourdhui) -> Q:
+    return Q(date_reservation__gte=aujourdhui) & ~Q(statut='CANCELLED')
+
+
+def requete(client, aujourdhui, position=None, par_page=10):
+    a_venir = _a_venir(aujourdhui)
+    ordre = ordre_curseur(position, CHAMPS)
+    reservations = Reservation.objects.filter(client=client)
+    if position is not None:
+        # Réservations à venir, et historique au-delà du curseur
+        reservations = reservations.filter(a_venir | condition_curseur(position, CHAMPS))
+    return reservations.annotate(
+        a_venir=ExpressionWrapper(a_venir, output_field=BooleanField()),
+    ).annotate(
+        rang=Window(RowNumber(), partition_by=[F('a_venir')], order_by=ordre),
+    ).filter(
+        Q(a_venir=True) | Q(rang__lte=par_page + 1),
+    ).order_by(*ordre)
+
+
+async def ames_reservations(client, aujourdhui, curseur=None, par_page=10):
+    """Retourne (réservations à venir, de la plus proche à la plus lointaine ; `PageCurseur` de l'historique)."""
+    position = decoder_curseur(curseur, Reservation, CHAMPS)
+    a_venir, passees = [], []
+    async for reservation in requete(client, aujourdhui, position, par_page):
+        (a_venir if reservation.a_venir else passees).append(reservation)
+    a_venir.sort(key=lambda reservation: (reservation.date_reservation, reservation.heure_reservation, reservation.pk))
+    return a_venir, construire_page(passees, position, par_page, CHAMPS)
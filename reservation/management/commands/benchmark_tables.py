@@ -0,0 +1,73 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservation import tables
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le solveur de placement (reservation/tables.py) sur des journées synthétiques : "
+        "résolution complète d'un service, puis mode incrémental après la modification d'une réservation. "
+        "Aucun accès à la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, default=40)
+        parser.add_argument('--couverts', type=int, default=300)
+        parser.add_argument('--journees', type=int, default=50)
+        parser.add_argument('--graine', type=int, default=0)
+
+    def handle(self, *args, **options):
+        aleatoire = random.Random(options['graine'])
+        complets, increments, taux = [], [], []
+        for _ in range(options['journees']):
+            salle = self.salle(aleatoire, options['tables'])
+            demandes = self.journee(aleatoire, options['couverts'])
+
+            debut = time.perf_counter()
+            affectation, non_placees = tables.resoudre(salle, demandes)
+            complets.append((time.perf_counter() - debut) * 1000)
+            taux.append(1 - len(non_placees) / len(demandes))
+
+            # Une réservation change d'heure et de nombre de couverts
+            index = aleatoire.randrange(len(demandes))
+            reservation_id, debut_repas, _, _ = demandes[index]
+            debut_repas = max(18 * 60, debut_repas + aleatoire.choice((-30, 30)))
+            demandes[index] = (reservation_id, debut_repas, debut_repas + 90, aleatoire.randint(1, 8))
+            debut = time.perf_counter()
+            tables.resoudre_increment(salle, demandes, affectation, reservation_id)
+            increments.append((time.perf_counter() - debut) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['journees']} journées, {options['tables']} tables, ~{options['couverts']} couverts"
+        ))
+        for nom, durees in (('Résolution complète', complets), ('Mode incrémental', increments)):
+            self.stdout.write(
+                f"  {nom:<20} médiane {statistics.median(durees):6.2f} ms   max {max(durees):6.2f} ms"
+            )
+        self.stdout.write(f"  Réservations placées : {statistics.mean(taux):.1%} en moyenne")
+
+    def salle(self, aleatoire, nombre):
+        """Tables de 2, 4 et 6 places ; les tables voisines (numéros consécutifs) se combinent par paires."""
+        salle = {}
+        for table_id in range(1, nombre + 1):
+            voisines = set()
+            if table_id % 4 != 0 and table_id < nombre:
+                voisines.add(table_id + 1)
+            if table_id % 4 != 1:
+                voisines.add(table_id - 1)
+            salle[table_id] = (aleatoire.choice((2, 2, 4, 4, 4, 6)), frozenset(voisines))
+        return salle
+
+    def journee(self, aleatoire, couverts):
+        """Groupes de 1 à 8 personnes arrivant entre 18:00 et 21:30, par quart d'heure."""
+        demandes = []
+        while couverts > 0:
+            nb_personnes = min(couverts, aleatoire.choice((2, 2, 2, 3, 4, 4, 5, 6, 8)))
+            debut = 18 * 60 + 15 * aleatoire.randrange(15)
+            demandes.append((len(demandes) + 1, debut, debut + 90, nb_personnes))
+            couverts -= nb_personnes
+        return demandes
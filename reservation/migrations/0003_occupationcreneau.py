@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-18 04:29
+
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remplir_occupation(apps, schema_editor):
+    """Places occupées par les réservations, passées comprises (carte d'occupation, voir reservation/capacite.py)."""
+    Reservation = apps.get_model('reservation', 'Reservation')
+    OccupationCreneau = apps.get_model('reservation', 'OccupationCreneau')
+    duree_creneau = getattr(settings, 'RESERVATION_DUREE_CRENEAU', 30)
+    duree_repas = getattr(settings, 'RESERVATION_DUREE_REPAS', 90)
+
+    occupation = Counter()
+    for date, heure, nb_personnes in Reservation.objects.filter(
+        statut__in=('PENDING', 'CONFIRMED', 'COMPLETED'),
+    ).values_list('date_reservation', 'heure_reservation', 'nb_personnes').iterator():
+        debut = heure.hour * 60 + heure.minute
+        debut -= debut % duree_creneau
+        for minutes in range(debut, min(debut + duree_repas, 24 * 60), duree_creneau):
+            occupation[date, minutes] += nb_personnes
+
+    OccupationCreneau.objects.bulk_create(
+        [
+            OccupationCreneau(date=date, heure=datetime.time(minutes // 60, minutes % 60), places_occupees=places)
+            for (date, minutes), places in occupation.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0002_alter_reservation_options_reservation_client'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupationCreneau',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('heure', models.TimeField()),
+                ('places_occupees', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Occupation d'un créneau",
+                'verbose_name_plural': 'Occupation des créneaux',
+                'constraints': [models.UniqueConstraint(fields=('date', 'heure'), name='occupation_creneau_unique')],
+            },
+        ),
+        migrations.RunPython(remplir_occupation, migrations.RunPython.noop),
+    ]
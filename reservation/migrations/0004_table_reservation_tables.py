@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0003_occupationcreneau'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.CharField(max_length=10, unique=True)),
+                ('places', models.PositiveSmallIntegerField()),
+                ('active', models.BooleanField(default=True)),
+                ('voisines', models.ManyToManyField(blank=True, to='reservation.table', verbose_name='Tables combinables')),
+            ],
+            options={
+                'ordering': ['numero'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='tables',
+            field=models.ManyToManyField(blank=True, related_name='reservations', to='reservation.table'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0004_table_reservation_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['client', '-date_reservation', '-heure_reservation'], name='reservation_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('statut__in', ['PENDING', 'CONFIRMED'])), fields=['date_reservation', 'heure_reservation'], name='reservation_active_date_idx'),
+        ),
+    ]
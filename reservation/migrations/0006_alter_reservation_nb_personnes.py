@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-18 14:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0005_reservation_reservation_client_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='nb_personnes',
+            field=models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
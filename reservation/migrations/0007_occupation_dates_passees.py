@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-18 14:40
+
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations
+
+
+def remplir_dates_passees(apps, schema_editor):
+    """
+    Occupation des dates qui n'en ont aucune : 0003 ne remplissait que les
+    réservations à venir, la carte d'occupation des mois passés était vide.
+    Les dates déjà suivies (au moins une ligne) ne sont pas touchées.
+    """
+    Reservation = apps.get_model('reservation', 'Reservation')
+    OccupationCreneau = apps.get_model('reservation', 'OccupationCreneau')
+    duree_creneau = getattr(settings, 'RESERVATION_DUREE_CRENEAU', 30)
+    duree_repas = getattr(settings, 'RESERVATION_DUREE_REPAS', 90)
+
+    suivies = set(OccupationCreneau.objects.values_list('date', flat=True).distinct())
+    occupation = Counter()
+    for date, heure, nb_personnes in Reservation.objects.filter(
+        statut__in=('PENDING', 'CONFIRMED', 'COMPLETED'),
+    ).values_list('date_reservation', 'heure_reservation', 'nb_personnes').iterator():
+        if date in suivies:
+            continue
+        debut = heure.hour * 60 + heure.minute
+        debut -= debut % duree_creneau
+        for minutes in range(debut, min(debut + duree_repas, 24 * 60), duree_creneau):
+            occupation[date, minutes] += nb_personnes
+
+    OccupationCreneau.objects.bulk_create(
+        [
+            OccupationCreneau(date=date, heure=datetime.time(minutes // 60, minutes % 60), places_occupees=places)
+            for (date, minutes), places in occupation.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0006_alter_reservation_nb_personnes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_dates_passees, migrations.RunPython.noop),
+    ]
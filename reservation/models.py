@@ -1,9 +1,24 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 import datetime
 
 
+class Table(models.Model):
+    """Table de la salle. Deux tables voisines peuvent être réunies pour un groupe."""
+    numero = models.CharField(max_length=10, unique=True)
+    places = models.PositiveSmallIntegerField()
+    voisines = models.ManyToManyField('self', blank=True, verbose_name="Tables combinables")
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['numero']
+
+    def __str__(self):
+        return f"Table {self.numero} ({self.places} places)"
+
+
 class Reservation(models.Model):
     """Modèle pour une demande de réservation de table."""
     STATUT_CHOICES = [
@@ -25,15 +40,27 @@ class Reservation(models.Model):
     heure_reservation = models.TimeField()
 
     # Détails de la table
-    nb_personnes = models.IntegerField(default=1)
+    nb_personnes = models.IntegerField(default=1, validators=[MinValueValidator(1)])
     note_speciale = models.TextField(blank=True, null=True, verbose_name="Notes spéciales")
 
     # Suivi
     date_demande = models.DateTimeField(auto_now_add=True)
     statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default='PENDING')
+    # Placement calculé par reservation/tables.py
+    tables = models.ManyToManyField(Table, blank=True, related_name='reservations')
 
     class Meta:
         ordering = ['-date_reservation', '-heure_reservation']  # Du plus récent au plus ancien
+        indexes = [
+            # « Mes réservations » (reservation/historique.py)
+            models.Index(fields=['client', '-date_reservation', '-heure_reservation'], name='reservation_client_date_idx'),
+            # Réservations actives d'une journée : admin, placement des tables, occupation
+            models.Index(
+                fields=['date_reservation', 'heure_reservation'],
+                condition=models.Q(statut__in=['PENDING', 'CONFIRMED']),
+                name='reservation_active_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Réservation de {self.nom_client} pour {self.nb_personnes} le {self.date_reservation}"
@@ -43,4 +70,26 @@ class Reservation(models.Model):
     def est_passee(self):
         # Combine date et heure pour comparer avec maintenant
         dt_resa = datetime.datetime.combine(self.date_reservation, self.heure_reservation)
-        return dt_resa < datetime.datetime.now()
\ No newline at end of file
+        return dt_resa < datetime.datetime.now()
+
+
+class OccupationCreneau(models.Model):
+    """
+    Places occupées sur un créneau (tranche de `RESERVATION_DUREE_CRENEAU`
+    minutes). Tenue à jour par reservation/capacite.py à chaque création,
+    modification ou annulation de réservation : vérifier une disponibilité
+    revient à lire quelques lignes par leur clé, sans agréger `Reservation`.
+    """
+    date = models.DateField()
+    heure = models.TimeField()
+    places_occupees = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Occupation d'un créneau"
+        verbose_name_plural = "Occupation des créneaux"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'heure'], name='occupation_creneau_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.heure:%H:%M} : {self.places_occupees} place(s)"
@@ -0,0 +1,119 @@
+"""
+Carte d'occupation des créneaux sur un mois (admin des réservations).
+
+La grille se lit dans `OccupationCreneau`, déjà tenue à jour par
+reservation/capacite.py : une requête pour l'occupation du mois, quel que
+soit le nombre de réservations (les horaires sont en mémoire,
+pages/horaires.py). Elle est mise en cache sous une clé versionnée par
+mois ; prendre ou libérer des places incrémente la version du mois après le
+commit, et la clé comprend aussi la version des horaires. Un affichage en cache ne
+fait aucune requête SQL. Sans cache partagé, les autres workers ne voient pas
+l'invalidation : versions et grilles expirent au bout de quelques secondes
+(restaurant/cache.py).
+"""
+import calendar
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from pages.cache import version_horaires
+from pages.horaires import semaine
+from restaurant.cache import duree
+from . import capacite
+from .models import OccupationCreneau
+
+DUREE = 60 * 60 * 24
+
+
+def _cle_version_mois(annee, mois):
+    return f'reservation:occupation:version:{annee}-{mois:02d}'
+
+
+def _nouvelle_version():
+    return time.time_ns()
+
+
+def _versions(cles):
+    versions = cache.get_many(cles)
+    manquantes = {cle: _nouvelle_version() for cle in cles if cle not in versions}
+    if manquantes:
+        cache.set_many(manquantes, duree(DUREE))
+        versions.update(manquantes)
+    return versions
+
+
+def _incrementer(cles):
+    for cle in cles:
+        try:
+            cache.incr(cle)
+        except ValueError:
+            cache.set(cle, _nouvelle_version(), duree(DUREE))
+
+
+def invalider_dates(dates):
+    """À appeler dans la transaction qui change l'occupation de ces dates."""
+    cles = {_cle_version_mois(date.year, date.month) for date in dates}
+    transaction.on_commit(lambda: _incrementer(cles))
+
+
+def _ouverts(horaire):
+    """Créneaux pendant lesquels des places peuvent être occupées ce jour-là."""
+    return {
+        creneau
+        for heure in capacite.creneaux_de_reservation(horaire)
+        for creneau in capacite.creneaux_couverts(heure)
+    }
+
+
+def _calculer(annee, mois):
+    jours = [datetime.date(annee, mois, jour) for jour in range(1, calendar.monthrange(annee, mois)[1] + 1)]
+    horaires = semaine()
+    occupation = dict(
+        ((date, heure), places) for date, heure, places in OccupationCreneau.objects.filter(
+            date__range=(jours[0], jours[-1]), places_occupees__gt=0,
+        ).values_list('date', 'heure', 'places_occupees')
+    )
+
+    colonnes, ouverts, par_horaire = [], {}, {}
+    for jour in jours:
+        horaire = horaires.horaire(jour)
+        if horaire is not None and horaire.pk not in par_horaire:
+            par_horaire[horaire.pk] = _ouverts(horaire)
+        colonnes.append((jour, horaire.places_par_creneau if horaire else None))
+        ouverts[jour] = par_horaire[horaire.pk] if horaire else set()
+
+    lignes, maximum = [], 0
+    for creneau in sorted(set().union(*par_horaire.values())):
+        cellules = []
+        for jour, places in colonnes:
+            if creneau not in ouverts[jour]:
+                cellules.append(None)
+                continue
+            occupees = occupation.get((jour, creneau), 0)
+            cellules.append((occupees, places, min(occupees / places, 1) if places else 1))
+            maximum = max(maximum, occupees)
+        lignes.append((creneau, cellules))
+
+    return {
+        'jours': [jour for jour, _ in colonnes],
+        'lignes': lignes,
+        'couverts_max': maximum,
+    }
+
+
+def occupation_du_mois(annee: int, mois: int) -> dict:
+    """
+    Grille d'occupation du mois : {'jours': [date], 'lignes': [(créneau,
+    [None | (places occupées, capacité, taux)])], 'couverts_max'}.
+    None : restaurant fermé à ce créneau.
+    """
+    cle_mois = _cle_version_mois(annee, mois)
+    version = _versions([cle_mois])[cle_mois]
+    cle = f'reservation:occupation:{annee}-{mois:02d}:{version}:{version_horaires()}'
+    grille = cache.get(cle)
+    if grille is None:
+        grille = _calculer(annee, mois)
+        cache.set(cle, grille, duree(DUREE))
+    return grille
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import capacite, occupation
+from .models import Reservation
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_supprimee(sender, instance, **kwargs):
+    capacite.liberer(instance)
+
+
+@receiver(pre_save, sender=Reservation)
+def memoriser_date(sender, instance, **kwargs):
+    """Retient l'ancienne date d'une réservation pour invalider aussi son mois si elle change."""
+    instance._date_initiale = (
+        Reservation.objects.filter(pk=instance.pk).values_list('date_reservation', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalider_occupation(sender, instance, **kwargs):
+    dates = {instance.date_reservation, getattr(instance, '_date_initiale', None)}
+    occupation.invalider_dates(date for date in dates if date)
@@ -0,0 +1,211 @@
+"""
+Placement des réservations confirmées sur les tables de la salle.
+
+Une réservation occupe une table, ou deux tables voisines réunies, pendant
+la durée d'un repas. Le solveur traite les réservations par heure d'arrivée
+(les plus grands groupes d'abord à heure égale) et donne à chacune le
+placement libre le plus juste : le moins de places perdues, une table seule
+plutôt que deux à capacité égale. Les placements possibles sont triés une
+fois pour toutes ; une journée de 40 tables et 300 couverts se résout en
+quelques millisecondes (`manage.py benchmark_tables`).
+
+Le mode incrémental (`reaffecter`) ne touche qu'à la réservation modifiée
+s'il lui reste une place libre ; sinon il ne résout à nouveau que le service
+qui la contient : les réservations qui se chevauchent, de proche en proche.
+Les autres gardent leurs tables.
+
+Le cœur (`placements`, `resoudre`, `resoudre_increment`) ne lit pas la base :
+tables et réservations y sont de simples tuples.
+"""
+import bisect
+
+from django.db import transaction
+
+from .capacite import intervalle_repas
+from .models import Reservation, Table
+
+# Lien réservation <-> table (une ligne par table occupée)
+Affectation = Reservation.tables.through
+
+
+def placements(tables: dict) -> list:
+    """
+    Placements possibles [(places, (table_id, ...))] triés du plus petit au
+    plus grand. `tables` : {table_id: (places, voisines)}.
+    """
+    resultat = [(places, (table_id,)) for table_id, (places, _) in tables.items()]
+    for table_id, (places, voisines) in tables.items():
+        for voisine in voisines:
+            if table_id < voisine and voisine in tables:
+                resultat.append((places + tables[voisine][0], (table_id, voisine)))
+    resultat.sort(key=lambda placement: (placement[0], len(placement[1]), placement[1]))
+    return resultat
+
+
+def _places(tables, placement):
+    """Places d'un placement existant (0 si l'une de ses tables n'est plus active)."""
+    if not all(table_id in tables for table_id in placement):
+        return 0
+    return sum(tables[table_id][0] for table_id in placement)
+
+
+def _libre(occupation, placement, debut, fin):
+    return not any(
+        debut < fin_occupee and debut_occupe < fin
+        for table_id in placement
+        for debut_occupe, fin_occupee in occupation.get(table_id, ())
+    )
+
+
+def _placer(demande, possibles, capacites, occupation):
+    _, debut, fin, nb_personnes = demande
+    for places, placement in possibles[bisect.bisect_left(capacites, nb_personnes):]:
+        if _libre(occupation, placement, debut, fin):
+            for table_id in placement:
+                occupation.setdefault(table_id, []).append((debut, fin))
+            return placement
+    return None
+
+
+def resoudre(tables: dict, demandes: list, occupation: dict = None, possibles: list = None):
+    """
+    Place les `demandes` [(reservation_id, début, fin, couverts)] (minutes)
+    sur les `tables`, en plus de l'`occupation` déjà fixée
+    ({table_id: [(début, fin)]}, complétée au passage).
+    Retourne ({reservation_id: (table_id, ...)}, [reservation_id non placées]).
+    """
+    possibles = possibles if possibles is not None else placements(tables)
+    capacites = [places for places, _ in possibles]
+    occupation = {} if occupation is None else occupation
+    affectation, non_placees = {}, []
+    for demande in sorted(demandes, key=lambda demande: (demande[1], -demande[3], demande[0])):
+        placement = _placer(demande, possibles, capacites, occupation)
+        if placement is None:
+            non_placees.append(demande[0])
+        else:
+            affectation[demande[0]] = placement
+    return affectation, non_placees
+
+
+def _service(demandes: list, demande) -> list:
+    """Demandes reliées à `demande` par une chaîne de chevauchements (un service)."""
+    service, fin = [], None
+    for autre in sorted(demandes, key=lambda autre: (autre[1], autre[0])):
+        if fin is not None and autre[1] >= fin:
+            # Personne n'est encore à table : un nouveau service commence
+            if demande in service:
+                break
+            service, fin = [], None
+        service.append(autre)
+        fin = autre[2] if fin is None else max(fin, autre[2])
+    return service
+
+
+def resoudre_increment(tables: dict, demandes: list, affectation: dict, reservation_id):
+    """
+    Replace la réservation `reservation_id` après une modification.
+    `demandes` : toutes les demandes du jour (état modifié) ; `affectation` :
+    placement actuel {reservation_id: (table_id, ...)}.
+    Retourne ({reservation_id: nouveau placement} pour les seules réservations
+    qui changent de tables, [reservation_id non placées]).
+    """
+    par_id = {demande[0]: demande for demande in demandes}
+    demande = par_id.get(reservation_id)
+    if demande is None:
+        return {}, []
+
+    possibles = placements(tables)
+    capacites = [places for places, _ in possibles]
+    occupation = {}
+    for autre_id, placement in affectation.items():
+        if autre_id != reservation_id and autre_id in par_id:
+            for table_id in placement:
+                occupation.setdefault(table_id, []).append(par_id[autre_id][1:3])
+
+    # 1. Les mêmes tables si elles conviennent encore, sinon une place libre, sans déplacer personne
+    actuel = affectation.get(reservation_id, ())
+    if actuel and _places(tables, actuel) >= demande[3] and _libre(occupation, actuel, *demande[1:3]):
+        return {}, []
+    placement = _placer(demande, possibles, capacites, occupation)
+    if placement is not None:
+        return {reservation_id: placement}, []
+
+    # 2. Nouvelle résolution du seul service concerné
+    nouvelle, non_placees = resoudre(tables, _service(demandes, demande), possibles=possibles)
+    changements = {
+        autre_id: placement for autre_id, placement in nouvelle.items()
+        if placement != affectation.get(autre_id)
+    }
+    changements.update({autre_id: () for autre_id in non_placees if affectation.get(autre_id)})
+    return changements, non_placees
+
+
+def _tables():
+    """{table_id: (places, voisines)} des tables actives, en deux requêtes."""
+    tables = dict(Table.objects.filter(active=True).order_by().values_list('pk', 'places'))
+    voisines = {table_id: set() for table_id in tables}
+    for de, vers in Table.voisines.through.objects.filter(
+        from_table__in=tables, to_table__in=tables
+    ).values_list('from_table_id', 'to_table_id'):
+        voisines[de].add(vers)
+    return {table_id: (places, frozenset(voisines[table_id])) for table_id, places in tables.items()}
+
+
+def _demandes(date) -> list:
+    return [
+        (reservation_id, *intervalle_repas(heure), nb_personnes)
+        for reservation_id, heure, nb_personnes in Reservation.objects.filter(
+            date_reservation=date, statut='CONFIRMED'
+        ).order_by().values_list('pk', 'heure_reservation', 'nb_personnes')
+    ]
+
+
+def _affectation(reservation_ids) -> dict:
+    affectation = {}
+    for reservation_id, table_id in Affectation.objects.filter(
+        reservation_id__in=reservation_ids
+    ).order_by('table_id').values_list('reservation_id', 'table_id'):
+        affectation[reservation_id] = affectation.get(reservation_id, ()) + (table_id,)
+    return affectation
+
+
+def _inserer(affectation: dict):
+    Affectation.objects.bulk_create([
+        Affectation(reservation_id=reservation_id, table_id=table_id)
+        for reservation_id, placement in affectation.items()
+        for table_id in placement
+    ])
+
+
+def _ecrire(changements: dict):
+    """Remplace les tables des réservations modifiées : un DELETE et un INSERT."""
+    if changements:
+        Affectation.objects.filter(reservation_id__in=changements).delete()
+        _inserer(changements)
+
+
+def affecter_journee(date) -> list:
+    """Place toutes les réservations confirmées de `date` ; retourne les ids non placés."""
+    with transaction.atomic():
+        demandes = _demandes(date)
+        affectation, non_placees = resoudre(_tables(), demandes)
+        Affectation.objects.filter(reservation__date_reservation=date).delete()
+        _inserer(affectation)
+    return non_placees
+
+
+def reaffecter(reservation: Reservation) -> list:
+    """
+    Mode incrémental, après la modification d'une seule réservation
+    (nouvelle heure, couverts, confirmation, annulation) ; retourne les ids
+    non placés. Une réservation qui n'est plus confirmée perd ses tables.
+    """
+    with transaction.atomic():
+        if reservation.statut != 'CONFIRMED':
+            Affectation.objects.filter(reservation=reservation).delete()
+            return []
+        demandes = _demandes(reservation.date_reservation)
+        affectation = _affectation([demande[0] for demande in demandes])
+        changements, non_placees = resoudre_increment(_tables(), demandes, affectation, reservation.pk)
+        _ecrire(changements)
+    return non_placees
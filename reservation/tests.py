@@ -1,3 +1,394 @@
-from django.test import TestCase
+import datetime
+from importlib import import_module
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from pages.models import HorairesOuverture
+from restaurant.testing import REGLAGES_CACHE_PARTAGE
+from . import capacite, historique, occupation, tables
+from .models import OccupationCreneau, Reservation, Table
+
+
+@override_settings(RESERVATION_DUREE_CRENEAU=30, RESERVATION_DUREE_REPAS=90, **REGLAGES_CACHE_PARTAGE)
+class CapaciteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for jour, _ in HorairesOuverture.JOURS_CHOICES:
+            HorairesOuverture.objects.create(
+                jour=jour, heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22),
+                est_ferme=jour == 'LUN', places_par_creneau=10,
+            )
+        # Un mardi dans plus d'une semaine
+        cls.date = timezone.localdate() + datetime.timedelta(days=8)
+        cls.date += datetime.timedelta(days=(1 - cls.date.weekday()) % 7)
+
+    def setUp(self):
+        # Horaires créés dans setUpTestData : leur invalidation après commit n'a pas lieu
+        cache.clear()
+
+    def reserver(self, heure, nb_personnes, date=None):
+        return self.client.post(reverse('reservation'), {
+            'nom_client': 'Awa', 'telephone': '600000000',
+            'date_reservation': (date or self.date).isoformat(), 'heure_reservation': heure,
+            'nb_personnes': nb_personnes,
+        })
+
+    def occupation(self):
+        return dict(OccupationCreneau.objects.filter(date=self.date).values_list('heure', 'places_occupees'))
+
+    def test_creneaux(self):
+        horaire = HorairesOuverture.objects.get(jour='MAR')
+
+        creneaux = capacite.creneaux_de_reservation(horaire)
+
+        self.assertEqual((creneaux[0], creneaux[-1]), (datetime.time(11), datetime.time(20, 30)))
+        self.assertEqual(
+            capacite.creneaux_couverts(datetime.time(19, 10)),
+            [datetime.time(19), datetime.time(19, 30), datetime.time(20)],
+        )
+
+    def test_reservation_prend_les_places(self):
+        response = self.reserver('19:10', 6)
+
+        self.assertRedirects(response, reverse('home'))
+        self.assertEqual(self.occupation(), {
+            datetime.time(19): 6, datetime.time(19, 30): 6, datetime.time(20): 6,
+        })
+
+    def test_creneau_complet(self):
+        self.reserver('19:00', 6)
+        self.reserver('20:00', 4)
+
+        response = self.reserver('19:30', 5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertContains(response, 'Prochains créneaux libres')
+        # 20:30 chevauche encore le repas de 20:00 (4 + 5 places) : premier créneau libre
+        self.assertEqual(response.context['form'].suggestions[0], datetime.datetime.combine(self.date, datetime.time(20, 30)))
+
+    def test_jour_de_fermeture_et_horaires(self):
+        lundi = self.date - datetime.timedelta(days=1)
+
+        self.assertContains(self.reserver('19:00', 2, date=lundi), 'fermé ce jour-là')
+        self.assertContains(self.reserver('21:00', 2), 'de 11:00 à 20:30')
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_enregistrer_ne_depasse_jamais_la_capacite(self):
+        capacite.enregistrer(Reservation(
+            nom_client='Awa', telephone='600000000', date_reservation=self.date,
+            heure_reservation=datetime.time(19), nb_personnes=8,
+        ))
+
+        with self.assertRaises(capacite.CreneauComplet):
+            # Validation du formulaire contournée (deux clients au même instant)
+            capacite.enregistrer(Reservation(
+                nom_client='Bob', telephone='600000000', date_reservation=self.date,
+                heure_reservation=datetime.time(20), nb_personnes=3,
+            ))
+
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(self.occupation()[datetime.time(20)], 8)
+
+    def test_nombre_de_personnes_invalide(self):
+        self.reserver('19:00', 8)
+
+        for nb_personnes in (-5, 0, 21):
+            response = self.reserver('19:00', nb_personnes)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('nb_personnes', response.context['form'].errors)
+        with self.assertRaises(capacite.CreneauIndisponible):
+            # Validation du formulaire contournée : l'occupation ne doit pas baisser
+            capacite.enregistrer(Reservation(
+                nom_client='Bob', telephone='600000000', date_reservation=self.date,
+                heure_reservation=datetime.time(19), nb_personnes=-5,
+            ))
+
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(self.occupation()[datetime.time(19)], 8)
+        self.assertEqual(self.reserver('19:00', 7).status_code, 200)
+        self.assertEqual(self.occupation()[datetime.time(19)], 8)
+
+    def test_annulation_modification_et_suppression(self):
+        self.reserver('19:00', 6)
+        reservation = Reservation.objects.get()
+
+        reservation.statut = 'CANCELLED'
+        capacite.enregistrer(reservation)
+        self.assertEqual(set(self.occupation().values()), {0})
+
+        reservation.statut = 'CONFIRMED'
+        reservation.heure_reservation = datetime.time(12)
+        capacite.enregistrer(reservation)
+        self.assertEqual(self.occupation()[datetime.time(12, 30)], 6)
+
+        reservation.delete()
+        self.assertEqual(set(self.occupation().values()), {0})
+
+    def test_admin_refuse_de_surbooker(self):
+        self.reserver('19:00', 6)
+        self.reserver('19:00', 4)
+        annulee = Reservation.objects.get(nb_personnes=4)
+        annulee.statut = 'CANCELLED'
+        capacite.enregistrer(annulee)
+        self.reserver('19:00', 4)
+        admin = User.objects.create_superuser('admin', password='secret')
+        self.client.force_login(admin)
+
+        response = self.client.post(reverse('admin:reservation_reservation_change', args=[annulee.pk]), {
+            'nom_client': 'Awa', 'telephone': '600000000',
+            'date_reservation': self.date.isoformat(), 'heure_reservation': '19:00',
+            'nb_personnes': 4, 'statut': 'CONFIRMED',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Plus assez de places')
+        annulee.refresh_from_db()
+        self.assertEqual(annulee.statut, 'CANCELLED')
+        self.assertEqual(self.occupation()[datetime.time(19)], 10)
+
+    def test_verification_en_temps_constant(self):
+        for _ in range(3):
+            self.reserver('13:00', 1)
+        formulaire = Reservation(date_reservation=self.date, heure_reservation=datetime.time(19), nb_personnes=2)
+
+        # Occupation des créneaux seulement (horaires en mémoire), quel que soit le nombre de réservations
+        with self.assertNumQueries(1):
+            capacite.verifier(formulaire)
+
+
+class SolveurTablesTest(SimpleTestCase):
+    # 1 et 2 se combinent ; 3 est seule
+    SALLE = {1: (2, frozenset({2})), 2: (4, frozenset({1})), 3: (6, frozenset())}
+
+    def test_placement_le_plus_juste(self):
+        affectation, non_placees = tables.resoudre(self.SALLE, [
+            (10, 19 * 60, 20 * 60 + 30, 2),
+            (11, 19 * 60, 20 * 60 + 30, 5),
+            (12, 19 * 60, 20 * 60 + 30, 4),
+        ])
+
+        self.assertEqual(affectation, {10: (1,), 11: (3,), 12: (2,)})
+        self.assertEqual(non_placees, [])
+
+    def test_tables_combinees_et_chevauchements(self):
+        affectation, non_placees = tables.resoudre(self.SALLE, [
+            (10, 19 * 60, 20 * 60 + 30, 6),
+            (11, 19 * 60, 20 * 60 + 30, 6),
+            # Arrive quand les premières tables se libèrent
+            (12, 20 * 60 + 30, 22 * 60, 5),
+            (13, 20 * 60, 21 * 60 + 30, 1),
+        ])
+
+        self.assertEqual(affectation, {10: (3,), 11: (1, 2), 12: (3,)})
+        self.assertEqual(non_placees, [13])
+
+    def test_increment_ne_deplace_que_si_necessaire(self):
+        demandes = [(10, 19 * 60, 20 * 60 + 30, 2), (11, 19 * 60, 20 * 60 + 30, 4)]
+        affectation, _ = tables.resoudre(self.SALLE, demandes)
+
+        # Passe de 4 à 6 couverts : seule la réservation 11 change de table
+        demandes[1] = (11, 19 * 60, 20 * 60 + 30, 6)
+        self.assertEqual(tables.resoudre_increment(self.SALLE, demandes, affectation, 11), ({11: (3,)}, []))
+        # Passe de 4 à 3 : la table actuelle convient toujours
+        demandes[1] = (11, 19 * 60, 20 * 60 + 30, 3)
+        self.assertEqual(tables.resoudre_increment(self.SALLE, demandes, affectation, 11), ({}, []))
+
+    def test_increment_resout_le_service(self):
+        demandes = [
+            (10, 19 * 60, 20 * 60 + 30, 2), (11, 19 * 60, 20 * 60 + 30, 4), (12, 19 * 60, 20 * 60 + 30, 2),
+            (20, 12 * 60, 13 * 60, 6),
+        ]
+        affectation = {10: (2,), 11: (3,), 12: (1,), 20: (3,)}
+
+        # 10 passe à 5 : aucune place libre sans déplacer 11, le service du soir est résolu à nouveau
+        demandes[0] = (10, 19 * 60, 20 * 60 + 30, 5)
+        changements, non_placees = tables.resoudre_increment(self.SALLE, demandes, affectation, 10)
+
+        self.assertEqual(non_placees, [])
+        self.assertEqual(set(changements), {10, 11})
+        self.assertNotIn(20, changements)
+
+
+@override_settings(RESERVATION_DUREE_REPAS=90)
+class PlacementTablesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = datetime.date(2026, 12, 4)
+        cls.t1 = Table.objects.create(numero='1', places=2)
+        cls.t2 = Table.objects.create(numero='2', places=4)
+        cls.t1.voisines.add(cls.t2)
+
+    def creer(self, heure, nb_personnes, statut='CONFIRMED'):
+        return Reservation.objects.create(
+            nom_client='Awa', telephone='600000000', date_reservation=self.date,
+            heure_reservation=heure, nb_personnes=nb_personnes, statut=statut,
+        )
+
+    def test_journee_puis_increment(self):
+        petite = self.creer(datetime.time(19), 2)
+        grande = self.creer(datetime.time(21), 6)
+        self.creer(datetime.time(19), 2, statut='PENDING')
+
+        self.assertEqual(tables.affecter_journee(self.date), [])
+        self.assertEqual(list(petite.tables.all()), [self.t1])
+        self.assertEqual(set(grande.tables.all()), {self.t1, self.t2})
+
+        grande.heure_reservation = datetime.time(19, 30)
+        grande.nb_personnes = 4
+        grande.save()
+        # Savepoint, lecture de l'état (4), remplacement des tables de la seule réservation modifiée (2)
+        with self.assertNumQueries(8):
+            tables.reaffecter(grande)
+        self.assertEqual(list(grande.tables.all()), [self.t2])
+
+        grande.statut = 'CANCELLED'
+        tables.reaffecter(grande)
+        self.assertFalse(grande.tables.exists())
+
+
+class HistoriqueReservationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_resa = User.objects.create_user('awa', password='x')
+        cls.aujourdhui = timezone.localdate()
+        creer = lambda decalage, heure, statut='COMPLETED': Reservation.objects.create(
+            client=cls.client_resa, nom_client='Awa', telephone='600000000',
+            date_reservation=cls.aujourdhui + datetime.timedelta(days=decalage),
+            heure_reservation=datetime.time(heure), statut=statut,
+        )
+        cls.a_venir = [creer(3, 20, 'CONFIRMED'), creer(1, 12, 'PENDING'), creer(1, 20, 'PENDING')]
+        # Annulée : rangée dans l'historique même si la date est à venir
+        cls.annulee = creer(2, 20, 'CANCELLED')
+        cls.passees = [creer(-jour, heure) for jour in range(1, 4) for heure in (20, 12)]
+        Reservation.objects.create(
+            client=User.objects.create_user('autre'), nom_client='Autre', telephone='600000000',
+            date_reservation=cls.aujourdhui, heure_reservation=datetime.time(20),
+        )
+
+    def historique(self, curseur=None):
+        return async_to_sync(historique.ames_reservations)(
+            self.client_resa, self.aujourdhui, curseur, par_page=3
+        )
+
+    def test_une_seule_requete(self):
+        with self.assertNumQueries(1):
+            a_venir, page = self.historique()
+        self.assertEqual(a_venir, [self.a_venir[1], self.a_venir[2], self.a_venir[0]])
+        self.assertEqual(list(page), [self.annulee, *self.passees[:2]])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_pagination_de_l_historique(self):
+        _, premiere = self.historique()
+        a_venir, deuxieme = self.historique(premiere.curseur_suivant)
+        self.assertEqual(len(a_venir), 3)
+        self.assertEqual(list(deuxieme), self.passees[2:5])
+        _, troisieme = self.historique(deuxieme.curseur_suivant)
+        self.assertEqual(list(troisieme), self.passees[5:])
+        self.assertFalse(troisieme.has_next())
+        _, retour = self.historique(troisieme.curseur_precedent)
+        self.assertEqual(list(retour), self.passees[2:5])
+
+    def test_vue(self):
+        self.client.force_login(self.client_resa)
+        response = self.client.get(reverse('mes_reservations'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['reservations_a_venir']), 3)
+        self.assertEqual(len(response.context['reservations_passees']), 7)
+
+
+@override_settings(RESERVATION_DUREE_CRENEAU=30, RESERVATION_DUREE_REPAS=60, **REGLAGES_CACHE_PARTAGE)
+class OccupationMoisTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for jour, _ in HorairesOuverture.JOURS_CHOICES:
+            HorairesOuverture.objects.create(
+                jour=jour, heure_ouverture=datetime.time(19), heure_fermeture=datetime.time(22),
+                est_ferme=jour == 'LUN', places_par_creneau=10,
+            )
+        # Le mois prochain (dates futures : les réservations sont acceptées)
+        cls.debut = (timezone.localdate().replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        cls.mardi = cls.debut + datetime.timedelta(days=(1 - cls.debut.weekday()) % 7)
+
+    def setUp(self):
+        # Horaires créés dans setUpTestData : leur invalidation après commit n'a pas lieu
+        cache.clear()
+
+    def reserver(self, heure, nb_personnes):
+        return capacite.enregistrer(Reservation(
+            nom_client='Awa', telephone='600000000', date_reservation=self.mardi,
+            heure_reservation=heure, nb_personnes=nb_personnes,
+        ))
+
+    def grille(self):
+        return occupation.occupation_du_mois(self.debut.year, self.debut.month)
+
+    def cellule(self, grille, jour, heure):
+        lignes = dict(grille['lignes'])
+        return lignes[heure][grille['jours'].index(jour)]
+
+    def test_grille_en_cache_et_invalidee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserver(datetime.time(19), 4)
+            self.reserver(datetime.time(19, 30), 5)
+
+        with self.assertNumQueries(1):
+            grille = self.grille()
+        self.assertEqual(self.cellule(grille, self.mardi, datetime.time(19, 30)), (9, 10, 0.9))
+        self.assertEqual(grille['couverts_max'], 9)
+        lundi = self.mardi - datetime.timedelta(days=1)
+        if lundi.month == self.debut.month:
+            self.assertIsNone(self.cellule(grille, lundi, datetime.time(19)))
+        with self.assertNumQueries(0):
+            self.grille()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.get(nb_personnes=5).delete()
+        self.assertEqual(self.cellule(self.grille(), self.mardi, datetime.time(19, 30)), (4, 10, 0.4))
+
+    @override_settings(CACHE_PARTAGE=False, CACHE_DUREE_LOCALE=0)
+    def test_sans_cache_partage_la_grille_expire(self):
+        self.grille()
+
+        # Réservation enregistrée par un autre worker : aucune invalidation vue ici
+        OccupationCreneau.objects.create(date=self.mardi, heure=datetime.time(19), places_occupees=3)
+
+        self.assertEqual(self.cellule(self.grille(), self.mardi, datetime.time(19)), (3, 10, 0.3))
+
+    def test_mois_passes_remplis_par_la_migration(self):
+        migration = import_module('reservation.migrations.0007_occupation_dates_passees')
+        mois_passe = (timezone.localdate().replace(day=1) - datetime.timedelta(days=40)).replace(day=1)
+        mardi = mois_passe + datetime.timedelta(days=(1 - mois_passe.weekday()) % 7)
+        mercredi = mardi + datetime.timedelta(days=1)
+        # Réservations d'avant la table d'occupation ; le mercredi est déjà suivi
+        for date, nb_personnes in ((mardi, 4), (mardi, 3), (mercredi, 2)):
+            Reservation.objects.create(
+                nom_client='Awa', telephone='600000000', date_reservation=date,
+                heure_reservation=datetime.time(19), nb_personnes=nb_personnes,
+            )
+        OccupationCreneau.objects.create(date=mercredi, heure=datetime.time(19), places_occupees=2)
+
+        migration.remplir_dates_passees(apps, None)
+        migration.remplir_dates_passees(apps, None)
+
+        grille = occupation.occupation_du_mois(mois_passe.year, mois_passe.month)
+        self.assertEqual(self.cellule(grille, mardi, datetime.time(19, 30)), (7, 10, 0.7))
+        self.assertEqual(self.cellule(grille, mercredi, datetime.time(19)), (2, 10, 0.2))
+        self.assertEqual(OccupationCreneau.objects.filter(date=mercredi).count(), 1)
+
+    def test_vue_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        url = reverse('admin:reservation_reservation_occupation')
+
+        response = self.client.get(url, {'mois': self.debut.strftime('%Y-%m')})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['grille']['jours'][0], self.debut)
+        self.assertContains(self.client.get(reverse('admin:reservation_reservation_changelist')), url)
@@ -2,10 +2,15 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from . import capacite
 from .forms import ReservationForm
+from .historique import ames_reservations
 from .models import Reservation
+from restaurant.asynchrone import charger_utilisateur
+from restaurant.requetes import budget_requetes
 
 
+@budget_requetes(8)
 def reservation_form(request):
     if request.method == 'POST':
         form = ReservationForm(request.POST)
@@ -17,14 +22,21 @@ def reservation_form(request):
             if request.user.is_authenticated:
                 reservation.client = request.user
 
-            # 3. On sauvegarde définitivement
-            reservation.save()
-
-            messages.success(request,
-                             "Votre demande de réservation a été envoyée ! Nous vous contacterons pour la confirmer.")
-            return redirect('home')
-        else:
-            messages.error(request, "Veuillez corriger les erreurs dans le formulaire.")
+            # 3. On sauvegarde définitivement, en prenant les places du créneau
+            try:
+                capacite.enregistrer(reservation)
+            except (capacite.CreneauComplet, capacite.CreneauIndisponible) as e:
+                # Le créneau vient d'être pris par une autre réservation
+                form.add_error(None, str(e))
+                form.suggestions = capacite.prochains_creneaux(
+                    reservation.date_reservation, reservation.heure_reservation, reservation.nb_personnes
+                )
+            else:
+                messages.success(request,
+                                 "Votre demande de réservation a été envoyée ! Nous vous contacterons pour la confirmer.")
+                return redirect('home')
+
+        messages.error(request, "Veuillez corriger les erreurs dans le formulaire.")
 
     else:
         # UX PREMIUM : Pré-remplir le formulaire si l'utilisateur est connecté
@@ -49,27 +61,15 @@ def reservation_form(request):
     return render(request, 'reservation.html', context)
 
 
+@budget_requetes(2)
 @login_required
-def mes_reservations(request):
-    # Obtenir la date d'aujourd'hui
-    today = timezone.now().date()
-
-    # Récupérer toutes les réservations du client connecté
-    mes_resas = Reservation.objects.filter(client=request.user)
-
-    # 1. Réservations à venir (Date >= aujourd'hui ET non annulées)
-    # On trie par date croissante (la plus proche en premier)
-    reservations_a_venir = mes_resas.filter(
-        date_reservation__gte=today
-    ).exclude(statut='CANCELLED').order_by('date_reservation', 'heure_reservation')
-
-    # 2. Historique (Date < aujourd'hui OU annulées)
-    # On trie par date décroissante (la plus récente en premier)
-    reservations_passees = mes_resas.filter(
-        date_reservation__lt=today
-    ) | mes_resas.filter(statut='CANCELLED')
+async def mes_reservations(request):
+    user = await charger_utilisateur(request)
 
-    reservations_passees = reservations_passees.order_by('-date_reservation', '-heure_reservation')
+    # Réservations à venir et une page de l'historique, en une seule requête
+    reservations_a_venir, reservations_passees = await ames_reservations(
+        user, timezone.localdate(), request.GET.get('curseur'),
+    )
 
     context = {
         'reservations_a_venir': reservations_a_venir,
@@ -77,4 +77,4 @@ def mes_reservations(request):
     }
 
     # Assurez-vous que le chemin du template correspond à votre structure
-    return render(request=request, template_name='reservation/mesReservation.html', context=context)
\ No newline at end of file
+    return render(request=request, template_name='reservation/mesReservation.html', context=context)
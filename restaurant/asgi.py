@@ -3,6 +3,12 @@ ASGI config for restaurants project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project with an ASGI server (uvicorn, daphne...) to run the async
+views natively, in particular the kitchen board's Server-Sent Events stream
+(/cuisine/flux/), which keeps one long connection open per screen.
+The read-heavy pages (home, menu, order history, reservations) are async
+views as well; `python manage.py benchmark_asgi` compares both handlers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,55 @@
+"""
+Outils des vues asynchrones (servies nativement sous ASGI).
+
+Une vue asynchrone ne doit rien faire de bloquant dans la boucle
+d'événements : les requêtes SQL passent par l'ORM asynchrone, et le calcul
+des empreintes de mot de passe (PBKDF2, volontairement lent) est confié à
+un pool de threads borné, `settings.HACHAGE_THREADS`. Une rafale de
+connexions ne peut donc ni geler la boucle ni créer un thread par requête.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+HACHAGE_THREADS_PAR_DEFAUT = 4
+
+_executeur = None
+_verrou_executeur = threading.Lock()
+
+
+def executeur_hachage() -> ThreadPoolExecutor:
+    """Pool (unique par processus) des calculs d'empreintes de mot de passe."""
+    global _executeur
+    with _verrou_executeur:
+        if _executeur is None:
+            _executeur = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'HACHAGE_THREADS', HACHAGE_THREADS_PAR_DEFAUT),
+                thread_name_prefix='hachage',
+            )
+        return _executeur
+
+
+async def hors_boucle(fonction, *args, **kwargs):
+    """Exécute une fonction de calcul pur (sans accès à la base) dans le pool de hachage."""
+    return await asyncio.get_running_loop().run_in_executor(
+        executeur_hachage(), functools.partial(fonction, *args, **kwargs)
+    )
+
+
+async def ahacher_mot_de_passe(mot_de_passe: str) -> str:
+    return await hors_boucle(make_password, mot_de_passe)
+
+
+async def charger_utilisateur(request):
+    """
+    Charge l'utilisateur (et la session) de façon asynchrone et le rend
+    disponible comme `request.user` : les gabarits et le panier peuvent
+    ensuite le lire sans requête SQL synchrone.
+    """
+    user = await request.auser()
+    request.user = user
+    return user
@@ -0,0 +1,20 @@
+"""
+Durée de vie des entrées versionnées (menu, accueil, occupation).
+
+Les versions sont incrémentées par le processus qui écrit. Avec un cache
+partagé (`settings.CACHE_PARTAGE`), tous les workers voient aussitôt la
+nouvelle version et les blocs peuvent être gardés longtemps. Avec le cache
+mémoire de chaque processus, les autres workers gardent l'ancienne : les
+entrées n'y vivent que `settings.CACHE_DUREE_LOCALE` secondes, ce qui borne
+l'affichage d'un plat épuisé ou d'un horaire modifié.
+"""
+from django.conf import settings
+
+DUREE_LOCALE_PAR_DEFAUT = 5
+
+
+def duree(duree_partagee: int) -> int:
+    """`duree_partagee` avec un cache partagé, sinon quelques secondes au plus."""
+    if getattr(settings, 'CACHE_PARTAGE', False):
+        return duree_partagee
+    return min(duree_partagee, getattr(settings, 'CACHE_DUREE_LOCALE', DUREE_LOCALE_PAR_DEFAUT))
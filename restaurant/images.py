@@ -0,0 +1,106 @@
+"""
+Images dérivées des photos de plats et d'avis.
+
+À l'envoi d'une nouvelle photo, on génère en arrière-plan des
+versions réduites (`settings.IMAGES_LARGEURS`) en WebP et en JPEG, plus une
+miniature floue de quelques centaines d'octets (LQIP) affichée en fond
+pendant le chargement. Les fichiers sont écrits dans le stockage par défaut
+sous ``derives/`` ; leur description (largeurs, dimensions, miniature) est
+gardée dans le champ JSON `image_derives` du modèle et lue par la balise
+``{% image_responsive %}`` (menu/templatetags/images.py), qui émet le
+``srcset``.
+
+Le travail (Pillow, plusieurs centaines de millisecondes pour une grande
+photo) est une tâche en file (menu/taches.py, experiance/taches.py),
+ajoutée après le commit et exécutée par `manage.py travailleur` : la
+requête d'envoi n'attend pas.
+"""
+import base64
+import io
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps
+
+LARGEURS_PAR_DEFAUT = (200, 400, 800)
+# Extension et options d'enregistrement Pillow par format
+FORMATS = {
+    'webp': ('WEBP', {'quality': 78, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+LARGEUR_LQIP = 16
+
+
+def largeurs() -> tuple:
+    return tuple(getattr(settings, 'IMAGES_LARGEURS', LARGEURS_PAR_DEFAUT))
+
+
+def chemin_derive(nom: str, largeur: int, extension: str) -> str:
+    """``image/plat1.jpg`` -> ``derives/image/plat1-400.webp``."""
+    return f'derives/{os.path.splitext(nom)[0]}-{largeur}.{extension}'
+
+
+def ouvrir_source(nom: str):
+    """Fichier de la photo : stockage des médias, ou fichiers statiques pour les photos fournies avec le site."""
+    if default_storage.exists(nom):
+        return default_storage.open(nom, 'rb')
+    chemin = finders.find(nom)
+    if chemin is None:
+        raise FileNotFoundError(nom)
+    return open(chemin, 'rb')
+
+
+def _encoder(image, format_pillow, options) -> bytes:
+    tampon = io.BytesIO()
+    image.save(tampon, format_pillow, **options)
+    return tampon.getvalue()
+
+
+def _ecrire(chemin: str, contenu: bytes):
+    # Même nom à chaque génération : on remplace l'ancien fichier
+    default_storage.delete(chemin)
+    default_storage.save(chemin, ContentFile(contenu))
+
+
+def generer_derives(nom: str) -> dict:
+    """
+    Génère les images dérivées de la photo `nom` et retourne leur
+    description : {'source', 'largeur', 'hauteur', 'largeurs', 'lqip'}.
+    """
+    with ouvrir_source(nom) as fichier:
+        image = Image.open(fichier)
+        # Photos de téléphone : applique l'orientation EXIF avant de redimensionner
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    largeur, hauteur = image.size
+
+    retenues = sorted({min(cible, largeur) for cible in largeurs()})
+    for cible in retenues:
+        reduite = image.resize((cible, max(1, round(hauteur * cible / largeur))), Image.LANCZOS)
+        for extension, (format_pillow, options) in FORMATS.items():
+            _ecrire(chemin_derive(nom, cible, extension), _encoder(reduite, format_pillow, options))
+
+    miniature = image.resize((LARGEUR_LQIP, max(1, round(hauteur * LARGEUR_LQIP / largeur))), Image.BILINEAR)
+    miniature = miniature.filter(ImageFilter.GaussianBlur(1))
+    lqip = base64.b64encode(_encoder(miniature, 'WEBP', {'quality': 40})).decode('ascii')
+    return {
+        'source': nom,
+        'largeur': largeur,
+        'hauteur': hauteur,
+        'largeurs': retenues,
+        'lqip': f'data:image/webp;base64,{lqip}',
+    }
+
+
+def deriver(modele, pk, nom: str, apres=None):
+    """
+    Génère les dérivées de la photo `nom` de l'objet `pk` et les enregistre,
+    sauf si la photo a changé entre-temps. `apres(pks)` est appelée si
+    l'objet a été mis à jour (invalidation d'un cache).
+    """
+    derives = generer_derives(nom)
+    if modele.objects.filter(pk=pk, image=nom).update(image_derives=derives) and apres:
+        apres([pk])
+
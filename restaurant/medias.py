@@ -0,0 +1,99 @@
+"""
+Stockage des photos envoyées (plats, avis), adressé par contenu.
+
+Un fichier est enregistré sous l'empreinte SHA-256 de son contenu
+(``image/3f2a…c9.jpg``) : deux envois identiques ne font qu'un fichier, et
+un nom ne désigne jamais deux contenus différents. Les photos sont donc
+servies avec ``Cache-Control: immutable`` : navigateurs et CDN les gardent
+un an sans jamais revalider.
+
+`servir` (``django.views.static.serve``) n'est pas fait pour la production :
+il ne répond que si `settings.MEDIAS_SERVIS_PAR_DJANGO` est actif (par défaut
+avec DEBUG). Sinon, un serveur frontal ou un CDN sert ``MEDIA_ROOT`` sous
+``MEDIA_URL``, avec le même en-tête pour les noms tirés du contenu.
+
+Les photos plus anciennes, fournies avec le site dans ``static/image/``,
+gardent leur nom : leur `url` est celle du fichier statique tant que
+`manage.py importer_images` ne les a pas recopiées dans ce stockage.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.http import Http404
+from django.views.static import serve
+
+LONGUEUR_EMPREINTE = 24
+# Nom tiré du contenu, éventuellement suivi de la largeur d'une image dérivée (restaurant/images.py)
+NOM_PAR_CONTENU = re.compile(rf'^[0-9a-f]{{{LONGUEUR_EMPREINTE}}}(-\d+)?\.\w+$')
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+
+
+def est_par_contenu(nom: str) -> bool:
+    return bool(NOM_PAR_CONTENU.match(os.path.basename(nom)))
+
+
+def empreinte(contenu) -> str:
+    sha = hashlib.sha256()
+    for morceau in contenu.chunks():
+        sha.update(morceau)
+    return sha.hexdigest()[:LONGUEUR_EMPREINTE]
+
+
+class StockageParContenu(FileSystemStorage):
+    """Stockage des médias dont les fichiers sont nommés d'après leur contenu."""
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        dossier, nom = os.path.split(name)
+        name = os.path.join(dossier, empreinte(content) + os.path.splitext(nom)[1].lower())
+        if self.exists(name):
+            # Même contenu déjà envoyé : rien à écrire
+            return name
+        return super().save(name, content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        if est_par_contenu(name):
+            # Fichier écrit entre-temps par un envoi identique : même nom, pas de suffixe
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if not est_par_contenu(name):
+            return super()._save(name, content)
+        # Écrit sous un nom temporaire puis renommé (atomique) : deux envois identiques simultanés
+        # remplacent le fichier par le même contenu, et il n'est jamais lu à moitié écrit
+        dossier, nom = os.path.split(name)
+        temporaire = super()._save(os.path.join(dossier, f'.{uuid.uuid4().hex}-{nom}'), content)
+        os.replace(self.path(temporaire), self.path(name))
+        return name
+
+    def url(self, name):
+        if not est_par_contenu(name) and not self.exists(name):
+            # Photo fournie avec le site, pas encore importée
+            return staticfiles_storage.url(name)
+        return super().url(name)
+
+
+_stockage = StockageParContenu()
+
+
+def stockage_images():
+    """Stockage des champs `image` (callable : non figé dans les migrations)."""
+    return _stockage
+
+
+def servir(request, path):
+    """Sert un média ; les fichiers nommés d'après leur contenu sont immuables."""
+    if not getattr(settings, 'MEDIAS_SERVIS_PAR_DJANGO', settings.DEBUG):
+        raise Http404
+    response = serve(request, path, document_root=_stockage.location)
+    if response.status_code in (200, 304):
+        response['Cache-Control'] = CACHE_IMMUABLE if est_par_contenu(path) else 'no-cache'
+    return response
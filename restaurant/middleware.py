@@ -0,0 +1,40 @@
+"""
+Middlewares du projet.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise utilisable aussi en mode asynchrone.
+
+    Le middleware d'origine est uniquement synchrone : sous ASGI, Django
+    exécute alors toute la suite de la chaîne (et les vues asynchrones,
+    via `async_to_sync`) dans le thread unique des appels `sync_to_async`.
+    Une connexion longue (flux de la cuisine, suivi des commandes) y
+    bloquerait toutes les autres requêtes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Ouverture du fichier : hors de la boucle d'événements
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,142 @@
+"""
+Pagination par curseur (« keyset ») pour les listes triées par date décroissante.
+
+Au lieu de `OFFSET n`, chaque page est lue avec une condition
+`(created_at, id) < (dernière date, dernier id)` : la base descend l'index
+(`client, -created_at`) directement au bon endroit, sans compter ni sauter
+les lignes précédentes. La page 500 coûte donc autant que la page 1.
+Le tri peut porter sur plusieurs colonnes (`champ=('date_reservation',
+'heure_reservation')`), comparées dans l'ordre, puis sur l'id.
+Le curseur est un jeton opaque transmis dans l'URL (`?curseur=...`).
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+SUIVANT = 'n'
+PRECEDENT = 'p'
+
+
+def _champs(champ):
+    return (champ,) if isinstance(champ, str) else tuple(champ)
+
+
+def encoder_curseur(objet, sens, champ='created_at'):
+    valeurs = [getattr(objet, nom).isoformat() for nom in _champs(champ)]
+    valeur = json.dumps([sens, valeurs, objet.pk])
+    return base64.urlsafe_b64encode(valeur.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur, modele, champ='created_at'):
+    """Retourne (sens, valeurs, id), ou None si le curseur est absent ou invalide."""
+    if not curseur:
+        return None
+    champs = _champs(champ)
+    try:
+        valeur = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        sens, valeurs, pk = json.loads(valeur)
+        if isinstance(valeurs, str):
+            # Ancien format : une seule date
+            valeurs = [valeurs]
+        if len(valeurs) != len(champs):
+            return None
+        valeurs = [modele._meta.get_field(nom).to_python(texte) for nom, texte in zip(champs, valeurs)]
+    except (binascii.Error, ValueError, TypeError, ValidationError, FieldDoesNotExist):
+        return None
+    if sens not in (SUIVANT, PRECEDENT) or None in valeurs or not isinstance(pk, int):
+        return None
+    return sens, valeurs, pk
+
+
+def condition_curseur(position, champ='created_at') -> Q:
+    """Lignes situées après `position` dans son sens de lecture (toutes si `position` est None)."""
+    if position is None:
+        return Q()
+    sens, valeurs, pk = position
+    operateur = 'lt' if sens == SUIVANT else 'gt'
+    condition = Q(**{f'pk__{operateur}': pk})
+    for nom, valeur in reversed(list(zip(_champs(champ), valeurs))):
+        condition = Q(**{f'{nom}__{operateur}': valeur}) | (Q(**{nom: valeur}) & condition)
+    return condition
+
+
+def ordre_curseur(position, champ='created_at') -> list:
+    """Ordre de lecture : décroissant, sauf pour remonter vers la page précédente."""
+    if position is not None and position[0] == PRECEDENT:
+        return [*_champs(champ), 'pk']
+    return [*(f'-{nom}' for nom in _champs(champ)), '-pk']
+
+
+class PageCurseur:
+    """Une page de résultats et les curseurs des pages voisines."""
+
+    def __init__(self, objets, curseur_suivant=None, curseur_precedent=None, total_approximatif=None):
+        self.object_list = objets
+        self.curseur_suivant = curseur_suivant
+        self.curseur_precedent = curseur_precedent
+        self.total_approximatif = total_approximatif
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.curseur_suivant is not None
+
+    def has_previous(self):
+        return self.curseur_precedent is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def construire_page(objets, position, par_page=10, champ='created_at', total_approximatif=None):
+    """Construit la page à partir des `par_page + 1` lignes lues dans l'ordre de `ordre_curseur`."""
+    sens = position[0] if position else SUIVANT
+    encore = len(objets) > par_page
+    objets = objets[:par_page]
+
+    if sens == PRECEDENT:
+        objets.reverse()
+        a_suivant, a_precedent = True, encore
+    else:
+        a_suivant, a_precedent = encore, position is not None
+
+    return PageCurseur(
+        objets,
+        curseur_suivant=encoder_curseur(objets[-1], SUIVANT, champ) if objets and a_suivant else None,
+        curseur_precedent=encoder_curseur(objets[0], PRECEDENT, champ) if objets and a_precedent else None,
+        total_approximatif=total_approximatif,
+    )
+
+
+def _lignes(queryset, position, champ):
+    return queryset.filter(condition_curseur(position, champ)).order_by(*ordre_curseur(position, champ))
+
+
+def paginer_par_curseur(queryset, curseur=None, par_page=10, champ='created_at', total_approximatif=None):
+    """
+    Retourne la `PageCurseur` désignée par `curseur` pour un queryset trié
+    par `champ` (un nom ou un tuple de noms) puis `id` décroissants.
+    Une seule requête, sans COUNT. `total_approximatif` est simplement transmis à la page (compteur
+    maintenu ailleurs, par exemple `StatistiquesClient`).
+    """
+    position = decoder_curseur(curseur, queryset.model, champ)
+    # Une ligne de plus pour savoir s'il existe une page au-delà
+    objets = list(_lignes(queryset, position, champ)[:par_page + 1])
+    return construire_page(objets, position, par_page, champ, total_approximatif)
+
+
+async def apaginer_par_curseur(queryset, curseur=None, par_page=10, champ='created_at', total_approximatif=None):
+    """Version asynchrone de `paginer_par_curseur` (ORM asynchrone)."""
+    position = decoder_curseur(curseur, queryset.model, champ)
+    objets = [objet async for objet in _lignes(queryset, position, champ)[:par_page + 1]]
+    return construire_page(objets, position, par_page, champ, total_approximatif)
@@ -0,0 +1,161 @@
+"""
+Budget de requêtes SQL par vue.
+
+Quand `settings.REQUETES_INSTRUMENTATION` est actif, `BudgetRequetesMiddleware`
+relève pour chaque requête HTTP le nombre de requêtes SQL, leur durée totale
+et les requêtes répétées (même SQL à des paramètres près : le signe d'un
+N+1). Il ajoute un en-tête ``Server-Timing`` (visible dans l'onglet réseau
+du navigateur) et journalise un avertissement quand une vue dépasse son
+budget : `@budget_requetes(n)` sur la vue, sinon `settings.REQUETES_BUDGET`.
+
+Les tests vérifient les budgets déclarés avec
+`restaurant.testing.BudgetsMixin`.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+BUDGET_PAR_DEFAUT = 10
+# Nombre d'exécutions d'une même requête à partir duquel elle est signalée
+SEUIL_REPETITION = 3
+
+logger = logging.getLogger(__name__)
+_releve_courant = ContextVar('releve_requetes', default=None)
+
+_LISTE_DE_PARAMETRES = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITTERAUX = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def budget_requetes(nombre: int):
+    """Déclare le nombre maximal de requêtes SQL d'une vue."""
+    def declarer(vue):
+        vue.budget_requetes = nombre
+        return vue
+    return declarer
+
+
+def budget_de(vue) -> int:
+    budget = getattr(vue, 'budget_requetes', None)
+    return budget if budget is not None else getattr(settings, 'REQUETES_BUDGET', BUDGET_PAR_DEFAUT)
+
+
+def empreinte(sql: str) -> str:
+    """SQL sans ses valeurs : ``IN (%s, %s, %s)`` et ``IN (%s)`` ont la même empreinte."""
+    return _LITTERAUX.sub('?', _LISTE_DE_PARAMETRES.sub('(...)', sql))
+
+
+class Releve:
+    """Requêtes SQL exécutées dans un bloc `relever()` ; un relevé englobant les compte aussi."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.nombre = 0
+        self.duree = 0.0
+        self.empreintes = Counter()
+
+    def ajouter(self, sql, duree):
+        self.nombre += 1
+        self.duree += duree
+        self.empreintes[empreinte(sql)] += 1
+        if self.parent is not None:
+            self.parent.ajouter(sql, duree)
+
+    def repetees(self, seuil=SEUIL_REPETITION) -> list:
+        """[(empreinte, exécutions)] des requêtes lancées au moins `seuil` fois, les plus fréquentes d'abord."""
+        return [(sql, nombre) for sql, nombre in self.empreintes.most_common() if nombre >= seuil]
+
+
+def _relever(execute, sql, params, many, context):
+    releve = _releve_courant.get()
+    if releve is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        releve.ajouter(sql, time.perf_counter() - debut)
+
+
+def _installer(connection, **kwargs):
+    if _relever not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_relever)
+
+
+def installer():
+    """Ajoute le relevé aux connexions déjà ouvertes dans ce thread et à toutes les suivantes."""
+    connection_created.connect(_installer, dispatch_uid='restaurant.requetes')
+    for connexion in connections.all(initialized_only=True):
+        _installer(connexion)
+
+
+@contextmanager
+def relever():
+    """
+    Relève les requêtes SQL du bloc, y compris celles des appels
+    `sync_to_async` : chaque thread a sa connexion, le relevé en cours est
+    suivi par une variable de contexte.
+    """
+    installer()
+    releve = Releve(_releve_courant.get())
+    jeton = _releve_courant.set(releve)
+    try:
+        yield releve
+    finally:
+        _releve_courant.reset(jeton)
+
+
+class BudgetRequetesMiddleware:
+    """Relève les requêtes SQL de chaque vue (voir le module) ; retiré de la chaîne si l'instrumentation est inactive."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUETES_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        installer()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        debut = time.perf_counter()
+        with relever() as releve:
+            response = self.get_response(request)
+        return self.conclure(request, response, releve, debut)
+
+    async def __acall__(self, request):
+        debut = time.perf_counter()
+        # Connexion du thread des appels `sync_to_async` de cette requête, peut-être ouverte avant
+        await sync_to_async(installer)()
+        with relever() as releve:
+            response = await self.get_response(request)
+        return self.conclure(request, response, releve, debut)
+
+    def conclure(self, request, response, releve, debut):
+        request.releve_requetes = releve
+        response['Server-Timing'] = (
+            f'db;desc="{releve.nombre} requetes SQL";dur={releve.duree * 1000:.1f}, '
+            f'total;dur={(time.perf_counter() - debut) * 1000:.1f}'
+        )
+        correspondance = request.resolver_match
+        if correspondance is not None:
+            budget = budget_de(correspondance.func)
+            if releve.nombre > budget:
+                logger.warning(
+                    "%s (%s) : %d requêtes SQL pour un budget de %d, %.1f ms ; répétées : %s",
+                    correspondance.view_name, request.path, releve.nombre, budget, releve.duree * 1000,
+                    '; '.join(f'{nombre} x {sql}' for sql, nombre in releve.repetees()) or 'aucune',
+                )
+        return response
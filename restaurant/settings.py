@@ -49,13 +49,15 @@ INSTALLED_APPS = [
     'pages',
     'reservation',
     'experiance',
+    'taches',
     'crispy_forms',
     'crispy_tailwind',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'restaurant.middleware.WhiteNoiseMiddleware',
+    'restaurant.requetes.BudgetRequetesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -132,6 +134,69 @@ else:
     }
 
 ALLOWED_HOSTS = ['127.0.0.1', '.vercel.app', config('VERCEL_URL', default='')]
+
+# Cache (blocs de la carte, compteurs de version)
+# En production avec plusieurs workers, utiliser un cache partagé (Redis, Memcached...)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='restaurant'),
+    }
+}
+
+# Sessions et utilisateur connecté lus dans le cache (écrits aussi en base), messages dans un cookie :
+# une page vue n'interroge ni `django_session` ni `auth_user`, voir compte/backends.py.
+# Seulement avec un cache partagé (CACHE_BACKEND) : avec le cache mémoire de chaque processus, une
+# déconnexion, un changement de mot de passe ou un compte désactivé ne seraient vus que d'un worker.
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies se passe de cache et de base.
+CACHE_PARTAGE = CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+# Sans cache partagé, durée de vie (secondes) des blocs versionnés de la carte, de l'accueil et de
+# l'occupation : un autre worker ne voit pas les invalidations, voir restaurant/cache.py
+CACHE_DUREE_LOCALE = config('CACHE_DUREE_LOCALE', default=5, cast=int)
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if CACHE_PARTAGE else 'django.contrib.sessions.backends.db',
+)
+AUTHENTICATION_BACKENDS = [
+    'compte.backends.ModelBackendEnCache' if CACHE_PARTAGE else 'compte.backends.ModelBackendHorsBoucle'
+]
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Relevé des requêtes SQL par vue (restaurant/requetes.py) : en-tête Server-Timing et avertissement
+# au-delà du budget de la vue (`@budget_requetes(n)`, sinon REQUETES_BUDGET)
+REQUETES_INSTRUMENTATION = config('REQUETES_INSTRUMENTATION', default=False, cast=bool)
+REQUETES_BUDGET = 10
+
+# Broker des événements de commande (tableau de la cuisine), voir commandes/evenements.py
+COMMANDES_BROKER = config('COMMANDES_BROKER', default='commandes.evenements.LocalBroker')
+
+# Threads du pool de hachage des mots de passe (connexion, inscription), voir restaurant/asynchrone.py
+HACHAGE_THREADS = config('HACHAGE_THREADS', default=4, cast=int)
+
+# Images dérivées des photos (restaurant/images.py) : largeurs générées
+IMAGES_LARGEURS = (200, 400, 800)
+
+# File des tâches (taches/travailleur.py, `manage.py travailleur`) : threads d'exécution,
+# attente entre deux lectures de la file, délai avant la première relance (doublé ensuite) et durée
+# après laquelle une tâche « en cours » est considérée comme abandonnée, en secondes
+TACHES_THREADS = config('TACHES_THREADS', default=4, cast=int)
+TACHES_INTERVALLE = config('TACHES_INTERVALLE', default=1.0, cast=float)
+TACHES_DELAI_RELANCE = config('TACHES_DELAI_RELANCE', default=30, cast=int)
+TACHES_DELAI_BLOCAGE = 600
+
+# E-mails (confirmation de commande, envoyée par la file des tâches) ; sans configuration, affichés dans la console
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Restaurant <noreply@localhost>')
+
+# Réservations : durée d'un créneau et durée pendant laquelle une table est occupée (minutes),
+# voir reservation/capacite.py ; le nombre de places par créneau est réglé jour par jour (HorairesOuverture)
+RESERVATION_DUREE_CRENEAU = 30
+RESERVATION_DUREE_REPAS = 90
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -253,6 +318,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles_build', 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = Path.joinpath(BASE_DIR, 'media')
+# Photos envoyées servies par Django (restaurant/medias.py), à éviter en production :
+# un serveur frontal ou un CDN sert MEDIA_ROOT sous MEDIA_URL
+MEDIAS_SERVIS_PAR_DJANGO = config('MEDIAS_SERVIS_PAR_DJANGO', default=DEBUG, cast=bool)
 if not DEBUG:
 
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -0,0 +1,71 @@
+"""
+Outils de test partagés entre les applications.
+"""
+from importlib import import_module
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .requetes import budget_de, relever
+
+# Cache partagé (voir restaurant/settings.py) : blocs gardés longtemps, sessions et utilisateur en cache.
+# Le cache mémoire des tests est commun à tout le processus, il joue ce rôle.
+REGLAGES_CACHE_PARTAGE = {
+    'CACHE_PARTAGE': True,
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['compte.backends.ModelBackendEnCache'],
+}
+
+
+class RequetesMixin:
+    """Assertions sur le nombre de requêtes SQL d'une page (à mélanger avec `TestCase`)."""
+
+    def compter_requetes(self, url, data=None):
+        with CaptureQueriesContext(connection) as requetes:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200, url)
+        return len(requetes.captured_queries)
+
+    def assertRequetesConstantes(self, url, ajouter, data=None):
+        """
+        Vérifie que le nombre de requêtes de `url` ne dépend pas du nombre de
+        lignes affichées : `ajouter(n)` doit créer n lignes supplémentaires.
+        """
+        ajouter(2)
+        # Premier affichage : caches de processus (ContentType, permissions...)
+        self.compter_requetes(url, data)
+        avant = self.compter_requetes(url, data)
+        ajouter(5)
+        apres = self.compter_requetes(url, data)
+        self.assertEqual(
+            avant, apres,
+            f"{url} : {avant} requêtes avec peu de lignes, {apres} avec plus de lignes (N+1 ?)"
+        )
+
+
+class BudgetsMixin:
+    """Budgets de requêtes SQL des vues (`@budget_requetes`, restaurant/requetes.py), à mélanger avec `TestCase`."""
+
+    def assertBudgetsRespectes(self, urlconf, arguments=None, parametres=None, ignorer=()):
+        """
+        Appelle en GET chaque URL nommée du module `urlconf` (après un premier
+        appel qui remplit les caches) et échoue si une vue dépasse son budget.
+        `arguments[nom]` : arguments de l'URL, `parametres[nom]` : paramètres
+        GET, `ignorer` : noms d'URL à ne pas appeler.
+        """
+        arguments, parametres = arguments or {}, parametres or {}
+        depassements = []
+        for motif in import_module(urlconf).urlpatterns:
+            if motif.name in ignorer:
+                continue
+            url = reverse(motif.name, kwargs=arguments.get(motif.name))
+            self.client.get(url, parametres.get(motif.name))
+            with relever() as releve:
+                self.client.get(url, parametres.get(motif.name))
+            budget = budget_de(motif.callback)
+            if releve.nombre > budget:
+                repetees = ''.join(f'\n    {nombre} x {sql}' for sql, nombre in releve.repetees())
+                depassements.append(f'{motif.name} ({url}) : {releve.nombre} requêtes, budget {budget}{repetees}')
+        if depassements:
+            self.fail('Budgets de requêtes dépassés :\n' + '\n'.join(depassements))
@@ -0,0 +1,291 @@
+import datetime
+import io
+import itertools
+import os
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import ResolverMatch, reverse
+from django.utils.module_loading import import_string
+
+from commandes.models import Commande, LigneCommande
+from compte import stats
+from compte.models import StatistiquesClient
+from menu.models import CategorieMenu, Plat
+from pages.models import HorairesOuverture, Temoignage
+from reservation.models import OccupationCreneau, Reservation, Table
+from taches.models import Tache
+from .requetes import BudgetRequetesMiddleware, budget_requetes, empreinte, relever
+from .testing import REGLAGES_CACHE_PARTAGE, BudgetsMixin, RequetesMixin
+
+compteur = itertools.count()
+
+
+def creer_categorie():
+    categorie = CategorieMenu.objects.create(nom=f'Catégorie {next(compteur)}')
+    Plat.objects.create(categorie=categorie, nom='Plat', description='...', prix=1000, stock=5)
+    return categorie
+
+
+def creer_plat():
+    return Plat.objects.create(categorie=creer_categorie(), nom='Plat', description='...', prix=1000, stock=5)
+
+
+def creer_client():
+    return User.objects.create_user(f'client{next(compteur)}')
+
+
+def creer_commande():
+    plat = creer_plat()
+    commande = Commande.objects.create(client=creer_client(), nbPlat=2, montant=2000)
+    LigneCommande.objects.create(commande=commande, plat=plat, quantite=2, prix_unitaire=1000)
+    stats.commandes_creees([commande])
+    return commande
+
+
+def creer_table():
+    table = Table.objects.create(numero=f'T{next(compteur)}', places=4)
+    table.voisines.add(Table.objects.create(numero=f'T{next(compteur)}', places=2))
+    return table
+
+
+def creer_reservation():
+    reservation = Reservation.objects.create(
+        client=creer_client(), nom_client='Awa', telephone='600000000',
+        date_reservation=datetime.date(2026, 1, 1), heure_reservation=datetime.time(20),
+    )
+    reservation.tables.add(creer_table())
+    return reservation
+
+
+JOURS = itertools.cycle(jour for jour, _ in HorairesOuverture.JOURS_CHOICES)
+
+# Une fabrique par modèle enregistré dans l'admin
+FABRIQUES = {
+    Group: lambda: Group.objects.create(name=f'Groupe {next(compteur)}'),
+    User: creer_client,
+    Commande: creer_commande,
+    StatistiquesClient: lambda: stats.commandes_creees([creer_commande()]),
+    Plat: creer_plat,
+    CategorieMenu: creer_categorie,
+    Temoignage: lambda: Temoignage.objects.create(auteur='Awa', titre_plat='Ndolé', texte='...'),
+    HorairesOuverture: lambda: HorairesOuverture.objects.create(
+        jour=next(JOURS), heure_ouverture=datetime.time(10), heure_fermeture=datetime.time(22)
+    ),
+    Reservation: creer_reservation,
+    Table: creer_table,
+    OccupationCreneau: lambda: OccupationCreneau.objects.create(
+        date=datetime.date(2026, 1, 1) + datetime.timedelta(days=next(compteur)), heure=datetime.time(20),
+    ),
+    Tache: lambda: Tache.objects.create(
+        nom='commandes.taches.envoyer_confirmation', arguments={'args': [next(compteur)], 'kwargs': {}},
+    ),
+}
+
+
+class AdminChangelistTest(RequetesMixin, TestCase):
+    """Le nombre de requêtes de chaque liste de l'admin ne dépend pas du nombre de lignes."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def test_tous_les_modeles_ont_une_fabrique(self):
+        self.assertEqual(set(admin.site._registry) - set(FABRIQUES), set())
+
+    def test_nombre_de_requetes_constant(self):
+        for modele, fabrique in FABRIQUES.items():
+            url = reverse(f'admin:{modele._meta.app_label}_{modele._meta.model_name}_changelist')
+            with self.subTest(modele=modele._meta.label):
+                self.assertRequetesConstantes(url, lambda n: [fabrique() for _ in range(n)])
+
+    def test_autocompletion_des_plats(self):
+        url = reverse('admin:autocomplete')
+        donnees = {'app_label': 'commandes', 'model_name': 'lignecommande', 'field_name': 'plat', 'term': 'Plat'}
+
+        self.assertRequetesConstantes(url, lambda n: [creer_plat() for _ in range(n)], donnees)
+
+
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class BudgetsTest(BudgetsMixin, TestCase):
+    """Chaque page des applications reste dans le budget de requêtes déclaré sur sa vue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = creer_client()
+        for jour, _ in HorairesOuverture.JOURS_CHOICES:
+            HorairesOuverture.objects.create(
+                jour=jour, heure_ouverture=datetime.time(11), heure_fermeture=datetime.time(22)
+            )
+        cls.plats = [creer_plat() for _ in range(3)]
+        cls.commandes = [
+            Commande.objects.create(client=cls.client_user, nbPlat=1, montant=1000) for _ in range(3)
+        ]
+        for commande, plat in zip(cls.commandes, cls.plats):
+            LigneCommande.objects.create(commande=commande, plat=plat, quantite=1, prix_unitaire=1000)
+        for jour in range(3):
+            Reservation.objects.create(
+                client=cls.client_user, nom_client='Awa', telephone='600000000',
+                date_reservation=datetime.date(2026, 1, 1 + jour), heure_reservation=datetime.time(20),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.client_user)
+
+    def test_budgets(self):
+        plat, commande = self.plats[0].pk, self.commandes[0].pk
+        with self.subTest('menu'):
+            self.assertBudgetsRespectes('menu.urls', arguments={
+                'commande': {'pk': plat},
+                'ajouter_au_panier': {'pk': plat},
+                'modifier_panier': {'pk': plat},
+                'reorder': {'commande_id': commande},
+                'cancel_commande': {'commande_id': commande},
+                'commande_detail_ajax': {'commande_id': commande},
+            }, parametres={'suivi_commandes': {'version': 0}})
+        with self.subTest('reservation'):
+            self.assertBudgetsRespectes('reservation.urls')
+        with self.subTest('pages'):
+            self.assertBudgetsRespectes('pages.urls', ignorer=['logout'])
+
+
+@override_settings(REQUETES_INSTRUMENTATION=True)
+@override_settings(**REGLAGES_CACHE_PARTAGE)
+class BudgetRequetesMiddlewareTest(TestCase):
+    def setUp(self):
+        # Un utilisateur d'un test précédent peut être en cache sous le même pk (compte/backends.py)
+        cache.clear()
+
+    def test_server_timing(self):
+        self.client.force_login(creer_client())
+
+        response = self.client.get(reverse('Mes_commande'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;desc="\d+ requetes SQL";dur=[\d.]+, total;dur=[\d.]+$')
+
+    async def test_requetes_des_vues_asynchrones(self):
+        await self.async_client.aforce_login(await sync_to_async(creer_client)())
+
+        response = await self.async_client.get(reverse('Mes_commande'))
+
+        # Utilisateur, statistiques, commandes et lignes, lus dans le thread des appels `sync_to_async`
+        self.assertTrue(response['Server-Timing'].startswith('db;desc="4 requetes SQL"'), response['Server-Timing'])
+
+    def test_avertissement_au_dela_du_budget(self):
+        utilisateurs = [creer_client() for _ in range(3)]
+
+        @budget_requetes(2)
+        def vue(request):
+            for user in utilisateurs:
+                User.objects.filter(pk=user.pk).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.resolver_match = ResolverMatch(vue, (), {}, url_name='vue')
+        with self.assertLogs('restaurant.requetes', 'WARNING') as journal:
+            BudgetRequetesMiddleware(vue)(request)
+
+        self.assertEqual(request.releve_requetes.nombre, 3)
+        self.assertIn('3 requêtes SQL pour un budget de 2', journal.output[0])
+        self.assertIn('3 x SELECT', journal.output[0])
+
+    @override_settings(REQUETES_INSTRUMENTATION=False)
+    def test_inactif(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            BudgetRequetesMiddleware(lambda request: HttpResponse())
+
+    def test_empreintes(self):
+        with relever() as releve:
+            list(Plat.objects.filter(pk__in=[1, 2]))
+            list(Plat.objects.filter(pk__in=[3, 4, 5]))
+            list(Plat.objects.filter(nom='Eru'))
+
+        self.assertEqual(releve.nombre, 3)
+        self.assertEqual([nombre for _, nombre in releve.repetees(2)], [2])
+        self.assertEqual(empreinte("WHERE id IN (%s, %s) AND nom = 'a' LIMIT 21"), 'WHERE id IN (...) AND nom = ? LIMIT ?')
+
+
+class MiddlewareTest(SimpleTestCase):
+    def test_chaine_entierement_asynchrone(self):
+        """Un seul middleware synchrone ferait passer les vues asynchrones par le thread de `sync_to_async`."""
+        synchrones = [
+            chemin for chemin in settings.MIDDLEWARE
+            if not getattr(import_string(chemin), 'async_capable', False)
+        ]
+        self.assertEqual(synchrones, [])
+
+
+class StockageParContenuTest(TestCase):
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglage = override_settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+
+    def plat(self, contenu, nom='photo.JPG'):
+        return Plat.objects.create(
+            categorie=CategorieMenu.objects.create(nom=f'Catégorie {next(compteur)}'), nom='Plat',
+            description='...', prix=1000, image=SimpleUploadedFile(nom, contenu),
+        )
+
+    def test_nom_tire_du_contenu_et_doublons(self):
+        premier = self.plat(b'photo-1')
+        second = self.plat(b'photo-1', nom='copie.jpg')
+        autre = self.plat(b'photo-2')
+
+        self.assertRegex(premier.image.name, r'^image/[0-9a-f]{24}\.jpg$')
+        self.assertEqual(second.image.name, premier.image.name)
+        self.assertNotEqual(autre.image.name, premier.image.name)
+        self.assertEqual(sorted(os.listdir(os.path.join(settings.MEDIA_ROOT, 'image'))), sorted(
+            {os.path.basename(premier.image.name), os.path.basename(autre.image.name)}
+        ))
+
+    def test_envois_identiques_simultanes(self):
+        premier = self.plat(b'photo-1')
+        stockage = premier.image.storage
+
+        # Le second envoi n'a pas encore vu le fichier du premier (`exists()` passé avant son écriture)
+        nom = stockage.get_available_name(premier.image.name)
+        self.assertEqual(stockage._save(nom, SimpleUploadedFile('copie.jpg', b'photo-1')), premier.image.name)
+
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'image')), [os.path.basename(premier.image.name)])
+
+    @override_settings(MEDIAS_SERVIS_PAR_DJANGO=True)
+    def test_photos_servies_immuables(self):
+        plat = self.plat(b'photo-1')
+
+        response = self.client.get(plat.image.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), b'photo-1')
+
+    @override_settings(MEDIAS_SERVIS_PAR_DJANGO=False)
+    def test_medias_servis_par_le_frontal_en_production(self):
+        plat = self.plat(b'photo-1')
+
+        self.assertEqual(self.client.get(plat.image.url).status_code, 404)
+
+    def test_anciennes_photos(self):
+        plat = creer_plat()
+
+        # Photo fournie avec le site : URL du fichier statique
+        self.assertEqual(plat.image.url, '/static/image/default.jpg')
+
+        call_command('importer_images', stdout=io.StringIO())
+
+        plat.refresh_from_db()
+        self.assertRegex(plat.image.name, r'^image/[0-9a-f]{24}\.jpg$')
+        self.assertTrue(plat.image.url.startswith(settings.MEDIA_URL))
+        self.assertEqual(plat.image_derives['source'], plat.image.name)
@@ -15,9 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .medias import servir
 
 urlpatterns = [
     # path('jet',include('jet.urls', 'jet')),
@@ -27,7 +28,8 @@ urlpatterns = [
     path('menu/', include('menu.urls')),
     path('reserver/', include('reservation.urls')),
 path('experiance/', include('experiance.urls')),
+    path('cuisine/', include('commandes.urls')),
+    # Photos envoyées, avec Cache-Control immutable (restaurant/medias.py)
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), servir),
 
-]
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]
\ No newline at end of file
@@ -0,0 +1,29 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Tache
+
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nom', 'statut', 'tentatives', 'max_tentatives', 'executer_apres', 'updated_at')
+    list_filter = ('statut', 'nom')
+    search_fields = ('nom',)
+    date_hierarchy = 'created_at'
+    readonly_fields = (
+        'nom', 'arguments', 'statut', 'tentatives', 'max_tentatives', 'commencee_le',
+        'derniere_erreur', 'created_at', 'updated_at',
+    )
+    actions = ['relancer']
+
+    def has_add_permission(self, request):
+        """Les tâches sont ajoutées par le code (`fonction.differer`)."""
+        return False
+
+    @admin.action(description="Relancer les tâches en échec")
+    def relancer(self, request, queryset):
+        nombre = queryset.filter(statut=Tache.StatutChoices.ECHEC).update(
+            statut=Tache.StatutChoices.EN_ATTENTE, tentatives=0, jeton='',
+            executer_apres=timezone.now(), updated_at=timezone.now(),
+        )
+        self.message_user(request, f"{nombre} tâche(s) remise(s) en file.", messages.SUCCESS)
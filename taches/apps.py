@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TachesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taches'
+
+    def ready(self):
+        # Enregistre les tâches déclarées dans le module `taches` de chaque application
+        autodiscover_modules('taches')
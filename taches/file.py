@@ -0,0 +1,63 @@
+"""
+Déclaration et mise en file des tâches.
+
+Une fonction décorée par `@tache` reste appelable normalement ;
+`fonction.differer(*args, **kwargs)` l'ajoute à la file après le commit de
+la transaction en cours (rien n'est ajouté si elle est annulée) et
+`fonction.planifier(quand, ...)` fixe en plus l'heure d'exécution. Les
+arguments doivent être sérialisables en JSON : on passe des identifiants,
+pas des objets. Le travailleur (taches/travailleur.py) retrouve la fonction
+par son chemin.
+"""
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Tache
+
+_registre = {}
+
+
+class TacheDeclaree:
+    def __init__(self, fonction, max_tentatives):
+        self.fonction = fonction
+        self.nom = f'{fonction.__module__}.{fonction.__qualname__}'
+        self.max_tentatives = max_tentatives
+        self.__doc__ = fonction.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.fonction(*args, **kwargs)
+
+    def differer(self, *args, **kwargs):
+        """Exécution dès que possible, après le commit."""
+        mettre_en_file(self.nom, args, kwargs, max_tentatives=self.max_tentatives)
+
+    def planifier(self, quand, *args, **kwargs):
+        """Exécution à partir de `quand` (datetime), après le commit."""
+        mettre_en_file(self.nom, args, kwargs, executer_apres=quand, max_tentatives=self.max_tentatives)
+
+
+def tache(fonction=None, *, max_tentatives=3):
+    """Déclare une tâche : ``@tache`` ou ``@tache(max_tentatives=5)``."""
+    def declarer(fonction):
+        declaree = TacheDeclaree(fonction, max_tentatives)
+        _registre[declaree.nom] = declaree
+        return declaree
+    return declarer(fonction) if fonction is not None else declarer
+
+
+def trouver(nom: str) -> TacheDeclaree:
+    """Tâche déclarée sous `nom` (le module est importé s'il ne l'est pas encore)."""
+    if nom not in _registre:
+        import_string(nom)
+    return _registre[nom]
+
+
+def mettre_en_file(nom: str, args=(), kwargs=None, executer_apres=None, max_tentatives=3):
+    arguments = {'args': list(args), 'kwargs': kwargs or {}}
+    transaction.on_commit(lambda: Tache.objects.create(
+        nom=nom,
+        arguments=arguments,
+        executer_apres=executer_apres or timezone.now(),
+        max_tentatives=max_tentatives,
+    ))
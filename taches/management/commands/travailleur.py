@@ -0,0 +1,31 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from taches import travailleur
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches en file (e-mails de confirmation, images dérivées...) dans un pool de threads, "
+        "jusqu'à SIGINT ou SIGTERM. Plusieurs travailleurs peuvent tourner en même temps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help="Threads d'exécution (défaut : TACHES_THREADS).")
+        parser.add_argument('--intervalle', type=float, help="Attente entre deux lectures de la file (secondes).")
+        parser.add_argument('--une-fois', action='store_true', help="Exécute les tâches dues puis s'arrête.")
+
+    def handle(self, *args, **options):
+        if options['une_fois']:
+            nombre = travailleur.executer_dues()
+            self.stdout.write(self.style.SUCCESS(f"{nombre} tâche(s) exécutée(s)."))
+            return
+
+        boucle = travailleur.Travailleur(threads=options['threads'], intervalle=options['intervalle'])
+        # Arrêt propre : les tâches en cours se terminent, aucune nouvelle n'est prise
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: boucle.arret.set())
+        self.stdout.write(f"Travailleur démarré ({boucle.threads} thread(s)).")
+        boucle.tourner()
+        self.stdout.write("Travailleur arrêté.")
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-18 11:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(help_text='Chemin de la fonction (module.fonction).', max_length=200)),
+                ('arguments', models.JSONField(blank=True, default=dict, help_text="{'args': [...], 'kwargs': {...}}")),
+                ('statut', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminée'), ('failed', 'Échec')], default='pending', max_length=10)),
+                ('executer_apres', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('max_tentatives', models.PositiveIntegerField(default=3)),
+                ('jeton', models.CharField(blank=True, default='', editable=False, max_length=32)),
+                ('commencee_le', models.DateTimeField(blank=True, null=True)),
+                ('derniere_erreur', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tâche',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('statut', 'pending')), fields=['executer_apres'], name='taches_a_executer_idx')],
+            },
+        ),
+    ]
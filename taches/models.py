@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Tache(models.Model):
+    """Tâche en file d'attente, exécutée par `manage.py travailleur` (taches/travailleur.py)."""
+
+    class StatutChoices(models.TextChoices):
+        EN_ATTENTE = 'pending', _('En attente')
+        EN_COURS = 'running', _('En cours')
+        TERMINEE = 'done', _('Terminée')
+        ECHEC = 'failed', _('Échec')
+
+    nom = models.CharField(max_length=200, help_text="Chemin de la fonction (module.fonction).")
+    arguments = models.JSONField(default=dict, blank=True, help_text="{'args': [...], 'kwargs': {...}}")
+    statut = models.CharField(max_length=10, choices=StatutChoices.choices, default=StatutChoices.EN_ATTENTE)
+    executer_apres = models.DateTimeField(default=timezone.now)
+    tentatives = models.PositiveIntegerField(default=0)
+    max_tentatives = models.PositiveIntegerField(default=3)
+    # Identifie la prise en charge par un travailleur (UPDATE conditionnel, voir `reserver`)
+    jeton = models.CharField(max_length=32, blank=True, default='', editable=False)
+    commencee_le = models.DateTimeField(null=True, blank=True)
+    derniere_erreur = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Tâche"
+        indexes = [
+            # Tâches à prendre : en attente, par date d'exécution
+            models.Index(
+                fields=['executer_apres'],
+                condition=models.Q(statut='pending'),
+                name='taches_a_executer_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nom} #{self.pk} ({self.get_statut_display()})"
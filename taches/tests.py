@@ -0,0 +1,183 @@
+import datetime
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from experiance.models import Temoignage
+from menu.models import CategorieMenu, Plat
+from . import travailleur
+from .file import tache
+from .models import Tache
+
+Statut = Tache.StatutChoices
+appels = []
+
+
+@tache
+def noter(valeur):
+    appels.append(valeur)
+
+
+@tache(max_tentatives=2)
+def echouer(valeur):
+    appels.append(valeur)
+    raise RuntimeError('indisponible')
+
+
+@override_settings(TACHES_DELAI_RELANCE=30)
+class FileTest(TestCase):
+    def setUp(self):
+        appels.clear()
+
+    def test_ajoutee_apres_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            noter.differer('a')
+            self.assertFalse(Tache.objects.exists())
+
+        tache_ = Tache.objects.get()
+        self.assertEqual((tache_.nom, tache_.arguments), ('taches.tests.noter', {'args': ['a'], 'kwargs': {}}))
+        self.assertEqual(appels, [])
+
+        self.assertEqual(travailleur.executer_dues(), 1)
+        tache_.refresh_from_db()
+        self.assertEqual((tache_.statut, tache_.tentatives), (Statut.TERMINEE, 1))
+        self.assertEqual(appels, ['a'])
+
+    def test_rien_si_la_transaction_est_annulee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    noter.differer('a')
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertFalse(Tache.objects.exists())
+
+    def test_relances_espacees_puis_echec(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            echouer.differer('b')
+
+        avant = timezone.now()
+        travailleur.executer_dues()
+        tache_ = Tache.objects.get()
+        self.assertEqual((tache_.statut, tache_.tentatives), (Statut.EN_ATTENTE, 1))
+        self.assertIn('RuntimeError: indisponible', tache_.derniere_erreur)
+        self.assertGreaterEqual(tache_.executer_apres, avant + datetime.timedelta(seconds=30))
+        # Pas encore due
+        self.assertEqual(travailleur.executer_dues(), 0)
+
+        Tache.objects.update(executer_apres=timezone.now())
+        travailleur.executer_dues()
+        tache_.refresh_from_db()
+        self.assertEqual((tache_.statut, tache_.tentatives), (Statut.ECHEC, 2))
+        self.assertEqual(appels, ['b', 'b'])
+
+    def test_planifiee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            noter.planifier(timezone.now() + datetime.timedelta(hours=1), 'c')
+
+        self.assertEqual(travailleur.executer_dues(), 0)
+        Tache.objects.update(executer_apres=timezone.now())
+        self.assertEqual(travailleur.executer_dues(), 1)
+        self.assertEqual(appels, ['c'])
+
+    def test_une_tache_n_est_prise_qu_une_fois(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for valeur in range(3):
+                noter.differer(valeur)
+
+        premiers = travailleur.reserver(2)
+        seconds = travailleur.reserver(2)
+
+        self.assertEqual(len(premiers), 2)
+        self.assertEqual([t.pk for t in seconds], [Tache.objects.order_by('pk').last().pk])
+        self.assertEqual(travailleur.reserver(2), [])
+
+    def test_taches_abandonnees_remises_en_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            noter.differer('d')
+        travailleur.reserver(1)
+        Tache.objects.update(commencee_le=timezone.now() - datetime.timedelta(hours=1))
+
+        self.assertEqual(travailleur.liberer_bloquees(), 1)
+        self.assertEqual(Tache.objects.get().tentatives, 1)
+        self.assertEqual(travailleur.executer_dues(), 1)
+        self.assertEqual(appels, ['d'])
+
+    def test_tache_qui_bloque_toujours_finit_en_echec(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            echouer.differer('e')
+
+        for liberees in (1, 0):
+            travailleur.reserver(1)
+            Tache.objects.update(commencee_le=timezone.now() - datetime.timedelta(hours=1))
+            self.assertEqual(travailleur.liberer_bloquees(), liberees)
+            Tache.objects.update(executer_apres=timezone.now())
+
+        tache_ = Tache.objects.get()
+        self.assertEqual((tache_.statut, tache_.tentatives), (Statut.ECHEC, 2))
+        self.assertEqual(travailleur.reserver(1), [])
+
+
+class VuesTest(TestCase):
+    """Les vues ne font que le travail essentiel ; le reste passe par la file."""
+
+    def test_confirmation_de_commande(self):
+        client_user = User.objects.create_user('awa', email='awa@example.com', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        plat = Plat.objects.create(categorie=categorie, nom='Ndolé', description='...', prix=3500, stock=3)
+        self.client.force_login(client_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('commande', args=[plat.pk]))
+
+        self.assertRedirects(response, reverse('Mes_commande'), fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        travailleur.executer_dues()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['awa@example.com'])
+        self.assertIn('3500 FCFA', mail.outbox[0].body)
+
+    def test_confirmation_d_une_commande_supprimee(self):
+        client_user = User.objects.create_user('awa', email='awa@example.com', password='secret')
+        categorie = CategorieMenu.objects.create(nom='Plats')
+        plat = Plat.objects.create(categorie=categorie, nom='Ndolé', description='...', prix=3500, stock=3)
+        self.client.force_login(client_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('commande', args=[plat.pk]))
+
+        client_user.commandes.all().delete()
+        travailleur.executer_dues()
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual((Tache.objects.get().statut, Tache.objects.get().tentatives), (Statut.TERMINEE, 1))
+
+    def test_photo_d_un_avis(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        tampon = io.BytesIO()
+        Image.new('RGB', (600, 400), 'green').save(tampon, 'JPEG')
+
+        with self.settings(MEDIA_ROOT=dossier):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('laisser_avis'), {
+                    'auteur': 'Awa', 'titre_plat': 'Ndolé', 'note': 5, 'texte': 'Très bon',
+                    'image': SimpleUploadedFile('avis.jpg', tampon.getvalue(), content_type='image/jpeg'),
+                })
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(Temoignage.objects.get().image_derives, {})
+            self.assertEqual(Tache.objects.get().nom, 'experiance.taches.deriver_photo_avis')
+
+            travailleur.executer_dues()
+
+        self.assertEqual(Temoignage.objects.get().image_derives['largeurs'], [200, 400, 600])
@@ -0,0 +1,143 @@
+"""
+Exécution des tâches en file (`manage.py travailleur`).
+
+Le travailleur prend les tâches dues par un ``UPDATE`` conditionnel
+(``SET statut = 'running', jeton = <jeton> WHERE statut = 'pending' AND id IN
+(...)``) : deux travailleurs ne peuvent pas prendre la même tâche, sans
+verrou ni broker, sur toutes les bases. Les tâches s'exécutent dans un pool
+de `settings.TACHES_THREADS` threads. Une tâche en échec est relancée après
+un délai qui double à chaque tentative (`settings.TACHES_DELAI_RELANCE`),
+jusqu'à `max_tentatives`. Une tâche restée « en cours » plus de
+`settings.TACHES_DELAI_BLOCAGE` secondes (travailleur arrêté brutalement,
+ou tâche qui le bloque) compte comme une tentative : elle est remise en
+attente, ou en échec si elle a épuisé ses tentatives.
+"""
+import datetime
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .file import trouver
+from .models import Tache
+
+Statut = Tache.StatutChoices
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def reserver(nombre: int) -> list:
+    """Prend jusqu'à `nombre` tâches dues, les plus anciennes d'abord. Trois requêtes."""
+    maintenant = timezone.now()
+    candidates = list(
+        Tache.objects.filter(statut=Statut.EN_ATTENTE, executer_apres__lte=maintenant)
+        .order_by('executer_apres', 'pk')
+        .values_list('pk', flat=True)[:nombre]
+    )
+    if not candidates:
+        return []
+    jeton = uuid.uuid4().hex
+    Tache.objects.filter(pk__in=candidates, statut=Statut.EN_ATTENTE).update(
+        statut=Statut.EN_COURS, jeton=jeton, commencee_le=maintenant, updated_at=maintenant,
+    )
+    return list(Tache.objects.filter(jeton=jeton, statut=Statut.EN_COURS).order_by('executer_apres', 'pk'))
+
+
+def _delai_relance(tentatives: int) -> datetime.timedelta:
+    return datetime.timedelta(seconds=_reglage('TACHES_DELAI_RELANCE', 30) * 2 ** (tentatives - 1))
+
+
+def executer(tache: Tache) -> bool:
+    """Exécute une tâche prise par `reserver` et enregistre le résultat ; retourne True si elle a réussi."""
+    tentatives = tache.tentatives + 1
+    prise = Tache.objects.filter(pk=tache.pk, jeton=tache.jeton)
+    try:
+        trouver(tache.nom)(*tache.arguments.get('args', []), **tache.arguments.get('kwargs', {}))
+    except Exception:
+        maintenant = timezone.now()
+        if tentatives < tache.max_tentatives:
+            prise.update(
+                statut=Statut.EN_ATTENTE, tentatives=tentatives, jeton='', derniere_erreur=traceback.format_exc(),
+                executer_apres=maintenant + _delai_relance(tentatives), updated_at=maintenant,
+            )
+        else:
+            prise.update(
+                statut=Statut.ECHEC, tentatives=tentatives, derniere_erreur=traceback.format_exc(),
+                updated_at=maintenant,
+            )
+        return False
+    prise.update(statut=Statut.TERMINEE, tentatives=tentatives, derniere_erreur='', updated_at=timezone.now())
+    return True
+
+
+def liberer_bloquees() -> int:
+    """
+    Tâches « en cours » depuis plus de `TACHES_DELAI_BLOCAGE` secondes : la
+    tentative est comptée, puis la tâche est remise en attente ou, à sa dernière
+    tentative, passée en échec. Retourne le nombre de tâches remises en attente.
+    """
+    maintenant = timezone.now()
+    bloquees = Tache.objects.filter(
+        statut=Statut.EN_COURS,
+        commencee_le__lt=maintenant - datetime.timedelta(seconds=_reglage('TACHES_DELAI_BLOCAGE', 600)),
+    )
+    erreur = "Abandonnée : toujours en cours après TACHES_DELAI_BLOCAGE secondes."
+    bloquees.filter(tentatives__gte=F('max_tentatives') - 1).update(
+        statut=Statut.ECHEC, tentatives=F('tentatives') + 1, derniere_erreur=erreur, updated_at=maintenant,
+    )
+    return bloquees.update(
+        statut=Statut.EN_ATTENTE, tentatives=F('tentatives') + 1, jeton='', derniere_erreur=erreur,
+        updated_at=maintenant,
+    )
+
+
+def executer_dues(nombre: int = 100) -> int:
+    """Exécute dans le thread courant les tâches dues (tests, `travailleur --une-fois`)."""
+    faites = 0
+    while faites < nombre:
+        prises = reserver(min(10, nombre - faites))
+        if not prises:
+            break
+        for tache in prises:
+            executer(tache)
+        faites += len(prises)
+    return faites
+
+
+class Travailleur:
+    """Boucle de prise et d'exécution des tâches, arrêtée par `arret.set()`."""
+
+    def __init__(self, threads=None, intervalle=None):
+        self.threads = threads or _reglage('TACHES_THREADS', 4)
+        self.intervalle = intervalle if intervalle is not None else _reglage('TACHES_INTERVALLE', 1.0)
+        self.arret = threading.Event()
+
+    def _executer(self, tache):
+        close_old_connections()
+        try:
+            executer(tache)
+        finally:
+            close_old_connections()
+
+    def tourner(self):
+        en_cours = set()
+        prochain_nettoyage = 0
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='taches') as pool:
+            while not self.arret.is_set():
+                if time.monotonic() >= prochain_nettoyage:
+                    liberer_bloquees()
+                    prochain_nettoyage = time.monotonic() + 60
+                en_cours = {future for future in en_cours if not future.done()}
+                prises = reserver(self.threads - len(en_cours)) if len(en_cours) < self.threads else []
+                en_cours.update(pool.submit(self._executer, tache) for tache in prises)
+                close_old_connections()
+                if not prises:
+                    self.arret.wait(self.intervalle)